@@ -26,8 +26,11 @@ necessary.
 from __future__ import annotations
 
 import errno
+import hashlib
+import json
 import logging
 import os
+import threading
 import typing
 import warnings
 
@@ -99,28 +102,10 @@ def _match(action: str, device, filter_func: typing.Callable[[int, int, int, boo
         return  # these are devices connected through a receiver so don't pick them up here
 
     try:  # if report descriptor does not indicate HID++ capabilities then this device is not of interest to Solaar
-        from hid_parser import ReportDescriptor
-
-        hidpp_short = hidpp_long = centurion = False
-        centurion_report_id = None
         devfile = "/sys" + hid_device.properties.get("DEVPATH") + "/report_descriptor"
         with fileopen(devfile, "rb") as fd:
-            with warnings.catch_warnings():
-                warnings.simplefilter("ignore")
-                rd = ReportDescriptor(fd.read())
-            hidpp_short = 0x10 in rd.input_report_ids and 6 * 8 == int(rd.get_input_report_size(0x10))
-            # and _Usage(0xFF00, 0x0001) in rd.get_input_items(0x10)[0].usages  # be more permissive
-            hidpp_long = 0x11 in rd.input_report_ids and 19 * 8 == int(rd.get_input_report_size(0x11))
-            # and _Usage(0xFF00, 0x0002) in rd.get_input_items(0x11)[0].usages  # be more permissive
-            # Centurion transport: 63-byte reports on usage page 0xFFA0 (both input and output)
-            # 0x51 = PRO X 2 LIGHTSPEED variant, 0x50 = G522 LIGHTSPEED variant (with device address byte)
-            if 0x51 in rd.input_report_ids and 63 * 8 == int(rd.get_input_report_size(0x51)) and 0x51 in rd.output_report_ids:
-                centurion_report_id = 0x51
-            elif (
-                0x50 in rd.input_report_ids and 63 * 8 == int(rd.get_input_report_size(0x50)) and 0x50 in rd.output_report_ids
-            ):
-                centurion_report_id = 0x50
-            centurion = centurion_report_id is not None
+            hidpp_short, hidpp_long, centurion_report_id = _report_descriptors.classify(fd.read())
+        centurion = centurion_report_id is not None
         if not hidpp_short and not hidpp_long and not centurion:
             return
     except Exception as e:  # if can't process report descriptor fall back to old scheme
@@ -201,45 +186,236 @@ def _match(action: str, device, filter_func: typing.Callable[[int, int, int, boo
         return d_info
 
 
-def find_paired_node(receiver_path: str, index: int, timeout: int):
-    """Find the node of a device paired with a receiver"""
-    context = pyudev.Context()
-    receiver_phys = pyudev.Devices.from_device_file(context, receiver_path).find_parent("hid").get("HID_PHYS")
+def _scan_report_sizes(data: bytes):
+    """Input report sizes in bits and output report IDs from the items of a raw report descriptor.
 
-    if not receiver_phys:
-        return None
+    Report sizes are summed the same way as hid_parser does, without building its item tree.
+    """
+    input_sizes = {}
+    output_ids = set()
+    report_id = report_size = report_count = None
+    i = 0
+    while i < len(data):
+        prefix = data[i]
+        if prefix == 0xFE:  # long item, skip it
+            if i + 2 >= len(data):
+                raise ValueError("truncated long item")
+            i += data[i + 1] + 3
+            continue
+        size = prefix & 0x03
+        size = 4 if size == 3 else size
+        if i + size >= len(data) and size:
+            raise ValueError("truncated item")
+        value = int.from_bytes(data[i + 1 : i + 1 + size], "little")
+        item = prefix & 0xFC
+        if item == 0x84:  # Report ID
+            report_id = value
+        elif item == 0x74:  # Report Size
+            report_size = value
+        elif item == 0x94:  # Report Count
+            report_count = value
+        elif item in (0x80, 0x90):  # Input, Output
+            if report_size is None or report_count is None:
+                raise ValueError("main item without report size or count")
+            if item == 0x80:
+                input_sizes[report_id] = input_sizes.get(report_id, 0) + report_size * report_count
+            else:
+                output_ids.add(report_id)
+        i += size + 1
+    return input_sizes, output_ids
 
-    phys = f"{receiver_phys}:{index}"  # noqa: E231
-    timeout += time()
-    delta = time()
-    while delta < timeout:
-        for dev in context.list_devices(subsystem="hidraw"):
-            dev_phys = dev.find_parent("hid").get("HID_PHYS")
-            if dev_phys and dev_phys == phys:
-                return dev.device_node
-        delta = time()
 
-    return None
+def _parse_report_sizes(data: bytes):
+    from hid_parser import ReportDescriptor
 
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        rd = ReportDescriptor(data)
+    return {id: int(rd.get_input_report_size(id)) for id in rd.input_report_ids}, set(rd.output_report_ids)
 
-def find_paired_node_wpid(receiver_path: str, index: int):
-    """Find the node of a device paired with a receiver, get wpid from udev"""
+
+def _classify_report_descriptor(data: bytes):
+    """HID++ short, HID++ long, and Centurion report ID from a report descriptor"""
+    if not any(bytes((0x85, id)) in data for id in (0x10, 0x11, 0x50, 0x51)):
+        return False, False, None  # no HID++ or Centurion report IDs so no need to look at the items
+    try:
+        input_sizes, output_ids = _scan_report_sizes(data)
+    except ValueError:
+        input_sizes, output_ids = _parse_report_sizes(data)
+    hidpp_short = input_sizes.get(0x10) == 6 * 8
+    hidpp_long = input_sizes.get(0x11) == 19 * 8
+    # Centurion transport: 63-byte reports on usage page 0xFFA0 (both input and output)
+    # 0x51 = PRO X 2 LIGHTSPEED variant, 0x50 = G522 LIGHTSPEED variant (with device address byte)
+    centurion_report_id = None
+    for id in (0x51, 0x50):
+        if input_sizes.get(id) == 63 * 8 and id in output_ids:
+            centurion_report_id = id
+            break
+    return hidpp_short, hidpp_long, centurion_report_id
+
+
+_XDG_CACHE_HOME = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+_report_descriptors_cache_path = os.path.join(_XDG_CACHE_HOME, "solaar", "report_descriptors.json")
+
+
+class _ReportDescriptorCache:
+    """Classification of report descriptors keyed by a hash of their contents, kept on disk."""
+
+    VERSION = 1
+
+    def __init__(self, path=_report_descriptors_cache_path):
+        self.path = path
+        self._stored = None
+        self._lock = threading.Lock()
+
+    def classify(self, data: bytes):
+        key = hashlib.sha256(data).hexdigest()
+        with self._lock:
+            if self._stored is None:
+                self._stored = self._load()
+            result = self._stored.get(key)
+            if result is None:
+                result = _classify_report_descriptor(data)
+                self._stored[key] = result
+                self._save()
+        return tuple(result)
+
+    def _load(self):
+        try:
+            with fileopen(self.path) as cache_file:
+                stored = json.load(cache_file)
+            if stored.get("version") == self.VERSION:
+                return stored["descriptors"]
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("failed to load report descriptor cache from %s: %s", self.path, e)
+        return {}
+
+    def _save(self):
+        try:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            tmp_path = f"{self.path}.{os.getpid()}.tmp"
+            with fileopen(tmp_path, "w") as cache_file:
+                json.dump({"version": self.VERSION, "descriptors": self._stored}, cache_file)
+            os.replace(tmp_path, self.path)
+        except Exception as e:
+            logger.debug("failed to save report descriptor cache to %s: %s", self.path, e)
+
+
+_report_descriptors = _ReportDescriptorCache()
+
+
+class _PairedNodeIndex:
+    """Index of hidraw nodes by the HID_PHYS of their HID device, kept up to date by a udev monitor.
+
+    Devices paired with a receiver have the receiver's HID_PHYS followed by their pairing index,
+    so looking up the node of a paired device is a dictionary lookup, or a wait for it to appear.
+    """
+
+    def __init__(self):
+        self._nodes = {}  # HID_PHYS -> (device node, HID_ID)
+        self._phys = {}  # device node -> HID_PHYS
+        self._changed = threading.Condition()
+        self._observer = None
+        self.started = False
+
+    def start(self):
+        with self._changed:
+            if self.started:
+                return self._observer is not None
+            self.started = True
+            context = pyudev.Context()
+            try:  # start monitoring before listing so that no node goes missing
+                monitor = pyudev.Monitor.from_netlink(context)
+                monitor.filter_by(subsystem="hidraw")
+                self._observer = pyudev.MonitorObserver(monitor, callback=self._event, name="PairedNodeIndex")
+                self._observer.daemon = True
+                self._observer.start()
+            except Exception as e:
+                logger.warning("cannot monitor hidraw devices, will search for paired devices instead: %s", e)
+                self._observer = None
+                return False
+            for dev in context.list_devices(subsystem="hidraw"):
+                self._add(dev)
+            return True
+
+    def _add(self, dev):
+        hid_dev = dev.find_parent("hid")
+        phys = hid_dev.get("HID_PHYS") if hid_dev is not None else None
+        if phys and dev.device_node:
+            self._nodes[phys] = (dev.device_node, hid_dev.get("HID_ID"))
+            self._phys[dev.device_node] = phys
+
+    def _event(self, dev):
+        with self._changed:
+            if dev.action == ACTION_ADD:
+                try:
+                    self._add(dev)
+                except Exception as e:  # the device might already be gone
+                    logger.debug("cannot index %s: %s", dev, e)
+            elif dev.action == ACTION_REMOVE:
+                phys = self._phys.pop(dev.device_node, None)
+                if phys and self._nodes.get(phys, (None,))[0] == dev.device_node:
+                    del self._nodes[phys]
+            self._changed.notify_all()
+
+    def receiver_phys(self, receiver_path):
+        with self._changed:
+            phys = self._phys.get(receiver_path)
+        if phys is None:
+            phys = pyudev.Devices.from_device_file(pyudev.Context(), receiver_path).find_parent("hid").get("HID_PHYS")
+        return phys
+
+    def lookup(self, phys, timeout=0):
+        """The (device node, HID_ID) with this HID_PHYS, waiting up to timeout seconds for it to appear."""
+        with self._changed:
+            self._changed.wait_for(lambda: phys in self._nodes, timeout)
+            return self._nodes.get(phys)
+
+
+_paired_nodes = _PairedNodeIndex()
+
+
+def _scan_paired_node(context, phys):
+    for dev in context.list_devices(subsystem="hidraw"):
+        hid_dev = dev.find_parent("hid")
+        if hid_dev is not None and hid_dev.get("HID_PHYS") == phys:
+            return dev.device_node, hid_dev.get("HID_ID")
+
+
+def _find_paired(receiver_path: str, index: int, timeout=0):
+    if _paired_nodes.start():
+        receiver_phys = _paired_nodes.receiver_phys(receiver_path)
+        return _paired_nodes.lookup(f"{receiver_phys}:{index}", timeout) if receiver_phys else None  # noqa: E231
+
+    # no udev monitor, so poll for the node
     context = pyudev.Context()
     receiver_phys = pyudev.Devices.from_device_file(context, receiver_path).find_parent("hid").get("HID_PHYS")
-
     if not receiver_phys:
         return None
-
     phys = f"{receiver_phys}:{index}"  # noqa: E231
-    for dev in context.list_devices(subsystem="hidraw"):
-        dev_phys = dev.find_parent("hid").get("HID_PHYS")
-        if dev_phys and dev_phys == phys:
-            # get hid id like 0003:0000046D:00000065
-            hid_id = dev.find_parent("hid").get("HID_ID")
-            # get wpid - last 4 symbols
-            udev_wpid = hid_id[-4:]
-            return udev_wpid
+    timeout += time()
+    while True:
+        found = _scan_paired_node(context, phys)
+        if found or time() >= timeout:
+            return found
+        sleep(0.1)
+
 
+def find_paired_node(receiver_path: str, index: int, timeout: int):
+    """Find the node of a device paired with a receiver"""
+    found = _find_paired(receiver_path, index, timeout)
+    return found[0] if found else None
+
+
+def find_paired_node_wpid(receiver_path: str, index: int):
+    """Find the node of a device paired with a receiver, get wpid from udev"""
+    found = _find_paired(receiver_path, index)
+    if found and found[1]:
+        # get hid id like 0003:0000046D:00000065
+        # get wpid - last 4 symbols
+        return found[1][-4:]
     return None
 
 
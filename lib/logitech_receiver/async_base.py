@@ -0,0 +1,221 @@
+## Copyright (C) 2014-2024  Solaar Contributors https://pwr-solaar.github.io/Solaar/
+##
+## This program is free software; you can redistribute it and/or modify
+## it under the terms of the GNU General Public License as published by
+## the Free Software Foundation; either version 2 of the License, or
+## (at your option) any later version.
+##
+## This program is distributed in the hope that it will be useful,
+## but WITHOUT ANY WARRANTY; without even the implied warranty of
+## MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+## GNU General Public License for more details.
+##
+## You should have received a copy of the GNU General Public License along
+## with this program; if not, write to the Free Software Foundation, Inc.,
+## 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
+
+"""Asyncio transport for HID++ requests.
+
+An AsyncHandle reads its hidraw node from the event loop and routes each reply to the
+request waiting for it, so many requests to many devices can be outstanding from one thread.
+Requests and pings are matched to their replies the same way as in the base module.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import struct
+
+from random import getrandbits
+from typing import Callable
+
+from . import base
+from . import common
+from . import exceptions
+
+logger = logging.getLogger(__name__)
+
+_RESEND = object()  # a request has to be made again, see AsyncHandle._timed_out
+
+
+class AsyncHandle:
+    """An open handle to a receiver or device, read by the event loop."""
+
+    def __init__(
+        self,
+        handle: int,
+        notifications_callback: Callable[[base.HIDPPNotification], None] | None = None,
+        depth: int = base.PIPELINE_DEPTH,
+        loop: asyncio.AbstractEventLoop | None = None,
+    ):
+        assert isinstance(handle, int)
+        self.handle = handle
+        self.notifications_callback = notifications_callback
+        self.loop = loop or asyncio.get_running_loop()
+        self._waiting = []  # (key, match, future) in the order the requests were written
+        self._serial = {}  # locks for the request IDs that are only in flight one at a time, see _timed_out
+        self._in_flight = asyncio.Semaphore(depth)  # receivers only queue a few requests
+        self.loop.add_reader(handle, self._readable)
+
+    @classmethod
+    async def open(cls, path, notifications_callback=None, depth: int = base.PIPELINE_DEPTH) -> AsyncHandle | None:
+        loop = asyncio.get_running_loop()
+        handle = await loop.run_in_executor(None, base.open_path, path)
+        if handle:
+            return cls(handle, notifications_callback, depth, loop)
+
+    def close(self):
+        if self.handle is not None:
+            handle, self.handle = self.handle, None
+            self.loop.remove_reader(handle)
+            base.close(handle)
+            self._fail(exceptions.NoReceiver(reason="handle closed"))
+
+    def __index__(self):
+        return self.handle if self.handle is not None else -1
+
+    __int__ = __index__
+
+    def __str__(self):
+        return str(self.handle)
+
+    def __repr__(self):
+        return f"<AsyncHandle({self.handle})>"
+
+    def __bool__(self):
+        return self.handle is not None
+
+    def _fail(self, error: Exception):
+        waiting, self._waiting = self._waiting, []
+        for _key, _match, future in waiting:
+            if not future.done():
+                future.set_exception(error)
+
+    def _readable(self):
+        try:
+            reply = base._read(self, 0)
+        except exceptions.NoReceiver as e:  # the handle has been closed by now
+            self._fail(e)
+            return
+        if reply and not self._route(*reply) and self.notifications_callback:
+            n = base.make_notification(*reply)
+            if n:
+                self.notifications_callback(n)
+
+    def _route(self, report_id, devnumber, data) -> bool:
+        """Resolve the oldest waiting request answered by a reply, if any."""
+        for waiter in self._waiting:
+            _key, match, future = waiter
+            if future.done():
+                continue
+            try:
+                result = match(report_id, devnumber, data)
+            except Exception as e:
+                future.set_exception(e)
+            else:
+                if result is base._NO_MATCH:
+                    continue
+                future.set_result(result)
+            self._waiting.remove(waiter)
+            return True
+        return False
+
+    async def _exchange(self, devnumber, request_data: bytes, long_message: bool, match, timeout: float):
+        key = (devnumber, request_data[:2])
+        while True:
+            lock = self._serial.get(key)
+            if lock is None:
+                result = await self._send(key, devnumber, request_data, long_message, match, timeout)
+            else:
+                async with lock:
+                    result = await self._send(key, devnumber, request_data, long_message, match, timeout)
+            if result is not _RESEND:
+                return result
+
+    async def _send(self, key, devnumber, request_data: bytes, long_message: bool, match, timeout: float):
+        async with self._in_flight:
+            future = self.loop.create_future()
+            waiter = (key, match, future)
+            self._waiting.append(waiter)
+            try:
+                base.write(self.handle, devnumber, request_data, long_message)
+                return await asyncio.wait_for(future, timeout)
+            except asyncio.TimeoutError:
+                self._timed_out(key)
+                raise
+            finally:
+                if waiter in self._waiting:
+                    self._waiting.remove(waiter)
+
+    def _timed_out(self, key):
+        """As the software ID is fixed, a late reply to a request that timed out would be taken for the reply
+        to the next request with the same ID, so from now on those requests are made one at a time,
+        and those that are waiting are made again."""
+        self._serial.setdefault(key, asyncio.Lock())
+        for waiter in [w for w in self._waiting if w[0] == key]:
+            self._waiting.remove(waiter)
+            if not waiter[2].done():
+                waiter[2].set_result(_RESEND)
+
+
+def _from_device(devnumber, reply_devnumber) -> bool:
+    return reply_devnumber == devnumber or reply_devnumber == devnumber ^ 0xFF  # BT device returning 0x00
+
+
+async def request(
+    handle: AsyncHandle,
+    devnumber,
+    request_id: int,
+    *params,
+    no_reply: bool = False,
+    return_error: bool = False,
+    long_message: bool = False,
+    protocol: float = 1.0,
+):
+    """Makes a feature call to a device and waits for a matching reply, like base.request.
+    :returns: the reply data, or ``None`` if some error occurred. or no reply expected
+    """
+    assert isinstance(request_id, int)
+    request_id = base._add_sw_id(devnumber, request_id, protocol)
+    timeout = base._request_timeout(devnumber, request_id)
+    params = base._pack_params(params)
+    request_data = struct.pack("!H", request_id) + params
+
+    if no_reply:
+        base.write(handle.handle, devnumber, request_data, long_message)
+        return None
+
+    def match(report_id, reply_devnumber, reply_data):
+        if not _from_device(devnumber, reply_devnumber):
+            return base._NO_MATCH
+        return base._match_reply(handle, devnumber, request_id, params, return_error, report_id, reply_data)
+
+    try:
+        return await handle._exchange(devnumber, request_data, long_message, match, timeout)
+    except asyncio.TimeoutError:
+        logger.warning(
+            "timeout (%0.2f) on device %d request {%04X} params [%s]", timeout, devnumber, request_id, common.strhex(params)
+        )
+
+
+async def ping(handle: AsyncHandle, devnumber, long_message: bool = False):
+    """Check if a device is connected to the receiver, like base.ping.
+    :returns: The HID protocol supported by the device, as a floating point number, if the device is active.
+    """
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("(%s) pinging device %d", handle, devnumber)
+    request_id = 0x0010 | base._get_next_sw_id()
+    request_data = struct.pack("!HBBB", request_id, 0, 0, getrandbits(8))
+
+    def match(report_id, reply_devnumber, reply_data):
+        if not _from_device(devnumber, reply_devnumber):
+            return base._NO_MATCH
+        return base._match_ping_reply(handle, handle.handle, devnumber, request_data, report_id, reply_data)
+
+    try:
+        result = await handle._exchange(devnumber, request_data, long_message, match, base._PING_TIMEOUT)
+    except asyncio.TimeoutError:
+        logger.warning("(%s) timeout (%0.2f) on device %d ping", handle, base._PING_TIMEOUT, devnumber)
+        return None
+    return None if result is base._PING_UNREACHABLE else result
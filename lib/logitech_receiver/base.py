@@ -25,7 +25,9 @@ import struct
 import threading
 import typing
 
+from collections import deque
 from contextlib import contextmanager
+from enum import IntEnum
 from random import getrandbits
 from time import time
 from typing import Any
@@ -311,6 +313,7 @@ def open():
 def close(handle):
     """Closes a HID device handle."""
     if handle:
+        drop_request_timers(handle)
         try:
             if isinstance(handle, int):
                 _centurion_handles.pop(handle, None)
@@ -565,18 +568,26 @@ def _read(handle, timeout) -> tuple[int, int, bytes]:
     unloaded. The handle will be closed automatically.
     """
     ihandle = int(handle)
-    is_centurion = ihandle in _centurion_handles
-    read_size = CENTURION_FRAME_SIZE if is_centurion else _MAX_READ_SIZE
     try:
         # convert timeout to milliseconds, the hidapi expects it
         timeout = int(timeout * 1000)
-        data = hidapi.read(ihandle, read_size, timeout)
+        data = hidapi.read(ihandle, _read_size(ihandle), timeout)
     except Exception as reason:
         logger.warning("read failed, assuming handle %r no longer available", handle)
         close(handle)
         raise exceptions.NoReceiver(reason=reason) from reason
+    return _unpack(handle, data)
+
 
-    if data and is_centurion and ord(data[:1]) in _CENTURION_REPORT_IDS:
+def _read_size(ihandle: int) -> int:
+    return CENTURION_FRAME_SIZE if ihandle in _centurion_handles else _MAX_READ_SIZE
+
+
+def _unpack(handle, data: bytes) -> tuple[int, int, bytes] | None:
+    """Split a packet read from the receiver into (report_id, devnumber, data),
+    or return `None` if it is not a HID++ or DJ message."""
+    ihandle = int(handle)
+    if data and ihandle in _centurion_handles and ord(data[:1]) in _CENTURION_REPORT_IDS:
         data = _unwrap_centurion_frame(data, ihandle, handle)
 
     if data and _is_relevant_message(data):  # ignore messages that fail check
@@ -633,12 +644,101 @@ def make_notification(report_id: int, devnumber: int, data: bytes) -> HIDPPNotif
     return None
 
 
+class RequestPriority(IntEnum):
+    INTERACTIVE = 0  # requests that the user is waiting for, e.g., changing a setting
+    NORMAL = 1
+    BACKGROUND = 2  # requests that can wait, e.g., probing settings or polling batteries
+
+
+_request_priority = threading.local()
+
+
+def current_request_priority() -> RequestPriority:
+    return getattr(_request_priority, "priority", RequestPriority.NORMAL)
+
+
+@contextmanager
+def request_priority(priority: RequestPriority):
+    """Make the requests of this thread with a priority, see RequestScheduler."""
+    previous = current_request_priority()
+    _request_priority.priority = priority
+    try:
+        yield
+    finally:
+        _request_priority.priority = previous
+
+
+class RequestScheduler:
+    """A lock for the requests on a handle, given to waiting threads by the priority of their requests
+    and in order of arrival for the same priority, so interactive requests go ahead of background ones.
+    Keeps the number, total, and maximum of the times waited for the lock by priority."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._busy = False
+        self._waiting = {priority: deque() for priority in RequestPriority}
+        self._waits = {priority: [0, 0.0, 0.0] for priority in RequestPriority}
+
+    def acquire(self, blocking=True, timeout=-1) -> bool:
+        priority = current_request_priority()
+        started = time()
+        with self._lock:
+            if not self._busy:
+                self._busy = True
+                self._waited(priority, 0.0)
+                return True
+            if not blocking:
+                return False
+            waiter = threading.Lock()
+            waiter.acquire()
+            self._waiting[priority].append(waiter)
+        acquired = waiter.acquire(timeout=timeout)  # released by release when it is this thread's turn
+        with self._lock:
+            if not acquired:
+                try:
+                    self._waiting[priority].remove(waiter)
+                except ValueError:  # given the lock just after timing out
+                    acquired = True
+            if acquired:
+                self._waited(priority, time() - started)
+        return acquired
+
+    def release(self):
+        with self._lock:
+            for waiting in self._waiting.values():
+                if waiting:
+                    waiting.popleft().release()  # the lock stays busy, passed on to the waiting thread
+                    return
+            self._busy = False
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *_args):
+        self.release()
+
+    def _waited(self, priority, wait):
+        waits = self._waits[priority]
+        waits[0] += 1
+        waits[1] += wait
+        waits[2] = max(waits[2], wait)
+
+    def wait_times(self) -> dict[str, dict[str, float]]:
+        """For each priority, how many times the lock was acquired, and the mean and maximum waits in seconds."""
+        with self._lock:
+            return {
+                priority.name.lower(): {"count": count, "mean": total / count if count else 0.0, "max": longest}
+                for priority, (count, total, longest) in self._waits.items()
+            }
+
+
 def handle_lock(handle):
     with request_lock:
         if handles_lock.get(handle) is None:
             if logger.isEnabledFor(logging.INFO):
                 logger.info("New lock %s", repr(handle))
-            handles_lock[handle] = threading.Lock()  # Serialize requests on the handle
+            handles_lock[handle] = RequestScheduler()  # Serialize requests on the handle
     return handles_lock[handle]
 
 
@@ -668,6 +768,189 @@ def find_paired_node_wpid(receiver_path: str, index: int):
     return hidapi.find_paired_node_wpid(receiver_path, index)
 
 
+def _pack_params(params) -> bytes:
+    return b"".join(struct.pack("B", p) if isinstance(p, int) else p for p in params) if params else b""
+
+
+def _add_sw_id(devnumber, request_id: int, protocol: float) -> int:
+    if (devnumber != 0xFF or protocol >= 2.0) and request_id < 0x8000:
+        # Always set the most significant bit (8) in SoftwareId,
+        # to make notifications easier to distinguish from request replies.
+        # This only applies to peripheral requests, ofc.
+        sw_id = _get_next_sw_id()
+        request_id = (request_id & 0xFFF0) | sw_id  # was 0x08 | getrandbits(3)
+    return request_id
+
+
+def _request_timeout(devnumber, request_id: int) -> float:
+    timeout = _RECEIVER_REQUEST_TIMEOUT if devnumber == 0xFF else _DEVICE_REQUEST_TIMEOUT
+    # be extra patient on long register read
+    if request_id & 0xFF00 == 0x8300:
+        timeout *= 2
+    return timeout
+
+
+class RequestTimer:
+    """Round-trip times of requests to one device, used to set its request timeouts.
+
+    Like the TCP retransmission timeout (RFC 6298) the timeout is the smoothed round-trip time
+    plus four times its mean deviation, bounded by ``MIN_TIMEOUT`` and twice the fixed timeout.
+    Until there are enough samples the fixed timeout is used, and each timeout doubles the next one
+    until a reply arrives.
+    """
+
+    ALPHA = 1 / 8
+    BETA = 1 / 4
+    MIN_SAMPLES = 4
+    MIN_TIMEOUT = 1.0  # in seconds, wireless devices can be slow to answer when waking up
+
+    __slots__ = ("srtt", "rttvar", "samples", "timeouts", "_backoff")
+
+    def __init__(self):
+        self.srtt = None
+        self.rttvar = None
+        self.samples = 0
+        self.timeouts = 0
+        self._backoff = 1
+
+    def timeout(self, default: float) -> float:
+        """The timeout to use for a request whose fixed timeout is default."""
+        if not adaptive_timeouts or self.samples < self.MIN_SAMPLES:
+            return default
+        timeout = max(self.srtt + 4 * self.rttvar, min(self.MIN_TIMEOUT, default)) * self._backoff
+        return min(timeout, 2 * default)
+
+    def sample(self, rtt: float):
+        if self.srtt is None:
+            self.srtt, self.rttvar = rtt, rtt / 2
+        else:
+            self.rttvar += self.BETA * (abs(self.srtt - rtt) - self.rttvar)
+            self.srtt += self.ALPHA * (rtt - self.srtt)
+        self.samples += 1
+        self._backoff = 1
+
+    def timed_out(self):
+        self.timeouts += 1
+        self._backoff = min(self._backoff * 2, 8)
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "srtt": self.srtt,
+            "rttvar": self.rttvar,
+            "timeout": self.timeout(_DEVICE_REQUEST_TIMEOUT),
+            "samples": self.samples,
+            "timeouts": self.timeouts,
+        }
+
+    def __str__(self):
+        srtt = f"{self.srtt * 1000:.1f}ms" if self.srtt is not None else "-"
+        return f"<RequestTimer(srtt={srtt},samples={self.samples},timeouts={self.timeouts})>"
+
+    __repr__ = __str__
+
+
+adaptive_timeouts = False  # set request timeouts from the observed round-trip times of each device
+request_timers = {}
+
+
+def request_timer(handle, devnumber, ping=False) -> RequestTimer:
+    """The round-trip time statistics of a device on a handle, kept apart for pings."""
+    key = (handle, devnumber, ping)
+    timer = request_timers.get(key)
+    if timer is None:
+        with request_lock:
+            timer = request_timers.setdefault(key, RequestTimer())
+    return timer
+
+
+def drop_request_timers(handle):
+    """Forget the round-trip times on a handle that is closed, as its number can be reused."""
+    with request_lock:
+        for key in [k for k in request_timers if k[0] is handle or k[0] == handle]:
+            del request_timers[key]
+
+
+_NO_MATCH = object()  # sentinel, a reply that is not for the request being matched
+
+
+def _match_reply(handle, devnumber, request_id: int, params: bytes, return_error, report_id, reply_data):
+    """Check whether a reply from the right device answers a request.
+
+    :returns: the reply data, an error code or ``None`` on a HID++ 1.0 error,
+    or ``_NO_MATCH`` if the reply is for something else.
+
+    :raises FeatureCallError: if the reply is a HID++ 2.0 error for the request.
+    """
+    request_data = struct.pack("!H", request_id)
+    if report_id == HIDPP_SHORT_MESSAGE_ID and reply_data[:1] == b"\x8f" and reply_data[1:3] == request_data:
+        error = ord(reply_data[3:4])
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "(%s) device 0x%02X error on request {%04X}: %d = %s",
+                handle,
+                devnumber,
+                request_id,
+                error,
+                Hidpp10ErrorCode(error),
+            )
+        return Hidpp10ErrorCode(error) if return_error else None
+    if reply_data[:1] == b"\xff" and reply_data[1:3] == request_data:
+        # a HID++ 2.0 feature call returned with an error
+        error = ord(reply_data[3:4])
+        try:
+            error_name = Hidpp20ErrorCode(error)
+        except ValueError:
+            error_name = f"unknown:{error:02X}"
+        logger.error(
+            "(%s) device %d error on feature request {%04X}: %d = %s",
+            handle,
+            devnumber,
+            request_id,
+            error,
+            error_name,
+        )
+        raise exceptions.FeatureCallError(number=devnumber, request=request_id, error=error, params=params)
+    if reply_data[:2] == request_data:
+        if devnumber == 0xFF and (request_id == 0x83B5 or request_id == 0x81F1):
+            # these replies have to match the first parameter as well
+            # if not, it is not matching this request, and certainly not a notification
+            return reply_data[2:] if reply_data[2:3] == params[:1] else _NO_MATCH
+        return reply_data[2:]
+    return _NO_MATCH
+
+
+_PING_UNREACHABLE = object()  # ping reply from a device that is not reachable
+
+
+def _match_ping_reply(handle, ihandle, devnumber, request_data: bytes, report_id, reply_data):
+    """Check whether a reply from the right device answers a ping.
+
+    :returns: the HID++ protocol of the device, ``_PING_UNREACHABLE`` if the device can't be reached,
+    or ``_NO_MATCH`` if the reply is for something else.
+
+    :raises NoSuchDevice: if there is no device with that number.
+    """
+    is_centurion = ihandle in _centurion_handles
+    mark_ok = is_centurion or reply_data[4:5] == request_data[-1:]
+    if reply_data[:2] == request_data[:2] and mark_ok:
+        # HID++ 2.0+ device, currently connected
+        major = ord(reply_data[2:3])
+        minor = ord(reply_data[3:4])
+        if is_centurion:
+            _centurion_handles[ihandle].protocol_version = (major, minor)
+        return major + minor / 10.0
+    if report_id == HIDPP_SHORT_MESSAGE_ID and reply_data[:1] == b"\x8f" and reply_data[1:3] == request_data[:2]:
+        error = ord(reply_data[3:4])
+        if error == Hidpp10ErrorCode.INVALID_SUB_ID_COMMAND:
+            return 1.0  # a valid reply from a HID++ 1.0 device
+        if error in [Hidpp10ErrorCode.RESOURCE_ERROR, Hidpp10ErrorCode.CONNECTION_REQUEST_FAILED]:
+            return _PING_UNREACHABLE
+        if error == Hidpp10ErrorCode.UNKNOWN_DEVICE:  # no device with that number currently accessible
+            logger.info("(%s) device %d error on ping request: unknown device", handle, devnumber)
+            raise exceptions.NoSuchDevice(number=devnumber, request=struct.unpack("!H", request_data[:2])[0])
+    return _NO_MATCH
+
+
 # a very few requests (e.g., host switching) do not expect a reply, but use no_reply=True with extreme caution
 def request(
     handle,
@@ -688,22 +971,11 @@ def request(
     """
     with acquire_timeout(handle_lock(handle), handle, 10.0):
         assert isinstance(request_id, int)
-        if (devnumber != 0xFF or protocol >= 2.0) and request_id < 0x8000:
-            # Always set the most significant bit (8) in SoftwareId,
-            # to make notifications easier to distinguish from request replies.
-            # This only applies to peripheral requests, ofc.
-            sw_id = _get_next_sw_id()
-            request_id = (request_id & 0xFFF0) | sw_id  # was 0x08 | getrandbits(3)
-
-        timeout = _RECEIVER_REQUEST_TIMEOUT if devnumber == 0xFF else _DEVICE_REQUEST_TIMEOUT
-        # be extra patient on long register read
-        if request_id & 0xFF00 == 0x8300:
-            timeout *= 2
-
-        if params:
-            params = b"".join(struct.pack("B", p) if isinstance(p, int) else p for p in params)
-        else:
-            params = b""
+        request_id = _add_sw_id(devnumber, request_id, protocol)
+        timer = request_timer(handle, devnumber)
+        timeout = timer.timeout(_request_timeout(devnumber, request_id))
+
+        params = _pack_params(params)
         request_data = struct.pack("!H", request_id) + params
 
         ihandle = int(handle)
@@ -719,7 +991,7 @@ def request(
             return None
 
         # we consider timeout from this point
-        request_started = time()
+        request_started = written = time()
         delta = 0
 
         while delta < timeout:
@@ -727,58 +999,14 @@ def request(
             if reply:
                 report_id, reply_devnumber, reply_data = reply
                 if reply_devnumber == devnumber or reply_devnumber == devnumber ^ 0xFF:  # BT device returning 0x00
-                    if (
-                        report_id == HIDPP_SHORT_MESSAGE_ID
-                        and reply_data[:1] == b"\x8f"
-                        and reply_data[1:3] == request_data[:2]
-                    ):
-                        error = ord(reply_data[3:4])
-
-                        if logger.isEnabledFor(logging.DEBUG):
-                            logger.debug(
-                                "(%s) device 0x%02X error on request {%04X}: %d = %s",
-                                handle,
-                                devnumber,
-                                request_id,
-                                error,
-                                Hidpp10ErrorCode(error),
-                            )
-                        return Hidpp10ErrorCode(error) if return_error else None
-                    if reply_data[:1] == b"\xff" and reply_data[1:3] == request_data[:2]:
-                        # a HID++ 2.0 feature call returned with an error
-                        error = ord(reply_data[3:4])
-                        try:
-                            error_name = Hidpp20ErrorCode(error)
-                        except ValueError:
-                            error_name = f"unknown:{error:02X}"
-                        logger.error(
-                            "(%s) device %d error on feature request {%04X}: %d = %s",
-                            handle,
-                            devnumber,
-                            request_id,
-                            error,
-                            error_name,
-                        )
-                        raise exceptions.FeatureCallError(
-                            number=devnumber,
-                            request=request_id,
-                            error=error,
-                            params=params,
-                        )
-
-                    if reply_data[:2] == request_data[:2]:
-                        if devnumber == 0xFF:
-                            if request_id == 0x83B5 or request_id == 0x81F1:
-                                # these replies have to match the first parameter as well
-                                if reply_data[2:3] == params[:1]:
-                                    return reply_data[2:]
-                                else:
-                                    # hm, not matching my request, and certainly not a notification
-                                    continue
-                            else:
-                                return reply_data[2:]
-                        else:
-                            return reply_data[2:]
+                    try:
+                        result = _match_reply(handle, devnumber, request_id, params, return_error, report_id, reply_data)
+                    except exceptions.FeatureCallError:
+                        timer.sample(time() - written)  # the device did answer
+                        raise
+                    if result is not _NO_MATCH:
+                        timer.sample(time() - written)
+                        return result
                 else:
                     # a reply was received, but did not match our request in any way
                     # reset the timeout starting point
@@ -790,6 +1018,7 @@ def request(
                         notifications_hook(n)
             delta = time() - request_started
 
+        timer.timed_out()
         logger.warning(
             "timeout (%0.2f/%0.2f) on device %d request {%04X} params [%s]",
             delta,
@@ -801,6 +1030,203 @@ def request(
         # raise DeviceUnreachable(number=devnumber, request=request_id)
 
 
+# how many requests a pipeline keeps in flight on one handle
+# receivers queue a few requests per device, more than that risks dropped requests
+PIPELINE_DEPTH = 4
+
+
+class PendingReply:
+    """The future reply to a request submitted to a RequestPipeline."""
+
+    __slots__ = (
+        "pipeline",
+        "devnumber",
+        "request_id",
+        "params",
+        "return_error",
+        "written",
+        "deadline",
+        "_done",
+        "_result",
+        "_error",
+    )
+
+    def __init__(self, pipeline, devnumber, request_id: int, params: bytes, return_error: bool):
+        self.pipeline = pipeline
+        self.devnumber = devnumber
+        self.request_id = request_id
+        self.params = params
+        self.return_error = return_error
+        self.written = None  # set when the request is written
+        self.deadline = None
+        self._done = False
+        self._result = None
+        self._error = None
+
+    def done(self) -> bool:
+        return self._done
+
+    def set_result(self, result):
+        self._done, self._result = True, result
+
+    def set_error(self, error: Exception):
+        self._done, self._error = True, error
+
+    def result(self):
+        """The reply data, or ``None``, as ``request`` would return it.
+        Flushes the pipeline if the reply has not arrived yet.
+
+        :raises FeatureCallError: if the device replied with a HID++ 2.0 error.
+        """
+        if not self._done:
+            self.pipeline.flush()
+        if self._error is not None:
+            raise self._error
+        return self._result
+
+    def __str__(self):
+        return f"<PendingReply({self.devnumber},{self.request_id:04X},{common.strhex(self.params)})>"
+
+    __repr__ = __str__
+
+
+class RequestPipeline:
+    """Several requests in flight at once on one handle.
+
+    Requests are queued by ``submit``, then ``flush`` writes them back to back,
+    keeping up to ``depth`` of them outstanding, and routes each reply to its
+    request by device number, feature index, function and software ID.
+    Replies to identical requests are assumed to come back in order.
+    As the software ID is fixed, a late reply to a request that timed out would be taken for the reply
+    to the next request with the same ID, so those requests are instead made one at a time by ``request``.
+    """
+
+    def __init__(self, handle, long_message: bool = False, protocol: float = 1.0, depth: int = PIPELINE_DEPTH):
+        assert depth > 0
+        self.handle = handle
+        self.long_message = long_message
+        self.protocol = protocol
+        self.depth = depth
+        self._queued = []
+        self._lock = threading.Lock()
+
+    def submit(self, devnumber, request_id: int, *params, return_error: bool = False) -> PendingReply:
+        """Queue a request, returning its future reply."""
+        assert isinstance(request_id, int)
+        request_id = _add_sw_id(devnumber, request_id, self.protocol)
+        pending = PendingReply(self, devnumber, request_id, _pack_params(params), return_error)
+        with self._lock:
+            self._queued.append(pending)
+        return pending
+
+    def __len__(self):
+        return len(self._queued)
+
+    def flush(self):
+        """Send all queued requests and wait for their replies or timeouts."""
+        with self._lock:
+            queued, self._queued = self._queued, []
+        if not queued:
+            return
+        handle = self.handle
+        resend = []
+        with acquire_timeout(handle_lock(handle), handle, 10.0):
+            ihandle = int(handle)
+            notifications_hook = getattr(handle, "notifications_hook", None)
+            try:
+                _read_input_buffer(handle, ihandle, notifications_hook)
+                resend = self._run(handle, ihandle, queued, notifications_hook)
+            except exceptions.NoReceiver:
+                logger.warning("device or receiver disconnected")
+        for pending in resend:
+            if not self._resend(handle, pending):
+                break
+        for pending in queued:
+            if not pending.done():
+                pending.set_result(None)
+
+    def _resend(self, handle, pending) -> bool:
+        try:
+            reply = request(
+                handle,
+                pending.devnumber,
+                pending.request_id,
+                pending.params,
+                return_error=pending.return_error,
+                long_message=self.long_message,
+                protocol=self.protocol,
+            )
+        except exceptions.FeatureCallError as e:
+            pending.set_error(e)
+        except exceptions.NoReceiver:
+            logger.warning("device or receiver disconnected")
+            return False
+        else:
+            pending.set_result(reply)
+        return True
+
+    def _run(self, handle, ihandle, queued, notifications_hook) -> list[PendingReply]:
+        """Make the queued requests, returning those that have to be made one at a time after a timeout."""
+        unsent = list(queued)
+        in_flight = []
+        resend = []
+        while unsent or in_flight:
+            while unsent and len(in_flight) < self.depth:
+                pending = unsent.pop(0)
+                write(ihandle, pending.devnumber, struct.pack("!H", pending.request_id) + pending.params, self.long_message)
+                timer = request_timer(handle, pending.devnumber)
+                pending.written = time()
+                pending.deadline = pending.written + timer.timeout(_request_timeout(pending.devnumber, pending.request_id))
+                in_flight.append(pending)
+
+            now = time()
+            timed_out = [p for p in in_flight if p.deadline <= now]
+            for pending in timed_out:
+                logger.warning(
+                    "timeout on device %d pipelined request {%04X} params [%s]",
+                    pending.devnumber,
+                    pending.request_id,
+                    common.strhex(pending.params),
+                )
+                pending.set_result(None)
+                request_timer(handle, pending.devnumber).timed_out()
+                in_flight.remove(pending)
+            if timed_out:  # a late reply could be taken for the reply to any request with the same ID
+                ids = {(p.devnumber, p.request_id) for p in timed_out}
+                for requests in (in_flight, unsent):
+                    resend.extend(p for p in requests if (p.devnumber, p.request_id) in ids)
+                    requests[:] = [p for p in requests if (p.devnumber, p.request_id) not in ids]
+            if not in_flight:
+                continue
+
+            reply = _read(handle, max(min(p.deadline for p in in_flight) - now, 0))
+            if reply and not self._route(handle, in_flight, *reply) and notifications_hook:
+                n = make_notification(*reply)
+                if n:
+                    notifications_hook(n)
+        return resend
+
+    @staticmethod
+    def _route(handle, in_flight, report_id, reply_devnumber, reply_data) -> bool:
+        """Resolve the oldest in-flight request answered by a reply, if any."""
+        for pending in in_flight:
+            devnumber = pending.devnumber
+            if reply_devnumber == devnumber or reply_devnumber == devnumber ^ 0xFF:  # BT device returning 0x00
+                request_id, params = pending.request_id, pending.params
+                try:
+                    result = _match_reply(handle, devnumber, request_id, params, pending.return_error, report_id, reply_data)
+                except exceptions.FeatureCallError as e:
+                    pending.set_error(e)
+                else:
+                    if result is _NO_MATCH:
+                        continue
+                    pending.set_result(result)
+                request_timer(handle, devnumber).sample(time() - pending.written)
+                in_flight.remove(pending)
+                return True
+        return False
+
+
 def ping(handle, devnumber, long_message: bool = False):
     """Check if a device is connected to the receiver.
     :returns: The HID protocol supported by the device, as a floating point number, if the device is active.
@@ -821,37 +1247,21 @@ def ping(handle, devnumber, long_message: bool = False):
         request_data = struct.pack("!HBBB", request_id, 0, 0, getrandbits(8))
         write(int(handle), devnumber, request_data, long_message)
 
+        timer = request_timer(handle, devnumber, ping=True)
+        timeout = timer.timeout(_PING_TIMEOUT)
         request_started = time()  # we consider timeout from this point
         delta = 0
-        while delta < _PING_TIMEOUT:
-            reply = _read(handle, _PING_TIMEOUT)
+        while delta < timeout:
+            reply = _read(handle, timeout)
             if reply:
                 report_id, reply_devnumber, reply_data = reply
                 if reply_devnumber == devnumber or reply_devnumber == devnumber ^ 0xFF:  # BT device returning 0x00
-                    is_centurion = int(handle) in _centurion_handles
-                    mark_ok = is_centurion or reply_data[4:5] == request_data[-1:]
-                    if reply_data[:2] == request_data[:2] and mark_ok:
-                        # HID++ 2.0+ device, currently connected
-                        major = ord(reply_data[2:3])
-                        minor = ord(reply_data[3:4])
-                        if is_centurion:
-                            _centurion_handles[int(handle)].protocol_version = (major, minor)
-                        return major + minor / 10.0
-
-                    if (
-                        report_id == HIDPP_SHORT_MESSAGE_ID
-                        and reply_data[:1] == b"\x8f"
-                        and reply_data[1:3] == request_data[:2]
-                    ):  # error response
-                        error = ord(reply_data[3:4])
-                        if error == Hidpp10ErrorCode.INVALID_SUB_ID_COMMAND:
-                            # a valid reply from a HID++ 1.0 device
-                            return 1.0
-                        if error in [Hidpp10ErrorCode.RESOURCE_ERROR, Hidpp10ErrorCode.CONNECTION_REQUEST_FAILED]:
-                            return  # device unreachable
-                        if error == Hidpp10ErrorCode.UNKNOWN_DEVICE:  # no device with that number currently accessible
-                            logger.info("(%s) device %d error on ping request: unknown device", handle, devnumber)
-                            raise exceptions.NoSuchDevice(number=devnumber, request=request_id)
+                    result = _match_ping_reply(handle, int(handle), devnumber, request_data, report_id, reply_data)
+                    if result is _PING_UNREACHABLE:
+                        return  # device unreachable
+                    if result is not _NO_MATCH:
+                        timer.sample(time() - request_started)
+                        return result
 
                 if notifications_hook:
                     n = make_notification(report_id, reply_devnumber, reply_data)
@@ -860,7 +1270,8 @@ def ping(handle, devnumber, long_message: bool = False):
 
             delta = time() - request_started
 
-        logger.warning("(%s) timeout (%0.2f/%0.2f) on device %d ping", handle, delta, _PING_TIMEOUT, devnumber)
+        timer.timed_out()
+        logger.warning("(%s) timeout (%0.2f/%0.2f) on device %d ping", handle, delta, timeout, devnumber)
 
 
 def _read_input_buffer(handle, ihandle, notifications_hook):
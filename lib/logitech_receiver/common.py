@@ -18,6 +18,10 @@ from __future__ import annotations
 
 import binascii
 import dataclasses
+import hashlib
+import logging
+import os
+import pickle
 import typing
 
 from enum import Flag
@@ -29,282 +33,42 @@ from typing import Union
 
 import yaml
 
+from solaar import __version__
 from solaar.i18n import _
 
 if typing.TYPE_CHECKING:
     from logitech_receiver.hidpp20_constants import FirmwareKind
 
+logger = logging.getLogger(__name__)
+
 LOGITECH_VENDOR_ID = 0x046D
 
 
-def crc16(data: bytes):
-    """
-    CRC-16 (CCITT) implemented with a precomputed lookup table
+CRC16_INIT = 0xFFFF
+
+
+def crc16(data: bytes, crc: int = CRC16_INIT) -> int:
+    """CRC-16 (CCITT, polynomial 0x1021) of data, continuing from a previous crc value if given.
+
+    binascii.crc_hqx is the same table-driven CRC, implemented in C.
     """
-    table = [
-        0x0000,
-        0x1021,
-        0x2042,
-        0x3063,
-        0x4084,
-        0x50A5,
-        0x60C6,
-        0x70E7,
-        0x8108,
-        0x9129,
-        0xA14A,
-        0xB16B,
-        0xC18C,
-        0xD1AD,
-        0xE1CE,
-        0xF1EF,
-        0x1231,
-        0x0210,
-        0x3273,
-        0x2252,
-        0x52B5,
-        0x4294,
-        0x72F7,
-        0x62D6,
-        0x9339,
-        0x8318,
-        0xB37B,
-        0xA35A,
-        0xD3BD,
-        0xC39C,
-        0xF3FF,
-        0xE3DE,
-        0x2462,
-        0x3443,
-        0x0420,
-        0x1401,
-        0x64E6,
-        0x74C7,
-        0x44A4,
-        0x5485,
-        0xA56A,
-        0xB54B,
-        0x8528,
-        0x9509,
-        0xE5EE,
-        0xF5CF,
-        0xC5AC,
-        0xD58D,
-        0x3653,
-        0x2672,
-        0x1611,
-        0x0630,
-        0x76D7,
-        0x66F6,
-        0x5695,
-        0x46B4,
-        0xB75B,
-        0xA77A,
-        0x9719,
-        0x8738,
-        0xF7DF,
-        0xE7FE,
-        0xD79D,
-        0xC7BC,
-        0x48C4,
-        0x58E5,
-        0x6886,
-        0x78A7,
-        0x0840,
-        0x1861,
-        0x2802,
-        0x3823,
-        0xC9CC,
-        0xD9ED,
-        0xE98E,
-        0xF9AF,
-        0x8948,
-        0x9969,
-        0xA90A,
-        0xB92B,
-        0x5AF5,
-        0x4AD4,
-        0x7AB7,
-        0x6A96,
-        0x1A71,
-        0x0A50,
-        0x3A33,
-        0x2A12,
-        0xDBFD,
-        0xCBDC,
-        0xFBBF,
-        0xEB9E,
-        0x9B79,
-        0x8B58,
-        0xBB3B,
-        0xAB1A,
-        0x6CA6,
-        0x7C87,
-        0x4CE4,
-        0x5CC5,
-        0x2C22,
-        0x3C03,
-        0x0C60,
-        0x1C41,
-        0xEDAE,
-        0xFD8F,
-        0xCDEC,
-        0xDDCD,
-        0xAD2A,
-        0xBD0B,
-        0x8D68,
-        0x9D49,
-        0x7E97,
-        0x6EB6,
-        0x5ED5,
-        0x4EF4,
-        0x3E13,
-        0x2E32,
-        0x1E51,
-        0x0E70,
-        0xFF9F,
-        0xEFBE,
-        0xDFDD,
-        0xCFFC,
-        0xBF1B,
-        0xAF3A,
-        0x9F59,
-        0x8F78,
-        0x9188,
-        0x81A9,
-        0xB1CA,
-        0xA1EB,
-        0xD10C,
-        0xC12D,
-        0xF14E,
-        0xE16F,
-        0x1080,
-        0x00A1,
-        0x30C2,
-        0x20E3,
-        0x5004,
-        0x4025,
-        0x7046,
-        0x6067,
-        0x83B9,
-        0x9398,
-        0xA3FB,
-        0xB3DA,
-        0xC33D,
-        0xD31C,
-        0xE37F,
-        0xF35E,
-        0x02B1,
-        0x1290,
-        0x22F3,
-        0x32D2,
-        0x4235,
-        0x5214,
-        0x6277,
-        0x7256,
-        0xB5EA,
-        0xA5CB,
-        0x95A8,
-        0x8589,
-        0xF56E,
-        0xE54F,
-        0xD52C,
-        0xC50D,
-        0x34E2,
-        0x24C3,
-        0x14A0,
-        0x0481,
-        0x7466,
-        0x6447,
-        0x5424,
-        0x4405,
-        0xA7DB,
-        0xB7FA,
-        0x8799,
-        0x97B8,
-        0xE75F,
-        0xF77E,
-        0xC71D,
-        0xD73C,
-        0x26D3,
-        0x36F2,
-        0x0691,
-        0x16B0,
-        0x6657,
-        0x7676,
-        0x4615,
-        0x5634,
-        0xD94C,
-        0xC96D,
-        0xF90E,
-        0xE92F,
-        0x99C8,
-        0x89E9,
-        0xB98A,
-        0xA9AB,
-        0x5844,
-        0x4865,
-        0x7806,
-        0x6827,
-        0x18C0,
-        0x08E1,
-        0x3882,
-        0x28A3,
-        0xCB7D,
-        0xDB5C,
-        0xEB3F,
-        0xFB1E,
-        0x8BF9,
-        0x9BD8,
-        0xABBB,
-        0xBB9A,
-        0x4A75,
-        0x5A54,
-        0x6A37,
-        0x7A16,
-        0x0AF1,
-        0x1AD0,
-        0x2AB3,
-        0x3A92,
-        0xFD2E,
-        0xED0F,
-        0xDD6C,
-        0xCD4D,
-        0xBDAA,
-        0xAD8B,
-        0x9DE8,
-        0x8DC9,
-        0x7C26,
-        0x6C07,
-        0x5C64,
-        0x4C45,
-        0x3CA2,
-        0x2C83,
-        0x1CE0,
-        0x0CC1,
-        0xEF1F,
-        0xFF3E,
-        0xCF5D,
-        0xDF7C,
-        0xAF9B,
-        0xBFBA,
-        0x8FD9,
-        0x9FF8,
-        0x6E17,
-        0x7E36,
-        0x4E55,
-        0x5E74,
-        0x2E93,
-        0x3EB2,
-        0x0ED1,
-        0x1EF0,
-    ]
-
-    crc = 0xFFFF
-    for byte in data:
-        crc = (crc << 8) ^ table[(crc >> 8) ^ byte]
-        crc &= 0xFFFF  # important, crc must stay 16bits all the way through
-    return crc
+    return binascii.crc_hqx(data, crc)
+
+
+class Crc16:
+    """Incremental CRC-16 (CCITT), for computing the CRC of data that arrives in pieces."""
+
+    __slots__ = ("value",)
+
+    def __init__(self, data: bytes = b""):
+        self.value = crc16(data)
+
+    def update(self, data: bytes) -> Crc16:
+        self.value = crc16(data, self.value)
+        return self
+
+    def to_bytes(self) -> bytes:
+        return self.value.to_bytes(2, "big")
 
 
 class NamedInt(int):
@@ -347,6 +111,9 @@ class NamedInt(int):
     def __repr__(self):
         return f"NamedInt({int(self)}, {self.name!r})"
 
+    def __reduce__(self):
+        return self.__class__, (int(self), self.name)
+
     @classmethod
     def from_yaml(cls, loader, node):
         args = loader.construct_mapping(node)
@@ -361,6 +128,67 @@ yaml.SafeLoader.add_constructor("!NamedInt", NamedInt.from_yaml)
 yaml.add_representer(NamedInt, NamedInt.to_yaml)
 
 
+class _SafeLoader(getattr(yaml, "CSafeLoader", yaml.SafeLoader)):
+    """Loads like yaml.SafeLoader, with libyaml if it is available."""
+
+    def __init__(self, stream):
+        super().__init__(stream)
+        self.yaml_constructors = yaml.SafeLoader.yaml_constructors  # all constructors that have been added
+        self.yaml_multi_constructors = yaml.SafeLoader.yaml_multi_constructors
+
+
+# Keep snapshots of the parsed contents of YAML files, so that files that have not changed load without parsing.
+yaml_snapshots = True
+_XDG_CACHE_HOME = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser(os.path.join("~", ".cache"))
+yaml_snapshots_dir = os.path.join(_XDG_CACHE_HOME, "solaar", "snapshots")
+_YAML_SNAPSHOT_VERSION = 1
+
+
+def load_yaml(path: str, all_documents: bool = False):
+    """Load a YAML file safely, or all the documents in it as a list.
+    Uses a snapshot of the parsed contents when the file has not changed since the snapshot was taken."""
+    path = os.path.abspath(path)
+    stat = os.stat(path)
+    key = (_YAML_SNAPSHOT_VERSION, __version__, path, all_documents, stat.st_mtime_ns, stat.st_size)
+    snapshot_path = os.path.join(yaml_snapshots_dir, hashlib.sha256(path.encode()).hexdigest()[:32])
+    if yaml_snapshots:
+        try:
+            with open(snapshot_path, "rb") as snapshot_file:
+                snapshot_key, data = pickle.load(snapshot_file)
+            if snapshot_key == key:
+                return data
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.warning("ignoring snapshot %s of %s: %s", snapshot_path, path, e)
+    with open(path) as yaml_file:
+        text = yaml_file.read()
+    stripped = text.lstrip()
+    if stripped.startswith("%YAML 1.3\n"):  # libyaml only accepts YAML versions 1.1 and 1.2, 1.3 makes no difference
+        stripped = stripped[len("%YAML 1.3\n") :]
+    try:
+        data = _load_yaml_text(stripped, all_documents, _SafeLoader)
+    except yaml.YAMLError:  # libyaml is stricter in other ways as well
+        if not yaml.__with_libyaml__:
+            raise
+        data = _load_yaml_text(text, all_documents, yaml.SafeLoader)
+    if yaml_snapshots:
+        try:
+            os.makedirs(yaml_snapshots_dir, exist_ok=True)
+            snapshot = pickle.dumps((key, data), pickle.HIGHEST_PROTOCOL)
+            pickle.loads(snapshot)  # don't save a snapshot that can't be loaded back
+            with open(snapshot_path + ".tmp", "wb") as snapshot_file:
+                snapshot_file.write(snapshot)
+            os.replace(snapshot_path + ".tmp", snapshot_path)
+        except Exception as e:
+            logger.warning("failed to save snapshot %s of %s: %s", snapshot_path, path, e)
+    return data
+
+
+def _load_yaml_text(text: str, all_documents: bool, loader):
+    return list(yaml.load_all(text, Loader=loader)) if all_documents else yaml.load(text, Loader=loader)
+
+
 class ColorInt(int):
     """A 24-bit RGB color (``0x000000``-``0xFFFFFF``) as an int subclass.
 
@@ -24,6 +24,8 @@ import threading
 import time
 import typing
 
+from concurrent.futures import Future
+from contextlib import contextmanager
 from typing import Callable
 from typing import Optional
 from typing import Protocol
@@ -41,6 +43,8 @@ from . import settings_templates
 from .common import Alert
 from .common import Battery
 from .common import BatteryStatus
+from .common import FirmwareInfo
+from .common import FirmwareKind
 from .common import _read_usb_product_string
 from .hidpp10_constants import NotificationFlag
 from .hidpp20_constants import SupportedFeature
@@ -178,6 +182,13 @@ class Device:
         self._persister_lock = threading.Lock()
         self._simple_lock = threading.Lock()
         self._notification_handlers = {}  # See `add_notification_handler`
+        self._feature_batches = {}  # active feature batches, by thread, see `feature_batch`
+        self._reads_lock = threading.Lock()
+        self._reads_in_flight = {}  # read-only feature calls being made, see `_shared_feature_read`
+        self._reads_cached = {}  # time and reply of read-only feature calls whose replies can be reused
+        self._identity = None  # identity snapshot restored from the configuration, see `_restore_identity`
+        self._identity_checked = False
+        self._firmware_read = False  # whether the firmware was read from the device, not restored from its snapshot
         self.cleanups = []  # functions to run on the device when it is closed
 
         if not self.path:
@@ -234,6 +245,9 @@ class Device:
         else:
             self.features = hidpp20.FeaturesArray(self)  # may be a 2.0 device; if not, it will fix itself later
 
+        if receiver and not self.centurion:
+            self._restore_identity()
+
         Device.instances.append(self)
 
     def find(self, id):  # find a device by serial number or unit ID or name or codename
@@ -293,6 +307,82 @@ class Device:
                         self._name = _hidpp20.get_name(self)
         return self._name or self._codename or f"Unknown device {self.wpid or self.product_id}"
 
+    def _restore_identity(self):
+        """Fill in name, kind, firmware, and ids from the snapshot saved when the device was last seen."""
+        snapshot = configuration.identity(self.wpid, self._serial)
+        if not snapshot:
+            return
+        try:
+            self._name = self._name or snapshot["name"]
+            self._codename = self._codename or snapshot["codename"]
+            self._kind = self._kind or (hidpp10_constants.DEVICE_KIND[snapshot["kind"]] if snapshot["kind"] else None)
+            self._unitId = snapshot["unitId"]
+            self._modelId = snapshot["modelId"]
+            self._tid_map = snapshot["tid_map"]
+            self._firmware = tuple(
+                FirmwareInfo(FirmwareKind(kind), name, version, bytes.fromhex(extras) if extras else None)
+                for kind, name, version, extras in snapshot["firmware"]
+            )
+            self._identity = snapshot
+        except Exception as e:
+            logger.warning("%s: ignoring saved identity %s: %s", self, snapshot, e)
+
+    def _read_firmware(self):
+        """The firmware of the device as read from it, as the firmware in a restored snapshot can be out of date."""
+        if not self._firmware_read and self.online:
+            firmware = _hidpp20.get_firmware(self)
+            if firmware and not self._firmware_read:
+                old_firmware, self._firmware, self._firmware_read = self._firmware, firmware, True
+                if old_firmware and firmware != old_firmware:
+                    self._firmware_changed(old_firmware)
+        return self._firmware if self._firmware_read else None
+
+    def _firmware_changed(self, old_firmware):
+        """Forget what was found out about the device, or saved for its model, under its old firmware."""
+        logger.info("%s: firmware changed from %s", self, old_firmware)
+        old_key = self._feature_table_key(self.modelId, old_firmware)
+        if old_key:
+            configuration.drop_feature_tables(old_key)
+        if isinstance(self.features, hidpp20.FeaturesArray):
+            self.features = hidpp20.FeaturesArray(self)
+        self._keys = self._remap_keys = None
+        self._profile_sectors = {}
+
+    def _save_identity(self):
+        """Save an identity snapshot of the device, refreshing it if the firmware has changed since it was saved."""
+        try:
+            firmware = self._read_firmware()
+        except Exception as e:
+            logger.warning("%s: failed to read firmware: %s", self, e)
+            return
+        if not firmware:
+            return
+        saved_firmware = [[int(fw.kind), fw.name, fw.version, fw.extras.hex() if fw.extras else None] for fw in firmware]
+        if self._identity and self._identity["firmware"] == saved_firmware:
+            return
+        if self._identity:  # with new firmware anything else might have changed as well
+            logger.info("%s: firmware changed from %s, refreshing identity", self, self._identity["firmware"])
+            self._name = self.descriptor.name if self.descriptor else None
+            self._codename = self.descriptor.codename if self.descriptor else None
+            self._unitId = self._modelId = self._tid_map = None
+        self._identity = {
+            "name": self.name,
+            "codename": self.codename,
+            "kind": str(self._kind) if self._kind else None,
+            "unitId": self.unitId,
+            "modelId": self.modelId,
+            "tid_map": self.tid_map,
+            "firmware": saved_firmware,
+        }
+        if self.persister is not None:
+            self.persister["_identity"] = self._identity
+
+    def _check_identity(self):
+        # done by the thread that found the device active, which then reports any changes
+        if not self._identity_checked and self.receiver and not self.centurion and self.protocol >= 2.0:
+            self._identity_checked = True
+            self._save_identity()
+
     def get_ids(self):
         if self.centurion:
             self._get_ids_centurion()
@@ -334,6 +424,29 @@ class Device:
             self.get_ids()
         return self._modelId
 
+    def feature_table_key(self) -> str | None:
+        """Identifies the feature table of the device, which is the same for every device of its model and firmware."""
+        if self.centurion or not self.modelId or self.modelId == "000000000000":
+            return None
+        return self._feature_table_key(self.modelId, self._read_firmware())
+
+    @staticmethod
+    def _feature_table_key(modelId, firmware) -> str | None:
+        firmware = [f"{fw.name}{fw.version}" for fw in firmware or () if fw.kind == FirmwareKind.Firmware]
+        return f"{modelId}:{'/'.join(firmware)}" if firmware else None
+
+    def load_feature_table(self, name=None):
+        """The saved feature table of the device, or another of its tables (such as its keys) if a name is given."""
+        key = self.feature_table_key()
+        if key and name:
+            key = f"{key}#{name}"
+        return configuration.feature_table(key) if key else None
+
+    def save_feature_table(self, table, name=None):
+        key = self.feature_table_key()
+        if key:
+            configuration.save_feature_table(f"{key}#{name}" if name else key, table)
+
     @property
     def tid_map(self):
         if not self._tid_map and self.online and self.protocol >= 2.0:
@@ -354,7 +467,7 @@ class Device:
             if self.centurion:
                 self._firmware = _hidpp20.get_firmware_centurion_sub(self) or _hidpp20.get_firmware_centurion(self)
             elif self.protocol >= 2.0:
-                self._firmware = _hidpp20.get_firmware(self)
+                self._read_firmware()
             else:
                 self._firmware = _hidpp10.get_firmware(self)
         return self._firmware or ()
@@ -513,10 +626,20 @@ class Device:
                     self._persister = configuration.persister(self)
         return self._persister
 
+    @classmethod
+    def attach_persisters(cls, devices):
+        """Set up the persisters of several devices, looking them all up in the configuration at once."""
+        devices = [d for d in devices if not d._persister]
+        if devices:
+            for device, persister in zip(devices, configuration.persisters(devices)):
+                with device._persister_lock:
+                    if not device._persister:
+                        device._persister = persister
+
     @property
     def settings(self):
         if not self._settings:
-            with self._settings_lock:
+            with self._settings_lock, base.request_priority(base.RequestPriority.BACKGROUND):
                 if not self._settings:
                     settings = []
                     if self.persister and self.descriptor and self.descriptor.settings:
@@ -531,7 +654,7 @@ class Device:
                                 settings.append(setting)
                     self._settings = settings
         if not self._feature_settings_checked:
-            with self._settings_lock:
+            with self._settings_lock, base.request_priority(base.RequestPriority.BACKGROUND):
                 if not self._feature_settings_checked:
                     self._feature_settings_checked = settings_templates.check_feature_settings(self, self._settings)
         return self._settings
@@ -588,7 +711,8 @@ class Device:
     # Retrieve and regularize battery status
     def read_battery(self):
         if self.online:
-            battery = self.battery()
+            with base.request_priority(base.RequestPriority.BACKGROUND):
+                battery = self.battery()
             self.set_battery_info(battery if battery is not None else Battery(None, None, None, None))
 
     def changed(self, active=None, alert=Alert.NONE, reason=None, push=False):
@@ -622,8 +746,12 @@ class Device:
                     if self.protocol < 2.0:  # Make sure to set notification flags on the device
                         self.notification_flags = self.enable_connection_notifications()
                     self.read_battery()  # battery information may have changed so try to read it now
+                    self._check_identity()
             elif was_active and self.receiver and not isinstance(self.receiver, CenturionReceiver):
                 hidpp10.set_configuration_pending_flags(self.receiver, 0xFF)
+            if not active:  # the device might be reset while offline so its settings have to be read again
+                for setting in self._settings or ():
+                    setting.invalidate(changed=False)
             if not active and self.receiver and self.battery_info is not None and self.battery_info.level is not None:
                 self.battery_info = Battery(
                     self.battery_info.level,
@@ -690,11 +818,14 @@ class Device:
                 return ret
         return None
 
+    def long_messages(self) -> bool:
+        return self.hidpp_long is True or (
+            self.hidpp_long is None and (self.bluetooth or self._protocol is not None and self._protocol >= 2.0)
+        )
+
     def request(self, request_id, *params, no_reply=False):
         if self:
-            long = self.hidpp_long is True or (
-                self.hidpp_long is None and (self.bluetooth or self._protocol is not None and self._protocol >= 2.0)
-            )
+            long = self.long_messages()
             # Centurion child: CPL framing strips devnumber and responses always
             # have devnumber=0xFF, so we must send 0xFF to match responses.
             devnumber = 0xFF if (self.centurion and self.receiver and not self.handle) else self.number
@@ -716,7 +847,94 @@ class Device:
                 self.receiver._devices if self.receiver else None,
             )
 
+    @property
+    def request_timing(self) -> base.RequestTimer | None:
+        """Round-trip time statistics of requests to this device, which set its request timeouts."""
+        handle = self.handle or (self.receiver.handle if self.receiver else None)
+        if handle:
+            devnumber = 0xFF if (self.centurion and self.receiver and not self.handle) else self.number
+            return base.request_timer(handle, devnumber)
+
+    @property
+    def request_wait_times(self) -> dict[str, dict[str, float]] | None:
+        """How long requests on the handle of this device waited for other requests, by priority."""
+        handle = self.handle or (self.receiver.handle if self.receiver else None)
+        if handle:
+            return base.handle_lock(handle).wait_times()
+
+    @contextmanager
+    def feature_batch(self):
+        """Collect feature calls made in this thread and send them together, see hidpp20.FeatureBatch.
+        Nested uses share the outermost batch."""
+        thread = threading.get_ident()
+        batch = self._feature_batches.get(thread)
+        if batch is not None:
+            yield batch
+            return
+        batch = hidpp20.FeatureBatch(self, getattr(self.low_level, "RequestPipeline", None))
+        self._feature_batches[thread] = batch
+        try:
+            yield batch
+            batch.flush()
+        finally:
+            self._feature_batches.pop(thread, None)
+
+    def _shared_feature_read(self, ttl, feature, function, params):
+        """Make a read-only feature call, sharing the request and reply with identical calls made at the same time,
+        and reusing the reply for ttl seconds."""
+        key = (feature, function, params)
+        with self._reads_lock:
+            cached = self._reads_cached.get(key)
+            if cached is not None and time.monotonic() - cached[0] < ttl:
+                return cached[1]
+            flight = self._reads_in_flight.get(key)
+            if flight is not None:
+                leader = False
+            else:
+                leader = True
+                flight = self._reads_in_flight[key] = Future()
+                started = time.monotonic()
+        if not leader:
+            return flight.result()
+        try:
+            reply = hidpp20.feature_request(self, feature, function, *params)
+        except BaseException as e:
+            with self._reads_lock:
+                if self._reads_in_flight.get(key) is flight:
+                    del self._reads_in_flight[key]
+            flight.set_exception(e)
+            raise
+        with self._reads_lock:
+            if self._reads_in_flight.get(key) is flight:  # not dropped by a write while reading
+                del self._reads_in_flight[key]
+                if ttl and reply is not None:
+                    self._reads_cached[key] = (started, reply)
+        flight.set_result(reply)
+        return reply
+
+    def _drop_feature_reads(self, feature):
+        """Stop sharing and reusing the replies of reads of a feature, as another call might change them."""
+        with self._reads_lock:
+            for reads in (self._reads_in_flight, self._reads_cached):
+                for key in [k for k in reads if k[0] == feature]:
+                    del reads[key]
+
+    def invalidate_settings(self, feature, report):
+        """A feature notification says that settings might have changed on the device, so don't use their values."""
+        for setting in self._settings or ():
+            if any(f == feature and r in (None, report) for f, r in setting.invalidated_by):
+                if logger.isEnabledFor(logging.DEBUG):
+                    logger.debug("%s: %s invalidated by %s report %s", self, setting.name, feature, report)
+                setting.invalidate()
+
     def feature_request(self, feature, function=0x00, *params, no_reply=False):
+        batches = getattr(self, "_feature_batches", None)  # not there on devices that borrow this method
+        batch = batches.get(threading.get_ident()) if batches else None
+        if batch is not None:
+            pending = None if no_reply else batch.take(feature, function, params)
+            if pending is not None:
+                return pending.result()
+            batch.invalidate(feature)
         if self.protocol >= 2.0:
             if self.centurion:
                 # Ensure sub-device features are discovered before routing decision
@@ -738,6 +956,11 @@ class Device:
                     sub_idx = self.features.get(feature)
                     if sub_idx is not None:
                         return self.centurion_bridge_request(sub_idx, function, *params, no_reply=no_reply)
+            elif getattr(self, "_reads_in_flight", None) is not None:
+                ttl = None if no_reply else hidpp20.READ_ONLY_FUNCTIONS.get((feature, function))
+                if ttl is not None:
+                    return self._shared_feature_read(ttl, feature, function, params)
+                self._drop_feature_reads(feature)
             return hidpp20.feature_request(self, feature, function, *params, no_reply=no_reply)
         if logger.isEnabledFor(logging.WARN):
             logger.warning("%s: feature request failure for device with protocol %s", self, self.protocol)
@@ -1019,9 +1242,7 @@ class Device:
             else:
                 self.online = False
             return self.online
-        long = self.hidpp_long is True or (
-            self.hidpp_long is None and (self.bluetooth or self._protocol is not None and self._protocol >= 2.0)
-        )
+        long = self.long_messages()
         handle = self.handle or self.receiver.handle
         try:
             protocol = self.low_level.ping(handle, self.number, long_message=long)
@@ -47,6 +47,7 @@ else:
     import evdev
 
 from .common import NamedInt
+from .common import load_yaml
 from .hidpp20 import SupportedFeature
 from .special_keys import CONTROL
 
@@ -449,6 +450,26 @@ MOUSE_GESTURE_TESTS = {
     "mouse-noop": [],
 }
 
+# the features that tests can be true for, only in notifications with report 0
+TEST_FEATURES = {
+    **{name: frozenset({SupportedFeature.CROWN}) for name in TESTS if name.startswith("crown_")},
+    "thumb_wheel_up": frozenset({SupportedFeature.THUMB_WHEEL}),
+    "thumb_wheel_down": frozenset({SupportedFeature.THUMB_WHEEL}),
+    "lowres_wheel_up": frozenset({SupportedFeature.LOWRES_WHEEL}),
+    "lowres_wheel_down": frozenset({SupportedFeature.LOWRES_WHEEL}),
+    "hires_wheel_up": frozenset({SupportedFeature.HIRES_WHEEL}),
+    "hires_wheel_down": frozenset({SupportedFeature.HIRES_WHEEL}),
+    "charging": frozenset(
+        {SupportedFeature.BATTERY_STATUS, SupportedFeature.BATTERY_VOLTAGE, SupportedFeature.UNIFIED_BATTERY}
+    ),
+    "False": frozenset(),
+}
+
+# the features whose notifications set key_down and key_up, see process_notification
+KEY_FEATURES = frozenset(
+    {SupportedFeature.REPROG_CONTROLS_V4, SupportedFeature.GKEY, SupportedFeature.MKEYS, SupportedFeature.MR}
+)
+
 # COMPONENTS = {}
 
 
@@ -475,6 +496,25 @@ def _evaluate(components, feature, notification: HIDPPNotification, device, resu
     return res
 
 
+def _intersect(a, b):
+    return b if a is None else a if b is None else a & b
+
+
+def _dispatch(components):
+    """The features and reports that a sequence of conditions can be true for, as for Condition.dispatch.
+    Only conditions up to the first one that is not pure count, as a rule skipped because of a later condition
+    would have stopped at that condition."""
+    features, reports = None, None
+    for component in components:
+        if not isinstance(component, Condition):
+            return features, reports, False
+        c_features, c_reports, pure = component.dispatch()
+        features, reports = _intersect(features, c_features), _intersect(reports, c_reports)
+        if not pure:
+            return features, reports, False
+    return features, reports, True
+
+
 class Rule(RuleComponent):
     def __init__(self, args, source=None, warn=True):
         self.components = [self.compile(a) for a in args]
@@ -509,6 +549,12 @@ class Condition(RuleComponent):
             logger.debug("evaluate condition: %s", self)
         return False
 
+    def dispatch(self):
+        """The features and reports (None for any) of the notifications that this condition can be true for,
+        and whether the condition is pure, i.e., it never evaluates to None and has no side effects.
+        For other notifications the condition evaluates to false without side effects."""
+        return None, None, type(self) is Condition
+
 
 class Not(Condition):
     def __init__(self, op, warn=True):
@@ -526,6 +572,9 @@ class Not(Condition):
         result = self.component.evaluate(feature, notification, device, last_result)
         return None if result is None else not result
 
+    def dispatch(self):
+        return None, None, isinstance(self.component, Condition) and self.component.dispatch()[2]
+
     def data(self):
         return {"Not": self.component.data()}
 
@@ -549,6 +598,18 @@ class Or(Condition):
                 return result
         return result
 
+    def dispatch(self):
+        if not all(isinstance(c, Condition) for c in self.components):
+            return None, None, False
+        dispatches = [c.dispatch() for c in self.components]
+        features = [d[0] for d in dispatches]
+        reports = [d[1] for d in dispatches]
+        return (
+            None if None in features else frozenset().union(*features),
+            None if None in reports else frozenset().union(*reports),
+            all(d[2] for d in dispatches),
+        )
+
     def data(self):
         return {"Or": [c.data() for c in self.components]}
 
@@ -565,6 +626,9 @@ class And(Condition):
             logger.debug("evaluate condition: %s", self)
         return _evaluate(self.components, feature, notification, device, last_result)
 
+    def dispatch(self):
+        return _dispatch(self.components)
+
     def data(self):
         return {"And": [c.data() for c in self.components]}
 
@@ -694,6 +758,9 @@ class Feature(Condition):
             logger.debug("evaluate condition: %s", self)
         return feature == self.feature
 
+    def dispatch(self):
+        return frozenset({self.feature}), None, True
+
     def data(self):
         return {"Feature": str(self.feature)}
 
@@ -715,6 +782,9 @@ class Report(Condition):
             logger.debug("evaluate condition: %s", self)
         return (notification.address >> 4) == self.report
 
+    def dispatch(self):
+        return None, frozenset({self.report}), True
+
     def data(self):
         return {"Report": self.report}
 
@@ -793,6 +863,9 @@ class Modifiers(Condition):
             logger.warning("no keymap so cannot determine modifier keys")
             return False
 
+    def dispatch(self):
+        return None, None, True
+
     def data(self):
         return {"Modifiers": [str(m) for m in self.modifiers]}
 
@@ -848,6 +921,9 @@ class Key(Condition):
             logger.debug("evaluate condition: %s", self)
         return bool(self.key and self.key == (key_down if self.action == self.DOWN else key_up))
 
+    def dispatch(self):
+        return (KEY_FEATURES if self.key else frozenset()), frozenset({0}), True
+
     def data(self):
         return {"Key": [str(self.key), self.action]}
 
@@ -880,6 +956,9 @@ class KeyIsDown(Condition):
             logger.debug("evaluate condition: %s", self)
         return key_is_down(self.key)
 
+    def dispatch(self):
+        return None, None, True
+
     def data(self):
         return {"KeyIsDown": str(self.key)}
 
@@ -934,6 +1013,14 @@ class Test(Condition):
             logger.debug("evaluate condition: %s", self)
         return self.function(feature, notification.address, notification.data, self.parameter)
 
+    def dispatch(self):
+        if not hasattr(self, "function"):
+            return None, None, False
+        features = TEST_FEATURES.get(self.test)
+        # thumb wheel tests with a parameter use up thumb wheel movement
+        pure = self.parameter is None or self.function not in (thumb_wheel_up, thumb_wheel_down)
+        return features, (None if features is None else frozenset({0})), pure
+
     def data(self):
         return {"Test": ([self.test, self.parameter] if self.parameter is not None else [self.test])}
 
@@ -962,6 +1049,9 @@ class TestBytes(Condition):
             logger.debug("evaluate condition: %s", self)
         return self.function(feature, notification.address, notification.data)
 
+    def dispatch(self):
+        return None, None, hasattr(self, "function")
+
     def data(self):
         return {"TestBytes": self.test[:]}
 
@@ -1017,6 +1107,9 @@ class MouseGesture(Condition):
             return data_offset == len(data)
         return False
 
+    def dispatch(self):
+        return frozenset({SupportedFeature.MOUSE_GESTURE}), None, True
+
     def data(self):
         return {"MouseGesture": [str(m) for m in self.movements]}
 
@@ -1038,6 +1131,9 @@ class Active(Condition):
         dev = device.find(self.devID)
         return bool(dev and dev.ping())
 
+    def dispatch(self):
+        return None, None, True
+
     def data(self):
         return {"Active": self.devID}
 
@@ -1063,6 +1159,9 @@ class Device(Condition):
             or device.name == self.devID
         )
 
+    def dispatch(self):
+        return None, None, True
+
     def data(self):
         return {"Device": self.devID}
 
@@ -1084,6 +1183,9 @@ class Host(Condition):
         hostname = socket.getfqdn()
         return hostname.startswith(self.host)
 
+    def dispatch(self):
+        return None, None, True
+
     def data(self):
         return {"Host": self.host}
 
@@ -1435,10 +1537,65 @@ def key_is_down(key: NamedInt) -> bool:
     return key in keys_down
 
 
+class CompiledRules:
+    """Rules compiled into a dispatch table keyed by feature and report, so that a notification only evaluates
+    the rules that can match it, in their original order.
+
+    Rules that only contain rules are flattened into the rules they contain.  Evaluating them stops when a rule
+    evaluates to None, as a rule containing rules does.
+    """
+
+    def __init__(self, rule: Rule):
+        self.rule = rule
+        self.rules = []  # the innermost rules with the features and reports that they can match
+        self._add(rule)
+        self.table = {}
+
+    def _add(self, rule):
+        if rule.components and all(isinstance(c, Rule) for c in rule.components):
+            for component in rule.components:
+                self._add(component)
+        elif rule.components:
+            features, reports, _pure = _dispatch(rule.components)
+            self.rules.append((rule, features, reports))
+
+    def rules_for(self, feature, report):
+        key = (feature, report)
+        rules_ = self.table.get(key)
+        if rules_ is None:
+            rules_ = self.table[key] = [
+                rule
+                for rule, features, reports in self.rules
+                if (features is None or feature in features) and (reports is None or report in reports)
+            ]
+        return rules_
+
+    def evaluate(self, feature, notification: HIDPPNotification, device):
+        result = True
+        for rule in self.rules_for(feature, notification.address >> 4):
+            result = rule.evaluate(feature, notification, device, True)
+            if result is None:
+                return None
+        return result
+
+
+_compiled_rules = None
+
+
+def rules_changed():
+    """Drop the compiled rules after the rules have been changed in place, as by the rule editor."""
+    global _compiled_rules
+    _compiled_rules = None
+
+
 def evaluate_rules(feature, notification: HIDPPNotification, device):
+    global _compiled_rules
     if logger.isEnabledFor(logging.DEBUG):
         logger.debug("evaluating rules on %s %s", feature, notification)
-    rules.evaluate(feature, notification, device, True)
+    compiled = _compiled_rules
+    if compiled is None or compiled.rule is not rules:
+        compiled = _compiled_rules = CompiledRules(rules)
+    compiled.evaluate(feature, notification, device)
 
 
 def process_notification(device, notification: HIDPPNotification, feature) -> None:
@@ -1556,15 +1713,14 @@ def load_config_rule_file():
 def _load_rule_config(file_path: str) -> Rule:
     loaded_rules = []
     try:
-        with open(file_path) as config_file:
-            loaded_rules = []
-            for loaded_rule in yaml.safe_load_all(config_file):
-                rule = Rule(loaded_rule, source=file_path)
-                if logger.isEnabledFor(logging.DEBUG):
-                    logger.debug("load rule: %s", rule)
-                loaded_rules.append(rule)
-            if logger.isEnabledFor(logging.INFO):
-                logger.info("loaded %d rules from %s", len(loaded_rules), config_file.name)
+        loaded_rules = []
+        for loaded_rule in load_yaml(file_path, all_documents=True):
+            rule = Rule(loaded_rule, source=file_path)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("load rule: %s", rule)
+            loaded_rules.append(rule)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("loaded %d rules from %s", len(loaded_rules), file_path)
     except Exception as e:
         logger.error("failed to load from %s\n%s", file_path, e)
     return Rule([Rule(loaded_rules, source=file_path), built_in_rules])
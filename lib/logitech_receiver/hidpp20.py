@@ -21,7 +21,10 @@ import socket
 import struct
 import threading
 
+from abc import ABC
+from abc import abstractmethod
 from collections import UserDict
+from contextlib import nullcontext
 from enum import Flag
 from enum import IntEnum
 from random import getrandbits
@@ -41,6 +44,8 @@ from . import common
 from . import exceptions
 from . import hidpp10_constants
 from . import special_keys
+from .base import PendingReply
+from .base import _pack_params
 from .centurion_constants import CenturionCoreFeature
 from .centurion_constants import resolve_feature
 from .common import Battery
@@ -137,6 +142,17 @@ class ChargeStatus(Flag):
     ERROR = 0x07
 
 
+def _feature_from_id(feature_id: int):
+    try:
+        return SupportedFeature(feature_id)
+    except ValueError:
+        return f"unknown:{feature_id:04X}"
+
+
+def _feature_id(feature) -> int:
+    return int(feature[len("unknown:") :], 16) if isinstance(feature, str) else int(feature)
+
+
 class FeaturesArray(dict):
     def __init__(self, device):
         assert device is not None
@@ -147,6 +163,7 @@ class FeaturesArray(dict):
         self.version = {}
         self.flags = {}
         self.count = 0
+        self._complete = False  # every feature is known, so features not present are absent
 
     def _check(self) -> bool:
         if not self.device.online:
@@ -173,6 +190,7 @@ class FeaturesArray(dict):
                         self._check_centurion(fs_index, count)
                     else:
                         self.count = count[0] + 1  # ROOT feature not included in count
+                        self._load_table()
                     return True
             else:
                 self.supported = False
@@ -298,6 +316,34 @@ class FeaturesArray(dict):
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug("Centurion sub-device: discovered %d features total", sub_feat_idx)
 
+    def _load_table(self):
+        """Preload the feature table saved for the device's model and firmware, if its feature count still matches."""
+        load_feature_table = getattr(self.device, "load_feature_table", None)
+        table = load_feature_table() if load_feature_table else None
+        if not table or table.get("count") != self.count:
+            return
+        for feature_id, index, version, flags in table["features"]:
+            feature = _feature_from_id(feature_id)
+            self[feature] = index
+            self.version[feature] = version
+            self.flags[feature] = flags
+        self._complete = True
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s: preloaded %d features", self.device, len(table["features"]))
+
+    def _added(self):
+        """Save the feature table once every feature in it is known."""
+        if self._complete or not self.count or any(self.inverse.get(index) is None for index in range(self.count)):
+            return
+        self._complete = True
+        save_feature_table = getattr(self.device, "save_feature_table", None)
+        if save_feature_table:
+            features = []
+            for index in range(self.count):
+                feature = self.inverse[index]
+                features.append([_feature_id(feature), index, self.version.get(feature, 0), self.flags.get(feature, 0)])
+            save_feature_table({"count": self.count, "features": features})
+
     def get_feature(self, index: int) -> SupportedFeature | None:
         feature = self.inverse.get(index)
         if feature is not None:
@@ -318,18 +364,35 @@ class FeaturesArray(dict):
                 logger.warning("failed to retrieve feature at index %d", index)
                 return None
             if response:
-                data = struct.unpack("!H", response[:2])[0]
-                try:
-                    feature = SupportedFeature(data)
-                except ValueError:
-                    feature = f"unknown:{data:04X}"
+                feature = _feature_from_id(struct.unpack("!H", response[:2])[0])
                 self[feature] = index
                 self.version[feature] = response[3]
                 self.flags[feature] = response[2]
+                self._added()
                 return feature
 
+    def read_table(self) -> bool:
+        """Read the whole feature table in one pass, pipelining the requests where possible,
+        so that later presence checks and index lookups, including for absent features, need no requests.
+
+        :returns: whether every feature in the table is known.
+        """
+        if not self._check() or getattr(self.device, "centurion", False):
+            return False
+        unknown = [index for index in range(self.count) if self.inverse.get(index) is None]
+        if unknown:
+            feature_batch = getattr(self.device, "feature_batch", None)
+            with feature_batch() if feature_batch else nullcontext() as batch:
+                if batch is not None and batch.pipelined:
+                    for index in unknown:
+                        batch.feature_request(SupportedFeature.FEATURE_SET, 0x10, index)
+                for index in unknown:
+                    self.get_feature(index)
+        return self._complete
+
     def enumerate(self):  # return all features and their index, ordered by index
         if self._check():
+            self.read_table()
             for index in range(self.count):
                 feature = self.get_feature(index)
                 if feature is not None:
@@ -375,6 +438,9 @@ class FeaturesArray(dict):
             # with LOGITECH_ERROR and that creates cycling log spam during settings init.
             if getattr(self.device, "centurion", False):
                 return None
+            if self._complete:  # the whole table is known so the feature is not present
+                super().__setitem__(feature, False)
+                return False
             try:
                 response = self.device.request(0x0000, struct.pack("!H", feature))
             except exceptions.FeatureCallError:
@@ -384,6 +450,8 @@ class FeaturesArray(dict):
                 self[feature] = index if index else False
                 self.version[feature] = response[2]
                 self.flags[feature] = response[1]
+                if index:
+                    self._added()
                 return index if index else False
 
     def __setitem__(self, feature, index):
@@ -678,8 +746,16 @@ class PersistentRemappableAction:
             return True
 
 
-class KeysArray:
-    """A sequence of key mappings supported by a HID++ 2.0 device."""
+class KeysArray(ABC):
+    """A sequence of key mappings supported by a HID++ 2.0 device.
+
+    Keys are read lazily one at a time, or all together by ``load_all``.  The static part of each key,
+    its record, is the same for every device of a model and firmware, so the records are saved
+    with the device's feature table and later loaded from there instead of from the device.
+    """
+
+    feature = None  # the feature that reads key records
+    record_function = 0x10  # the function of the feature that reads the record of a key
 
     def __init__(self, device, count, version):
         assert device is not None
@@ -694,14 +770,86 @@ class KeysArray:
                 logger.error(f"Trying to read keys on device {device} which has no REPROG_CONTROLS(_VX) support.")
             self.keyversion = None
         self.keys = [None] * count
+        self._records = [None] * count
 
     def _ensure_all_keys_queried(self):
         """The retrieval of key information is lazy, but for certain functionality
         we need to know all keys. This function makes sure that's the case."""
+        self.load_all()
+
+    def load_all(self):
+        """Load all keys that are not yet known, from the saved key records if there are any
+        and otherwise by pipelining the requests for them."""
         with self.lock:  # don't want two threads doing this
-            for i, k in enumerate(self.keys):
-                if k is None:
-                    self._query_key(i)
+            indices = [i for i, k in enumerate(self.keys) if k is None]
+            if not indices:
+                return
+            feature_batch = getattr(self.device, "feature_batch", None)
+            with feature_batch() if feature_batch else nullcontext() as batch:
+                pipelined = batch is not None and batch.pipelined
+                table = self._load_table()
+                records = table["keys"] if table else None
+                if records is None:
+                    if pipelined:
+                        for index in indices:
+                            batch.feature_request(self.feature, self.record_function, *self._record_params(index))
+                    records = {index: self._read_record(index) for index in indices}
+                if pipelined:
+                    self._prefetch(batch, {index: records[index] for index in indices if records[index]})
+                for index in indices:
+                    if records[index]:
+                        self._add_key(index, records[index])
+                    elif logger.isEnabledFor(logging.WARNING):
+                        logger.warning(f"Key with index {index} was expected to exist but device doesn't report it.")
+                if pipelined:
+                    self._prefetched([index for index in indices if self.keys[index] is not None])
+            self._save_table()
+
+    def _load_table(self):
+        load_feature_table = getattr(self.device, "load_feature_table", None)
+        table = load_feature_table(self.feature.name) if load_feature_table else None
+        if not table or table.get("count") != len(self.keys) or len(table.get("keys", ())) != len(self.keys):
+            return None
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("%s: preloaded %d keys", self.device, len(self.keys))
+        return table
+
+    def _save_table(self):
+        save_feature_table = getattr(self.device, "save_feature_table", None)
+        if save_feature_table and all(self._records):
+            save_feature_table(self._table(), self.feature.name)
+
+    def _table(self):
+        return {"count": len(self.keys), "keys": self._records}
+
+    def _record_params(self, index):
+        return (index,)
+
+    @abstractmethod
+    def _read_record(self, index):
+        """Read the static information about a key from the device, as a list of integers."""
+
+    @abstractmethod
+    def _add_key(self, index, record):
+        """Add the key at an index from its record."""
+
+    def _prefetch(self, batch, records):  # noqa: B027
+        """Queue requests for the current state of the keys with these records, by index,
+        which are then made while adding the keys."""
+        pass
+
+    def _prefetched(self, indices):  # noqa: B027
+        """Read the current state of the keys, answered from the requests queued by ``_prefetch``."""
+        pass
+
+    def _query_key(self, index: int):
+        if index < 0 or index >= len(self.keys):
+            raise IndexError(index)
+        record = self._read_record(index)
+        if record:
+            self._add_key(index, record)
+        elif logger.isEnabledFor(logging.WARNING):
+            logger.warning(f"Key with index {index} was expected to exist but device doesn't report it.")
 
     def __getitem__(self, index):
         if isinstance(index, int):
@@ -724,6 +872,7 @@ class KeysArray:
                 return index
 
     def __iter__(self):
+        self.load_all()
         for k in range(0, len(self.keys)):
             yield self.__getitem__(k)
 
@@ -732,6 +881,8 @@ class KeysArray:
 
 
 class KeysArrayV2(KeysArray):
+    feature = SupportedFeature.REPROG_CONTROLS
+
     def __init__(self, device: Device, count, version=1):
         super().__init__(device, count, version)
         """The mapping from Control IDs to their native Task IDs.
@@ -746,39 +897,52 @@ class KeysArrayV2(KeysArray):
         A key k can only be remapped to targets in groups within k.group_mask."""
         self.group_cids = {g: [] for g in special_keys.CidGroup}
 
-    def _query_key(self, index: int):
-        if index < 0 or index >= len(self.keys):
-            raise IndexError(index)
-        keydata = self.device.feature_request(SupportedFeature.REPROG_CONTROLS, 0x10, index)
+    def _read_record(self, index):
+        keydata = self.device.feature_request(self.feature, self.record_function, index)
         if keydata:
-            cid, task_id, flags = struct.unpack("!HHB", keydata[:5])
-            self.keys[index] = ReprogrammableKey(self.device, index, cid, task_id, flags)
-            self.cid_to_tid[cid] = task_id
-        elif logger.isEnabledFor(logging.WARNING):
-            logger.warning(f"Key with index {index} was expected to exist but device doesn't report it.")
+            return list(struct.unpack("!HHB", keydata[:5]))
+
+    def _add_key(self, index, record):
+        cid, task_id, flags = record
+        self.keys[index] = ReprogrammableKey(self.device, index, cid, task_id, flags)
+        self.cid_to_tid[cid] = task_id
+        self._records[index] = record
 
 
 class KeysArrayV4(KeysArrayV2):
+    feature = SupportedFeature.REPROG_CONTROLS_V4
+
     def __init__(self, device, count):
         super().__init__(device, count, 4)
 
-    def _query_key(self, index: int):
-        if index < 0 or index >= len(self.keys):
-            raise IndexError(index)
-        keydata = self.device.feature_request(SupportedFeature.REPROG_CONTROLS_V4, 0x10, index)
+    def _read_record(self, index):
+        keydata = self.device.feature_request(self.feature, self.record_function, index)
         if keydata:
-            cid, task_id, flags1, pos, group, gmask, flags2 = struct.unpack("!HHBBBBB", keydata[:9])
-            flags = flags1 | (flags2 << 8)
-            self.keys[index] = ReprogrammableKeyV4(self.device, index, cid, task_id, flags, pos, group, gmask)
-            self.cid_to_tid[cid] = task_id
-            if group != 0:  # 0 = does not belong to a group
-                self.group_cids[special_keys.CidGroup(group)].append(cid)
-        elif logger.isEnabledFor(logging.WARNING):
-            logger.warning(f"Key with index {index} was expected to exist but device doesn't report it.")
+            return list(struct.unpack("!HHBBBBB", keydata[:9]))
+
+    def _add_key(self, index, record):
+        cid, task_id, flags1, pos, group, gmask, flags2 = record
+        flags = flags1 | (flags2 << 8)
+        self.keys[index] = ReprogrammableKeyV4(self.device, index, cid, task_id, flags, pos, group, gmask)
+        self.cid_to_tid[cid] = task_id
+        if group != 0:  # 0 = does not belong to a group
+            self.group_cids[special_keys.CidGroup(group)].append(cid)
+        self._records[index] = record
+
+    def _prefetch(self, batch, records):
+        for record in records.values():
+            batch.feature_request(self.feature, 0x20, *tuple(struct.pack("!H", record[0])))
+
+    def _prefetched(self, indices):
+        for index in indices:
+            self.keys[index]._getCidReporting()
 
 
 # we are only interested in the current host, so use 0xFF for the host throughout
 class KeysArrayPersistent(KeysArray):
+    feature = SupportedFeature.PERSISTENT_REMAPPABLE_ACTION
+    record_function = 0x20
+
     def __init__(self, device, count):
         super().__init__(device, count, 5)
         self._capabilities = None
@@ -791,48 +955,61 @@ class KeysArrayPersistent(KeysArray):
             self._capabilities = struct.unpack("!H", capabilities[:2])[0]  # flags saying what the mappings are possible
         return self._capabilities
 
-    def _query_key(self, index: int):
-        if index < 0 or index >= len(self.keys):
-            raise IndexError(index)
-        keydata = self.device.feature_request(SupportedFeature.PERSISTENT_REMAPPABLE_ACTION, 0x20, index, 0xFF)
+    def _load_table(self):
+        table = super()._load_table()
+        if table and self._capabilities is None:
+            self._capabilities = table.get("capabilities")
+        return table
+
+    def _table(self):
+        return dict(super()._table(), capabilities=self._capabilities)
+
+    def _record_params(self, index):
+        return index, 0xFF
+
+    def _read_record(self, index):
+        keydata = self.device.feature_request(self.feature, self.record_function, index, 0xFF)
         if keydata:
-            key = struct.unpack("!H", keydata[:2])[0]
-            mapped_data = self.device.feature_request(
-                SupportedFeature.PERSISTENT_REMAPPABLE_ACTION,
-                0x30,
-                key >> 8,
-                key & 0xFF,
-                0xFF,
-            )
-            if mapped_data:
-                _ignore, _ignore, actionId, remapped, modifiers, status = struct.unpack("!HBBHBB", mapped_data[:8])
-            else:
-                actionId = remapped = modifiers = status = 0
-            actionId = special_keys.ACTIONID[actionId]
-            if actionId == special_keys.ACTIONID.Key:
-                remapped = special_keys.USB_HID_KEYCODES[remapped]
-            elif actionId == special_keys.ACTIONID.Mouse:
-                remapped = special_keys.MOUSE_BUTTONS[remapped]
-            elif actionId == special_keys.ACTIONID.Hscroll:
-                try:
-                    remapped = special_keys.HorizontalScroll(remapped)
-                except ValueError:
-                    remapped = f"unknown horizontal scroll:{remapped:04X}"
-            elif actionId == special_keys.ACTIONID.Consumer:
-                remapped = special_keys.HID_CONSUMERCODES[remapped]
-            elif actionId == special_keys.ACTIONID.Empty:  # purge data from empty value
-                remapped = modifiers = 0
-            self.keys[index] = PersistentRemappableAction(
-                self.device,
-                index,
-                key,
-                actionId,
-                remapped,
-                modifiers,
-                status,
-            )
-        elif logger.isEnabledFor(logging.WARNING):
-            logger.warning(f"Key with index {index} was expected to exist but device doesn't report it.")
+            return list(struct.unpack("!H", keydata[:2]))
+
+    def _mapping_params(self, key):
+        return key >> 8, key & 0xFF, 0xFF
+
+    def _prefetch(self, batch, records):
+        for record in records.values():
+            batch.feature_request(self.feature, 0x30, *self._mapping_params(record[0]))
+
+    def _add_key(self, index, record):
+        (key,) = record
+        mapped_data = self.device.feature_request(self.feature, 0x30, *self._mapping_params(key))
+        if mapped_data:
+            _ignore, _ignore, actionId, remapped, modifiers, status = struct.unpack("!HBBHBB", mapped_data[:8])
+        else:
+            actionId = remapped = modifiers = status = 0
+        actionId = special_keys.ACTIONID[actionId]
+        if actionId == special_keys.ACTIONID.Key:
+            remapped = special_keys.USB_HID_KEYCODES[remapped]
+        elif actionId == special_keys.ACTIONID.Mouse:
+            remapped = special_keys.MOUSE_BUTTONS[remapped]
+        elif actionId == special_keys.ACTIONID.Hscroll:
+            try:
+                remapped = special_keys.HorizontalScroll(remapped)
+            except ValueError:
+                remapped = f"unknown horizontal scroll:{remapped:04X}"
+        elif actionId == special_keys.ACTIONID.Consumer:
+            remapped = special_keys.HID_CONSUMERCODES[remapped]
+        elif actionId == special_keys.ACTIONID.Empty:  # purge data from empty value
+            remapped = modifiers = 0
+        self.keys[index] = PersistentRemappableAction(
+            self.device,
+            index,
+            key,
+            actionId,
+            remapped,
+            modifiers,
+            status,
+        )
+        self._records[index] = record
 
 
 class SubParam:
@@ -1651,11 +1828,14 @@ class OnboardProfiles:
         if chunk[0:4] == b"\x00\x00\x00\x00" or chunk[0:4] == b"\xff\xff\xff\xff":  # look in ROM instead
             chunk = device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x50, 0x01, 0, 0, i)
             s = 0x01
-        while chunk[0:2] != b"\xff\xff":
-            sector, enabled = struct.unpack("!HB", chunk[0:3])
-            headers.append((sector, enabled))
-            i += 1
-            chunk = device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x50, s, 0, 0, i * 4)
+        while len(chunk) > 2:  # a chunk has up to four headers
+            for o in range(0, len(chunk) - 2, 4):
+                if chunk[o : o + 2] == b"\xff\xff":
+                    return headers
+                sector, enabled = struct.unpack("!HB", chunk[o : o + 3])
+                headers.append((sector, enabled))
+                i += 1
+            chunk = device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x50, s, 0, (i * 4) >> 8, (i * 4) & 0xFF)
         return headers
 
     @classmethod
@@ -1697,34 +1877,39 @@ class OnboardProfiles:
 
     @classmethod
     def read_sector(cls, dev, sector, s):  # doesn't check for valid sector or size
-        bytes = b""
-        o = 0
-        while o < s - 15:
-            chunk = dev.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x50, sector >> 8, sector & 0xFF, o >> 8, o & 0xFF)
-            bytes += chunk
-            o += 16
-        chunk = dev.feature_request(
-            SupportedFeature.ONBOARD_PROFILES,
-            0x50,
-            sector >> 8,
-            sector & 0xFF,
-            (s - 16) >> 8,
-            (s - 16) & 0xFF,
-        )
-        bytes += chunk[16 + o - s :]  # the last chunk has to be read in an awkward way
+        """Read a sector with pipelined chunk reads, reading it again one chunk at a time if its CRC doesn't match.
+        A sector read before is only read again if its last chunk, which has the CRC of the sector, has changed."""
+        cached = _profile_sectors(dev).get(sector)
+        if cached is not None and len(cached) == s:
+            if _read_sector_chunks(dev, sector, [s - 16])[0] == cached[-16:]:
+                return cached
+        bytes = _read_sector(dev, sector, s)
+        if not _valid_sector(bytes):
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("%s: onboard profile sector %d failed CRC check, reading it again", dev, sector)
+            bytes = _read_sector(dev, sector, s, pipelined=False)
+        _cache_sector(dev, sector, bytes)
         return bytes
 
     @classmethod
     def write_sector(cls, device, s, bs):  # doesn't check for valid sector or size
+        """Write a sector if it differs from what is on the device, pipelining the chunk writes.
+        Only the chunks from the first changed one on are written, as the CRC at the end always changes too.
+        If what is on the device fails its CRC check the whole sector is written."""
         rbs = OnboardProfiles.read_sector(device, s, len(bs))
-        if rbs[:-2] == bs[:-2]:
-            return False
-        device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x60, s >> 8, s & 0xFF, 0, 0, len(bs) >> 8, len(bs) & 0xFF)
-        o = 0
-        while o < len(bs) - 1:
-            device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x70, bs[o : o + 16])
-            o += 16
-        device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x80)
+        if _valid_sector(rbs):
+            if rbs[:-2] == bs[:-2]:
+                return False
+            start = next(o for o in range(0, len(bs), 16) if rbs[o : o + 16] != bs[o : o + 16])
+        else:
+            start = 0
+        length = len(bs) - start
+        calls = [(0x60, (s >> 8, s & 0xFF, start >> 8, start & 0xFF, length >> 8, length & 0xFF))]
+        calls += [(0x70, (bs[o : o + 16],)) for o in range(start, len(bs) - 1, 16)]
+        calls.append((0x80, ()))
+        _profile_sectors(device).pop(s, None)
+        _write_sector_chunks(device, calls)
+        _cache_sector(device, s, bs)
         return True
 
     def write(self, device):
@@ -1747,10 +1932,83 @@ class OnboardProfiles:
         print(yaml.dump(self))
 
 
+def _profile_sectors(device) -> dict:
+    """The onboard profile sectors of a device last read or written, by sector number."""
+    sectors = getattr(device, "_profile_sectors", None)
+    if sectors is None:
+        sectors = device._profile_sectors = {}
+    return sectors
+
+
+def _valid_sector(bytes):
+    return len(bytes) > 2 and common.crc16(bytes[:-2]) == common.bytes2int(bytes[-2:])
+
+
+def _cache_sector(device, sector, bytes):
+    if _valid_sector(bytes):
+        _profile_sectors(device)[sector] = bytes
+    else:  # not a valid sector, so it can't be checked for changes by its CRC
+        _profile_sectors(device).pop(sector, None)
+
+
+def _read_sector(device, sector, s, pipelined=True):
+    offsets = list(range(0, s - 15, 16))
+    chunks = _read_sector_chunks(device, sector, offsets + [s - 16], pipelined)
+    o = len(offsets) * 16
+    return b"".join(chunks[:-1]) + chunks[-1][16 + o - s :]  # the last chunk has to be read in an awkward way
+
+
+def _read_sector_chunks(device, sector, offsets, pipelined=True):
+    """Read 16-byte chunks of a sector, pipelining the requests where possible."""
+    feature_batch = getattr(device, "feature_batch", None) if pipelined else None
+    with feature_batch() if feature_batch else nullcontext() as batch:
+        params = [(sector >> 8, sector & 0xFF, o >> 8, o & 0xFF) for o in offsets]
+        if batch is not None:
+            pending = [batch.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x50, *p) for p in params]
+            chunks = [p.result() for p in pending]
+        else:
+            chunks = [device.feature_request(SupportedFeature.ONBOARD_PROFILES, 0x50, *p) for p in params]
+    if any(chunk is None for chunk in chunks):
+        raise exceptions.FeatureCallError(msg=f"No reply from device reading onboard profile sector {sector}.")
+    return chunks
+
+
+def _write_sector_chunks(device, calls):
+    """Make a sequence of sector writing calls, pipelining them where possible."""
+    feature_batch = getattr(device, "feature_batch", None)
+    with feature_batch() if feature_batch else nullcontext() as batch:
+        if batch is not None:
+            pending = [batch.feature_write(SupportedFeature.ONBOARD_PROFILES, f, *p) for f, p in calls]
+            for p in pending:
+                p.result()
+        else:
+            for function, params in calls:
+                device.feature_request(SupportedFeature.ONBOARD_PROFILES, function, *params)
+
+
 yaml.SafeLoader.add_constructor("!OnboardProfiles", OnboardProfiles.from_yaml)
 yaml.add_representer(OnboardProfiles, OnboardProfiles.to_yaml)
 
 
+# Feature functions that only read from the device, with how many seconds their replies can be reused.
+# Identical concurrent calls of these functions share one request, see Device.feature_request.
+READ_ONLY_FUNCTIONS = {
+    (SupportedFeature.BATTERY_STATUS, 0x00): 0,
+    (SupportedFeature.BATTERY_VOLTAGE, 0x00): 0,
+    (SupportedFeature.UNIFIED_BATTERY, 0x10): 0,
+    (SupportedFeature.ADC_MEASUREMENT, 0x00): 0,
+}
+
+
+def read_only(feature, function, ttl=None):
+    """Declare a feature function to only read from the device.  With a ttl its replies are reused for ttl seconds,
+    without one an earlier declaration is kept."""
+    if ttl is None:
+        READ_ONLY_FUNCTIONS.setdefault((feature, function), 0)
+    else:
+        READ_ONLY_FUNCTIONS[(feature, function)] = ttl
+
+
 def feature_request(device, feature, function=0x00, *params, no_reply=False):
     if device.online and device.features:
         if feature in device.features:
@@ -1762,6 +2020,76 @@ def feature_request(device, feature, function=0x00, *params, no_reply=False):
         )
 
 
+class FeatureBatch:
+    """Feature calls to a device collected and then sent in one burst of pipelined requests.
+
+    Calls queued with ``feature_request`` return future replies.  While the batch is active on a device,
+    ``Device.feature_request`` is answered from matching queued calls, so code that reads settings one at a time
+    still gets the benefit of having prefetched them together.  A call that is not answered from the batch
+    discards any unconsumed replies for its feature, as it might be a write that makes them stale.
+    """
+
+    def __init__(self, device, pipeline_class=None):
+        self.device = device
+        self.thread = threading.get_ident()
+        self._pipeline = None
+        self._replies = {}  # (feature, function, params) -> PendingReply, until consumed
+        if pipeline_class is not None and not getattr(device, "centurion", False):
+            handle = device.handle or (device.receiver.handle if device.receiver else None)
+            if handle:
+                self._pipeline = pipeline_class(handle, long_message=device.long_messages(), protocol=device.protocol)
+
+    def feature_request(self, feature, function=0x00, *params):
+        """Queue a read-only feature call, returning its future reply.
+        An identical call that is queued and not yet consumed is shared instead of being queued again."""
+        key = (feature, function, _pack_params(params))
+        pending = self._replies.get(key)
+        if pending is None:
+            pending = self._submit(feature, function, *params)
+            if pending.pipeline is not None:
+                self._replies[key] = pending
+        return pending
+
+    def feature_write(self, feature, function=0x00, *params):
+        """Queue a feature call that changes the device, returning its future reply.
+        Calls are made in the order they are queued, and are never shared.  Queued replies for the feature are discarded."""
+        self.invalidate(feature)
+        return self._submit(feature, function, *params)
+
+    def _submit(self, feature, function, *params):
+        device = self.device
+        if self.pipelined and device.online and device.features and feature in device.features:
+            feature_index = device.features[feature]
+            return self._pipeline.submit(device.number, (feature_index << 8) + (function & 0xFF), *params)
+        # not pipelined, so just do the call now
+        pending = PendingReply(None, device.number, function, _pack_params(params), False)
+        try:
+            pending.set_result(device.feature_request(feature, function, *params))
+        except exceptions.FeatureCallError as e:
+            pending.set_error(e)
+        return pending
+
+    @property
+    def pipelined(self) -> bool:
+        """Whether calls are really sent together, otherwise they are done as they are queued."""
+        return self._pipeline is not None
+
+    def take(self, feature, function, params):
+        """Remove and return the queued reply for a feature call, or None if there is none."""
+        return self._replies.pop((feature, function, _pack_params(params)), None)
+
+    def invalidate(self, feature):
+        for key in [key for key in self._replies if key[0] == feature]:
+            del self._replies[key]
+
+    def flush(self):
+        if self._pipeline is not None:
+            self._pipeline.flush()
+
+    def __len__(self):
+        return len(self._replies)
+
+
 class Hidpp20:
     # Host-side counter for SetComplete cookies (see set_configuration_complete).
     # Seeded to a non-zero random 16-bit value at import so successive sessions
@@ -17,7 +17,10 @@
 
 import dataclasses
 import logging
+import os
 import queue
+import select
+import selectors
 import threading
 
 from . import base
@@ -28,12 +31,13 @@ logger = logging.getLogger(__name__)
 
 class _ThreadedHandle:
     """A thread-local wrapper with different open handles for each thread.
+    When shared, all threads use the same open handle instead.
     Closing a ThreadedHandle will close all handles.
     """
 
-    __slots__ = ("path", "_local", "_handles", "_listener")
+    __slots__ = ("path", "_local", "_handles", "_listener", "_shared")
 
-    def __init__(self, listener, path, handle):
+    def __init__(self, listener, path, handle, shared=False):
         assert listener is not None
         assert path is not None
         assert handle is not None
@@ -45,6 +49,7 @@ class _ThreadedHandle:
         # take over the current handle for the thread doing the replacement
         self._local.handle = handle
         self._handles = [handle]
+        self._shared = shared
 
     def _open(self):
         handle = base.open_path(self.path)
@@ -70,6 +75,7 @@ class _ThreadedHandle:
                 logger.debug("%r closing %s", self, handles)
             for h in handles:
                 base.close(h)
+            base.drop_request_timers(self)
 
     @property
     def notifications_hook(self):
@@ -77,6 +83,8 @@ class _ThreadedHandle:
             assert isinstance(self._listener, threading.Thread)
             if threading.current_thread() == self._listener:
                 return self._listener._notifications_hook
+            if self._shared:  # the listener can't read notifications that other threads read from the handle
+                return self._listener._forward_notification
 
     def __del__(self):
         self._listener = None
@@ -84,6 +92,8 @@ class _ThreadedHandle:
 
     def __index__(self):
         if self._local:
+            if self._shared:
+                return self._handles[0]
             try:
                 return self._local.handle
             except Exception:
@@ -114,6 +124,107 @@ class _ThreadedHandle:
 # Forcibly closing the file handle on another thread does _not_ interrupt the read on Linux systems.
 _EVENT_READ_TIMEOUT = 1.0  # in seconds
 
+# Use one handle per receiver or device for all threads instead of opening a handle for each thread.
+# Other threads then only read the handle while they hold its lock for a request, and pass on any notification
+# they read to the listener.  Handles have to be file descriptors, as they are for hidraw.
+share_handles = False
+
+# Listen for notifications on all handles from a single reactor thread instead of having each listener
+# thread poll its own handle.  Listener threads then block until they have something to do.
+use_reactor = False
+
+
+class _Reactor(threading.Thread):
+    """Waits for input on the handles of all listeners in one thread, without any timeout.
+
+    A handle is watched only while it is armed by its listener. The reactor reads and decodes one packet,
+    then leaves the handle alone until the listener has processed the notification and re-armed it,
+    as the listener may be reading replies from the same handle in the meantime.
+    """
+
+    def __init__(self):
+        super().__init__(name=self.__class__.__name__, daemon=True)
+        self._selector = selectors.DefaultSelector()
+        self._wakeup_read, self._wakeup_write = os.pipe()
+        os.set_blocking(self._wakeup_read, False)
+        self._selector.register(self._wakeup_read, selectors.EVENT_READ)
+        self._changes = []
+        self._lock = threading.Lock()
+
+    def arm(self, fd, listener):
+        """Deliver the next notification read from fd to the listener."""
+        self._change(fd, listener)
+
+    def disarm(self, fd):
+        self._change(fd, None)
+
+    def _change(self, fd, listener):
+        with self._lock:
+            self._changes.append((fd, listener))
+        os.write(self._wakeup_write, b"\0")
+
+    def _apply_changes(self):
+        with self._lock:
+            changes, self._changes = self._changes, []
+        for fd, listener in changes:
+            try:
+                if listener is None:
+                    self._selector.unregister(fd)
+                else:
+                    self._selector.register(fd, selectors.EVENT_READ, listener)
+            except KeyError:  # already (un)registered, the descriptor might have been closed and reused
+                if listener is not None:
+                    self._selector.modify(fd, selectors.EVENT_READ, listener)
+            except (OSError, ValueError) as e:
+                if listener is not None:
+                    listener._reactor_deliver(exceptions.NoReceiver(reason=e))
+
+    def _read(self, fd, listener):
+        if getattr(listener, "_shared_handle", False):  # other threads read this handle too, under its lock
+            listener._reactor_deliver(_READABLE)
+            return
+        try:  # the listener owns the handle and closes it when told the receiver is gone
+            data = base.hidapi.read(fd, base._read_size(fd), 0)
+        except Exception as e:
+            listener._reactor_deliver(exceptions.NoReceiver(reason=e))
+            return
+        n = base._unpack(fd, data)
+        n = base.make_notification(*n) if n else None
+        if n:
+            listener._reactor_deliver(n)
+        else:  # nothing of interest, keep waiting
+            self._selector.register(fd, selectors.EVENT_READ, listener)
+
+    def run(self):
+        while True:
+            for key, _mask in self._selector.select():
+                if key.fd == self._wakeup_read:
+                    try:
+                        os.read(self._wakeup_read, 4096)
+                    except BlockingIOError:
+                        pass
+                    self._apply_changes()
+                else:
+                    self._selector.unregister(key.fd)
+                    try:
+                        self._read(key.fd, key.data)
+                    except Exception:
+                        logger.exception("reading from %s", key.fd)
+
+
+_READABLE = object()  # a shared handle has input, which the listener reads itself
+_reactor = None
+_reactor_lock = threading.Lock()
+
+
+def _get_reactor():
+    global _reactor
+    with _reactor_lock:
+        if _reactor is None:
+            _reactor = _Reactor()
+            _reactor.start()
+        return _reactor
+
 
 class EventsListener(threading.Thread):
     """Listener thread for notifications from the Unifying Receiver.
@@ -131,11 +242,22 @@ class EventsListener(threading.Thread):
         self.receiver = receiver
         self._queued_notifications = queue.Queue(16)
         self._notifications_callback = notifications_callback
+        self._reactor = None
+        self._reactor_fd = None
+        self._reactor_notifications = queue.SimpleQueue()
+        self._shared_handle = False
+        self._wakeup = None  # pipe to interrupt waiting on a shared handle
 
     def run(self):
         self._active = True
         # replace the handle with a threaded one
-        self.receiver.handle = _ThreadedHandle(self, self.receiver.path, self.receiver.handle)
+        self._shared_handle = share_handles
+        self.receiver.handle = _ThreadedHandle(self, self.receiver.path, self.receiver.handle, self._shared_handle)
+        if use_reactor:
+            self._reactor = _get_reactor()
+        elif self._shared_handle:
+            self._wakeup = os.pipe()
+            os.set_blocking(self._wakeup[0], False)
         if logger.isEnabledFor(logging.INFO):
             logger.info("started with %s (%d)", self.receiver, int(self.receiver.handle))
         self.has_started()
@@ -147,14 +269,11 @@ class EventsListener(threading.Thread):
         while self._active:
             if self._queued_notifications.empty():
                 try:
-                    n = base.read(self.receiver.handle, _EVENT_READ_TIMEOUT)
+                    n = self._read()
                 except exceptions.NoReceiver:
                     logger.warning("%s disconnected", self.receiver.name)
                     self.receiver.close()
                     break
-                if n:
-                    report_id, devnumber, data = n
-                    n = base.make_notification(report_id, devnumber, data)
             else:
                 n = self._queued_notifications.get()  # deliver any queued notifications
             if n:
@@ -163,12 +282,59 @@ class EventsListener(threading.Thread):
                 except Exception:
                     logger.exception("processing %s", n)
 
+        if self._reactor_fd is not None:
+            self._reactor.disarm(self._reactor_fd)
+        if self._wakeup:
+            wakeup, self._wakeup = self._wakeup, None
+            for fd in wakeup:
+                os.close(fd)
         del self._queued_notifications
         self.has_stopped()
 
+    def _read(self):
+        if self._reactor is not None:
+            # the reactor reads from this thread's handle, as the receiver's handle differs from thread to thread
+            self._reactor_fd = int(self.receiver.handle)
+            self._reactor.arm(self._reactor_fd, self)
+            n = self._reactor_notifications.get()
+            if isinstance(n, Exception):
+                raise n
+            return self._read_shared() if n is _READABLE else n
+        if self._shared_handle:
+            ihandle = int(self.receiver.handle)
+            try:
+                ready, _w, _x = select.select([ihandle, self._wakeup[0]], [], [], _EVENT_READ_TIMEOUT)
+            except (OSError, ValueError) as reason:
+                raise exceptions.NoReceiver(reason=reason) from reason
+            if self._wakeup[0] in ready:
+                os.read(self._wakeup[0], 4096)
+            return self._read_shared() if ihandle in ready else None
+        n = base.read(self.receiver.handle, _EVENT_READ_TIMEOUT)
+        return base.make_notification(*n) if n else None
+
+    def _read_shared(self):
+        # a request from another thread may be waiting for a reply on the handle, so only read when it is done
+        handle = self.receiver.handle
+        with base.acquire_timeout(base.handle_lock(handle), handle, 10.0) as locked:
+            n = base.read(handle, 0) if locked else None
+        return base.make_notification(*n) if n else None
+
+    def _reactor_deliver(self, n):
+        self._reactor_notifications.put(n)
+
+    def _wake(self):
+        if self._reactor is not None:
+            self._reactor_notifications.put(None)  # wake up the listener if it is waiting on the reactor
+        try:
+            if self._wakeup:
+                os.write(self._wakeup[1], b"\0")
+        except (OSError, TypeError):  # the listener has just stopped
+            pass
+
     def stop(self):
         """Tells the listener to stop as soon as possible."""
         self._active = False
+        self._wake()
 
     def has_started(self):
         """Called right after the thread has started, and before it starts
@@ -189,6 +355,13 @@ class EventsListener(threading.Thread):
             if not self._queued_notifications.full():
                 self._queued_notifications.put(n)
 
+    def _forward_notification(self, n):
+        # A notification read by another thread from a shared handle, which this thread would otherwise miss.
+        queued_notifications = getattr(self, "_queued_notifications", None)
+        if self._active and queued_notifications is not None and not queued_notifications.full():
+            queued_notifications.put(n)
+            self._wake()
+
     def __bool__(self):
         return bool(self._active and self.receiver)
 
@@ -254,6 +254,7 @@ def _process_feature_notification(device: Device, notification: HIDPPNotificatio
             notification.address >> 4,
             common.strhex(notification.data),
         )
+    device.invalidate_settings(feature, notification.address >> 4)
 
     if feature == SupportedFeature.BATTERY_STATUS:
         if notification.address == 0x00:
@@ -17,14 +17,17 @@ from __future__ import annotations
 
 import logging
 import struct
+import threading
 import time
 
+from contextlib import nullcontext
 from enum import IntEnum
 from typing import Any
 
 from solaar.i18n import _
 
 from . import common
+from . import hidpp20
 from . import hidpp20_constants
 from . import settings_validator
 from .centurion_constants import CenturionCoreFeature
@@ -70,6 +73,10 @@ class Setting:
     # config panel before the Kind dispatch. Kept as a string so this module
     # stays free of GTK imports — the FE/BE seam is preserved.
     editor_class: str | None = None
+    # feature notifications, as (feature, report) pairs, that mean the setting has changed on the device
+    invalidated_by = ()
+    _stale = False  # a notification said that the setting has changed on the device, see invalidate
+    _fresh = False  # the value is known to be the value on the device
 
     def __init__(self, device, rw, validator):
         self._device = device
@@ -123,12 +130,64 @@ class Setting:
                 # make sure to save its current value for the next time.
                 self._device.persister[self.name] = self._value if self.persist else None
 
+    def _use_cached(self, cached) -> bool:
+        """Whether a read can return the value without going to the device.
+        Cached reads return the value unless the setting has changed on the device since it was read
+        and the device is online to read it again.
+        Uncached reads only return it while it is known to be the value on the device,
+        which needs the setting to declare the notifications that change it, see invalidated_by."""
+        if self._value is None:
+            return False
+        if cached:
+            return not self._stale or not self._device.online
+        return self._fresh
+
+    def _validated(self):
+        # the value has just been read from or written to the device
+        self._stale = False
+        self._fresh = bool(self.invalidated_by)
+
+    def invalidate(self, changed=True):
+        """The setting has changed on the device, or, if not changed, its value there can no longer be assumed,
+        e.g., because the device went offline and might have been reset."""
+        self._fresh = False
+        if changed:
+            self._stale = True
+
+    def prefetch(self, batch, cached=True):
+        """Queue in a feature batch (see Device.feature_batch) the device reads that read(cached) would do."""
+        if self._specialized("read", "_do_read"):  # reads done differently by the setting are not known here
+            return
+        self._pre_read(cached)
+        if not self._use_cached(cached):
+            self._prefetch_reads(batch)
+
+    def _prefetch_apply(self, batch):
+        self.prefetch(batch, self.persist)
+        if self.persist and type(self).write is Setting.write and self._validator.needs_current_value:
+            self._prefetch_rw(batch)  # write reads the current value first, shared with the read if it is not cached
+
+    def _prefetch_reads(self, batch):
+        self._prefetch_rw(batch)
+
+    def _prefetch_rw(self, batch, *args):
+        prefetch = getattr(self._rw, "prefetch", None)
+        if prefetch and batch is not None and batch.pipelined:
+            prefetch(batch, self._device, *args)
+
+    def _specialized(self, *names):
+        return any(getattr(type(self), name).__module__ != __name__ for name in names if hasattr(type(self), name))
+
+    def _feature_batch(self):
+        feature_batch = getattr(self._device, "feature_batch", None)
+        return feature_batch() if feature_batch else nullcontext()
+
     def read(self, cached=True):
         assert hasattr(self, "_value")
         assert hasattr(self, "_device")
 
         self._pre_read(cached)
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             if logger.isEnabledFor(logging.DEBUG):
                 logger.debug("%s: cached value %r on %s", self.name, self._value, self._device)
             return self._value
@@ -137,6 +196,7 @@ class Setting:
             reply = self._rw.read(self._device)
             if reply:
                 self._value = self._validator.validate_read(reply)
+                self._validated()
             if self._value is not None and self._device.persister and self.name not in self._device.persister:
                 # Don't update the persister if it already has a value,
                 # otherwise the first read might overwrite the value we wanted.
@@ -149,6 +209,7 @@ class Setting:
         # Remember the value we're trying to set, even if the write fails.
         # This way even if the device is offline or some other error occurs,
         # the last value we've tried to write is remembered in the configuration.
+        self._fresh = False  # until the write is known to have worked
         if self._device.persister and save:
             self._device.persister[self.name] = self._value if self.persist else None
 
@@ -192,6 +253,7 @@ class Setting:
                         self._device,
                     )
                     return None
+                self._validated()
 
             return value
 
@@ -241,22 +303,30 @@ class Settings(Setting):
 
         self._pre_read(cached)
 
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value
 
         if self._device.online:
             reply_map = {}
-            for key in self._validator.choices:
-                reply = self._rw.read(self._device, key)
-                if reply:
-                    reply_map[int(key)] = self._validator.validate_read(reply, key)
+            with self._feature_batch() as batch:
+                self._prefetch_reads(batch)
+                for key in self._validator.choices:
+                    reply = self._rw.read(self._device, key)
+                    if reply:
+                        reply_map[int(key)] = self._validator.validate_read(reply, key)
             self._value = reply_map
+            if reply_map:
+                self._validated()
             if getattr(self._device, "persister", None) and self.name not in self._device.persister:
                 # Don't update the persister if it already has a value,
                 # otherwise the first read might overwrite the value we wanted.
                 self._device.persister[self.name] = self._value if self.persist else None
             return self._value
 
+    def _prefetch_reads(self, batch):
+        for key in self._validator.choices:
+            self._prefetch_rw(batch, key)
+
     def read_key(self, key, cached=True):
         assert hasattr(self, "_value")
         assert hasattr(self, "_device")
@@ -265,7 +335,7 @@ class Settings(Setting):
             logger.debug("%s: settings read %r key %r from %s", self.name, self._value, key, self._device)
 
         self._pre_read(cached)
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value[int(key)]
 
         if self._device.online:
@@ -341,24 +411,32 @@ class LongSettings(Setting):
 
         self._pre_read(cached)
 
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value
 
         if self._device.online:
             reply_map = {}
-            # Reading one item at a time. This can probably be optimised
-            for item in self._validator.items:
-                r = self._validator.prepare_read_item(item)
-                reply = self._rw.read(self._device, r)
-                if reply:
-                    reply_map[int(item)] = self._validator.validate_read_item(reply, item)
+            # Reading one item at a time, but with all the reads sent together
+            with self._feature_batch() as batch:
+                self._prefetch_reads(batch)
+                for item in self._validator.items:
+                    r = self._validator.prepare_read_item(item)
+                    reply = self._rw.read(self._device, r)
+                    if reply:
+                        reply_map[int(item)] = self._validator.validate_read_item(reply, item)
             self._value = reply_map
+            if reply_map:
+                self._validated()
             if getattr(self._device, "persister", None) and self.name not in self._device.persister:
                 # Don't update the persister if it already has a value,
                 # otherwise the first read might overwrite the value we wanted.
                 self._device.persister[self.name] = self._value if self.persist else None
             return self._value
 
+    def _prefetch_reads(self, batch):
+        for item in self._validator.items:
+            self._prefetch_rw(batch, self._validator.prepare_read_item(item))
+
     def read_item(self, item, cached=True):
         assert hasattr(self, "_value")
         assert hasattr(self, "_device")
@@ -367,7 +445,7 @@ class LongSettings(Setting):
             logger.debug("%s: settings read %r item %r from %s", self.name, self._value, item, self._device)
 
         self._pre_read(cached)
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value[int(item)]
 
         if self._device.online:
@@ -439,7 +517,7 @@ class BitFieldSetting(Setting):
 
         self._pre_read(cached)
 
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value
 
         if self._device.online:
@@ -448,6 +526,8 @@ class BitFieldSetting(Setting):
             if reply:
                 reply_map = self._validator.validate_read(reply)
             self._value = reply_map
+            if reply_map:
+                self._validated()
             if getattr(self._device, "persister", None) and self.name not in self._device.persister:
                 # Don't update the persister if it already has a value,
                 # otherwise the first read might overwrite the value we wanted.
@@ -466,7 +546,7 @@ class BitFieldSetting(Setting):
 
         self._pre_read(cached)
 
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value[int(key)]
 
         if self._device.online:
@@ -540,7 +620,13 @@ class BitFieldWithOffsetAndMaskSetting(BitFieldSetting):
     Needs to be instantiated for each specific device."""
 
     def _do_read(self):
-        return {r: self._rw.read(self._device, r) for r in self._validator.prepare_read()}
+        with self._feature_batch() as batch:
+            self._prefetch_reads(batch)
+            return {r: self._rw.read(self._device, r) for r in self._validator.prepare_read()}
+
+    def _prefetch_reads(self, batch):
+        for r in self._validator.prepare_read():
+            self._prefetch_rw(batch, r)
 
     def _do_read_key(self, key):
         r = self._validator.prepare_read_key(key)
@@ -557,7 +643,7 @@ class RangeFieldSetting(Setting):
         if logger.isEnabledFor(logging.DEBUG):
             logger.debug("%s: settings read %r from %s", self.name, self._value, self._device)
         self._pre_read(cached)
-        if cached and self._value is not None:
+        if self._use_cached(cached):
             return self._value
         if self._device.online:
             reply_map = {}
@@ -565,6 +651,8 @@ class RangeFieldSetting(Setting):
             if reply:
                 reply_map = self._validator.validate_read(reply)
             self._value = reply_map
+            if reply_map:
+                self._validated()
             if getattr(self._device, "persister", None) and self.name not in self._device.persister:
                 # Don't update the persister if it already has a value,
                 # otherwise the first read might overwrite the value we wanted.
@@ -651,6 +739,8 @@ class FeatureRW:
         self.read_fnid = read_fnid
         self.write_fnid = write_fnid
         self.no_reply = no_reply
+        if read_fnid is not None and read_fnid != write_fnid:
+            hidpp20.read_only(feature, read_fnid)
         self.prefix = prefix
         self.suffix = suffix
         self.read_prefix = read_prefix
@@ -662,6 +752,11 @@ class FeatureRW:
         else:
             return b""
 
+    def prefetch(self, batch, device, data_bytes=b""):
+        """Queue in a feature batch the request that read would make."""
+        if self.read_fnid is not None and type(self).read is FeatureRW.read:
+            batch.feature_request(self.feature, self.read_fnid, self.prefix, self.read_prefix, data_bytes)
+
     def write(self, device, data_bytes):
         assert self.feature is not None
         write_bytes = self.prefix + (data_bytes.to_bytes(1) if isinstance(data_bytes, int) else data_bytes) + self.suffix
@@ -689,12 +784,19 @@ class FeatureRWMap(FeatureRW):
         self.write_fnid = write_fnid
         self.key_byte_count = key_byte_count
         self.no_reply = no_reply
+        if read_fnid != write_fnid:
+            hidpp20.read_only(feature, read_fnid)
 
     def read(self, device, key):
         assert self.feature is not None
         key_bytes = common.int2bytes(key, self.key_byte_count)
         return device.feature_request(self.feature, self.read_fnid, key_bytes)
 
+    def prefetch(self, batch, device, key):
+        """Queue in a feature batch the request that read would make."""
+        if type(self).read is FeatureRWMap.read:
+            batch.feature_request(self.feature, self.read_fnid, common.int2bytes(key, self.key_byte_count))
+
     def write(self, device, key, data_bytes):
         assert self.feature is not None
         key_bytes = common.int2bytes(key, self.key_byte_count)
@@ -874,14 +976,101 @@ class RawXYProcessing:
         pass
 
 
+class WriteBehind:
+    """Coalesces rapid writes of settings, e.g., while a slider is dragged.
+    Only the latest pending value for each setting and key is kept, and each setting and key is written
+    at most rate times a second.  Acknowledge is called with the value that was written, i.e., the result
+    of write or write_key_value, unless a newer value was queued while writing.
+    Writes are run by submit(setting, function, *args), by default on the flushing thread itself.
+    Submit returns a false value or a cancelled task if it drops the write."""
+
+    def __init__(self, rate=10, submit=None):
+        self.rate = rate
+        self.submit = submit
+        self._lock = threading.Condition()
+        self._pending = {}  # (setting, key) -> (value, acknowledge)
+        self._writing = set()
+        self._written = {}  # (setting, key) -> time that the last write started
+        self._thread = None
+
+    def write(self, setting, value, key=None, acknowledge=None):
+        with self._lock:
+            self._pending[(setting, key)] = (value, acknowledge)
+            if self._thread is None:
+                self._thread = threading.Thread(name="WriteBehind", target=self._run, daemon=True)
+                self._thread.start()
+            self._lock.notify_all()
+
+    def flush(self, timeout=None) -> bool:
+        """Wait until all the pending values have been written."""
+        with self._lock:
+            return self._lock.wait_for(lambda: not self._pending and not self._writing, timeout)
+
+    def _next(self):
+        # the next pending value that can be written, waiting until there is one
+        while True:
+            now = time.monotonic()
+            interval = 1.0 / self.rate
+            wait = None
+            for setting_key, started in list(self._written.items()):  # forget keys once they can be written again
+                if setting_key not in self._pending and setting_key not in self._writing:
+                    if started + interval <= now:
+                        del self._written[setting_key]
+                    else:
+                        wait = started + interval - now if wait is None else min(wait, started + interval - now)
+            for setting_key in self._pending:
+                if setting_key not in self._writing:
+                    due = self._written.get(setting_key, now - interval) + interval
+                    if due <= now:
+                        self._writing.add(setting_key)
+                        self._written[setting_key] = now
+                        return setting_key, self._pending.pop(setting_key)
+                    wait = due - now if wait is None else min(wait, due - now)
+            self._lock.wait(wait)
+
+    def _run(self):
+        while True:
+            with self._lock:
+                setting_key, (value, acknowledge) = self._next()
+            if self.submit:
+                task = self.submit(setting_key[0], self._write, setting_key, value, acknowledge)
+                if not task or getattr(task, "cancelled", False):  # the write will never run
+                    with self._lock:
+                        self._writing.discard(setting_key)
+                        self._lock.notify_all()
+            else:
+                self._write(setting_key, value, acknowledge)
+
+    def _write(self, setting_key, value, acknowledge):
+        setting, key = setting_key
+        try:
+            applied = setting.write(value) if key is None else setting.write_key_value(key, value)
+        except Exception as e:
+            logger.warning("%s: error writing %s (%s): %s", setting.name, value, setting._device, repr(e))
+            applied = None
+        with self._lock:
+            self._writing.discard(setting_key)
+            superseded = setting_key in self._pending
+            self._lock.notify_all()
+        if acknowledge and not superseded:
+            acknowledge(applied)
+
+
 def apply_all_settings(device):
     if device.features and hidpp20_constants.SupportedFeature.HIRES_WHEEL in device.features:
         time.sleep(0.2)  # delay to try to get out of race condition with Linux HID++ driver
     persister = getattr(device, "persister", None)
     sensitives = persister.get("_sensitive", {}) if persister else {}
-    for s in device.settings:
-        ignore = sensitives.get(s.name, False)
-        if ignore != SENSITIVITY_IGNORE:
+    to_apply = [s for s in device.settings if sensitives.get(s.name, False) != SENSITIVITY_IGNORE]
+    feature_batch = getattr(device, "feature_batch", None)
+    with feature_batch() if feature_batch else nullcontext() as batch:
+        if batch is not None and batch.pipelined:  # send the reads needed to apply settings together, then apply them
+            for s in to_apply:
+                try:
+                    s._prefetch_apply(batch)
+                except Exception as e:
+                    logger.warning("%s: error prefetching %s (%s): %s", s.name, s._value, device, repr(e))
+        for s in to_apply:
             s.apply()
 
 
@@ -201,6 +201,8 @@ class Settings(Setting):
                 return None
             self._value[key] = value
             if self._device.persister and self.persist and save:
-                self._device.persister[self.name][key] = value
+                persisted = self._device.persister[self.name]
+                persisted[key] = value
+                self._device.persister[self.name] = persisted  # so that the change gets saved
             getattr(self._device_object[key], self.set)(value)
             return value
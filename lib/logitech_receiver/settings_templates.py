@@ -313,6 +313,7 @@ class Backlight2(settings.Setting):
     label = _("Backlight")
     description = _("Illumination level on keyboard.  Changes made are only applied in Manual mode.")
     feature = _F.BACKLIGHT2
+    invalidated_by = ((_F.BACKLIGHT2, 0),)
     choices_universe = common.NamedInts(Disabled=0xFF, Enabled=0x00, Automatic=0x01, Manual=0x02)
     min_version = 0
 
@@ -356,6 +357,7 @@ class Backlight2Level(settings.Setting):
     label = _("Backlight Level")
     description = _("Illumination level on keyboard when in Manual mode.")
     feature = _F.BACKLIGHT2
+    invalidated_by = ((_F.BACKLIGHT2, 0),)
     min_version = 3
 
     class rw_class:
@@ -384,6 +386,7 @@ class Backlight2Level(settings.Setting):
 
 class Backlight2Duration(settings.Setting):
     feature = _F.BACKLIGHT2
+    invalidated_by = ((_F.BACKLIGHT2, 0),)
     min_version = 3
     validator_class = settings_validator.RangeValidator
     min_value = 1
@@ -549,6 +552,7 @@ class OnboardProfiles(settings.Setting):
     label = _("Onboard Profiles")
     description = _("Enable an onboard profile, which controls report rate, sensitivity, and button actions")
     feature = _F.ONBOARD_PROFILES
+    invalidated_by = ((_F.ONBOARD_PROFILES, 0),)
     choices_universe = common.NamedInts(Disabled=0)
     for i in range(1, 16):
         choices_universe[i] = f"Profile {i}"
@@ -596,6 +600,7 @@ class ReportRate(settings.Setting):
         _("Frequency of device movement reports") + "\n" + _("May need Onboard Profiles set to Disable to be effective.")
     )
     feature = _F.REPORT_RATE
+    invalidated_by = ((_F.ONBOARD_PROFILES, 0),)
     rw_options = {"read_fnid": 0x10, "write_fnid": 0x20}
     choices_universe = common.NamedInts()
     choices_universe[1] = "1ms"
@@ -629,6 +634,7 @@ class ExtendedReportRate(settings.Setting):
         _("Frequency of device movement reports") + "\n" + _("May need Onboard Profiles set to Disable to be effective.")
     )
     feature = _F.EXTENDED_ADJUSTABLE_REPORT_RATE
+    invalidated_by = ((_F.ONBOARD_PROFILES, 0),)
     rw_options = {"read_fnid": 0x20, "write_fnid": 0x30}
     choices_universe = common.NamedInts()
     choices_universe[0] = "8ms"
@@ -690,6 +696,7 @@ class ScrollRatchet(settings.Setting):
     label = _("Scroll Wheel Ratcheted")
     description = _("Switch the mouse wheel between speed-controlled ratcheting and always freespin.")
     feature = _F.SMART_SHIFT
+    invalidated_by = ((_F.HIRES_WHEEL, 1),)
     choices_universe = common.NamedInts(**{_("Freespinning"): 1, _("Ratcheted"): 2})
     validator_class = settings_validator.ChoicesValidator
     validator_options = {"choices": choices_universe}
@@ -1063,6 +1070,7 @@ class AdjustableDpi(settings.Setting):
     label = _("Sensitivity (DPI)")
     description = _("Mouse movement sensitivity") + "\n" + _("May need Onboard Profiles set to Disable to be effective.")
     feature = _F.ADJUSTABLE_DPI
+    invalidated_by = ((_F.ONBOARD_PROFILES, 0), (_F.ONBOARD_PROFILES, 1))
     rw_options = {"read_fnid": 0x20, "write_fnid": 0x30}
     choices_universe = common.NamedInts.range(100, 4000, str, 50)
 
@@ -1091,6 +1099,7 @@ class ExtendedAdjustableDpi(settings.Setting):
     label = _("Sensitivity (DPI)")
     description = _("Mouse movement sensitivity") + "\n" + _("May need Onboard Profiles set to Disable to be effective.")
     feature = _F.EXTENDED_ADJUSTABLE_DPI
+    invalidated_by = ((_F.ONBOARD_PROFILES, 0), (_F.ONBOARD_PROFILES, 1))
     rw_options = {"read_fnid": 0x50, "write_fnid": 0x60}
     keys_universe = common.NamedInts(X=0, Y=1, LOD=2)
     choices_universe = common.NamedInts.range(100, 4000, str, 50)
@@ -1661,6 +1670,7 @@ class HeadsetMicMute(settings.Setting):
     label = _("Mic Mute")
     description = _("Mute the microphone.")
     feature = _F.HEADSET_MIC_MUTE
+    invalidated_by = ((_F.HEADSET_MIC_MUTE, 0), (_F.HEADSET_MIC_MUTE, 1))
     validator_class = settings_validator.BooleanValidator
     # HEADSET_MIC_MUTE (0x0601) doesn't follow the typical fn 0 GetState /
     # fn 1 SetState pattern that BooleanValidator defaults to. Function
@@ -1996,6 +2006,7 @@ class HeadsetAdvancedEQ(settings.RangeFieldSetting):
     label = _("Headset Advanced EQ")
     description = _("Per-band gain for the headset's active parametric EQ.")
     feature = _F.HEADSET_ADVANCED_PARA_EQ
+    invalidated_by = ((_F.HEADSET_ADVANCED_PARA_EQ, 0),)
     rw_options = {"read_fnid": 0x10, "write_fnid": 0x20}
     keys_universe = []
 
@@ -3134,6 +3145,7 @@ class BrightnessControl(settings.Setting):
     label = _("Brightness Control")
     description = _("Control overall brightness")
     feature = _F.BRIGHTNESS_CONTROL
+    invalidated_by = ((_F.BRIGHTNESS_CONTROL, 0), (_F.BRIGHTNESS_CONTROL, 1))
     rw_options = {"read_fnid": 0x10, "write_fnid": 0x20}
     validator_class = settings_validator.RangeValidator
 
@@ -4656,6 +4668,8 @@ def check_feature_settings(device, already_known) -> bool:
         return False
     if device.protocol and device.protocol < 2.0:
         return False
+    if isinstance(device.features, hidpp20.FeaturesArray):
+        device.features.read_table()  # nearly every feature is asked about, so get them all at once
     absent = device.persister.get("_absent", []) if device.persister else []
     new_absent = []
     for sclass in SETTINGS:
@@ -27,6 +27,7 @@ from logitech_receiver import device
 from logitech_receiver import receiver
 
 from solaar import NAME
+from solaar import configuration
 
 logger = logging.getLogger(__name__)
 
@@ -191,6 +192,9 @@ def _find_device(receivers, name):
             if number > 6:
                 number = None
 
+    # configured devices with this serial number or unit ID, so that direct devices are also found by unit ID
+    unitIds = {e.get("_unitId") for e in configuration.lookup(name)} - {None}
+
     for r in receivers:
         if not r.isDevice:  # look for nth device of receiver
             if number:
@@ -209,6 +213,7 @@ def _find_device(receivers, name):
                 or name == dev.codename.lower()
                 or name == str(dev.kind).lower()
                 or name in dev.name.lower()
+                or (unitIds and dev.unitId in unitIds)
             ):
                 yield dev
             count -= 1
@@ -470,6 +470,7 @@ def run(devices, args, find_receiver, find_device):
     device_name = args.device.lower()
 
     if device_name == "all":
+        Device.attach_persisters([d for d in devices if not isinstance(d, (receiver.Receiver, CenturionReceiver))])
         for d in devices:
             if isinstance(d, (receiver.Receiver, CenturionReceiver)):
                 _print_receiver(d)
@@ -19,10 +19,12 @@ import json
 import logging
 import os
 import threading
+import time
 
 import yaml
 
 from logitech_receiver.common import NamedInt
+from logitech_receiver.common import load_yaml
 
 from solaar import __version__
 
@@ -31,6 +33,7 @@ logger = logging.getLogger(__name__)
 _XDG_CONFIG_HOME = os.environ.get("XDG_CONFIG_HOME") or os.path.expanduser(os.path.join("~", ".config"))
 _yaml_file_path = os.path.join(_XDG_CONFIG_HOME, "solaar", "config.yaml")
 _json_file_path = os.path.join(_XDG_CONFIG_HOME, "solaar", "config.json")
+_features_file_path = os.path.join(_XDG_CONFIG_HOME, "solaar", "features.json")
 
 _KEY_VERSION = "_version"
 _KEY_NAME = "_NAME"
@@ -40,6 +43,7 @@ _KEY_MODEL_ID = "_modelId"
 _KEY_UNIT_ID = "_unitId"
 _KEY_ABSENT = "_absent"
 _KEY_SENSITIVE = "_sensitive"
+_KEY_IDENTITY = "_identity"
 _config = []
 
 
@@ -48,8 +52,7 @@ def _load():
     if os.path.isfile(_yaml_file_path):
         path = _yaml_file_path
         try:
-            with open(_yaml_file_path) as config_file:
-                loaded_config = yaml.safe_load(config_file)
+            loaded_config = load_yaml(_yaml_file_path)
         except Exception as e:
             logger.error("failed to load from %s: %s", _yaml_file_path, e)
     elif os.path.isfile(_json_file_path):
@@ -63,8 +66,9 @@ def _load():
     else:
         path = None
     logger.debug("load => %s", loaded_config)
-    global _config
+    global _config, _saved_yaml
     _config = _parse_config(loaded_config, path)
+    _saved_yaml = None
 
 
 def _parse_config(loaded_config, config_path):
@@ -115,6 +119,7 @@ def _device_entry_from_config_dict(data, discard_derived_properties):
     if discard_derived_properties:
         data.pop("_absent", None)
         data.pop("_battery", None)
+        data.pop(_KEY_IDENTITY, None)
     return _DeviceEntry(**data)
 
 
@@ -144,19 +149,55 @@ def save(defer=False):
 
 
 def do_save():
-    global save_timer
+    global save_timer, _saved_yaml
     with configuration_lock:
         if save_timer:
             save_timer.cancel()
             save_timer = None
+        start = time.perf_counter()
         try:
-            with open(_yaml_file_path, "w") as config_file:
-                yaml.dump(_config, config_file, default_flow_style=None, width=150)
-            logger.info("saved %s to %s", _config, _yaml_file_path)
+            text, dumped = _dump_config()
+            if text == _saved_yaml:  # nothing changed since the last save
+                return
+            tmp_path = _yaml_file_path + ".tmp"
+            with open(tmp_path, "w") as config_file:
+                config_file.write(text)
+            os.replace(tmp_path, _yaml_file_path)
+            _saved_yaml = text
+            logger.info(
+                "saved %d changed of %d entries to %s in %.3f seconds",
+                dumped,
+                len(_config) - 1,
+                _yaml_file_path,
+                time.perf_counter() - start,
+            )
         except Exception as e:
             logger.error("failed to save to %s: %s", _yaml_file_path, e)
 
 
+_saved_yaml = None  # the configuration as last saved
+
+
+def _dump(data, default_flow_style=None):
+    return yaml.dump(data, Dumper=_ConfigDumper, default_flow_style=default_flow_style, width=150)
+
+
+def _dump_config():
+    """The configuration as YAML, dumping only device entries that have changed since they were last dumped.
+    Returns the text and the number of entries dumped."""
+    fragments = [_dump(_config[:1], default_flow_style=False)]  # the version, as the first item of the list
+    dumped = 0
+    for c in _config[1:]:
+        if isinstance(c, _DeviceEntry):
+            if c._yaml is None:
+                c._yaml = _dump([c])
+                dumped += 1
+            fragments.append(c._yaml)
+        else:
+            fragments.append(_dump([c]))
+    return "".join(fragments), dumped
+
+
 def _convert_json(json_dict):
     config = [json_dict.get(_KEY_VERSION)]
     for key, dev in json_dict.items():
@@ -182,22 +223,25 @@ def _convert_json(json_dict):
 class _DeviceEntry(dict):
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
+        self._yaml = None  # the entry as last dumped, None if it has changed since
 
     def __setitem__(self, key, value):
-        super().__setitem__(key, value)
+        with configuration_lock:  # not while the entry is being dumped
+            super().__setitem__(key, value)
+            self._yaml = None
         save(defer=True)
 
     def update(self, name, wpid, serial, modelId, unitId):
-        if name and name != self.get(_KEY_NAME):
-            super().__setitem__(_KEY_NAME, name)
-        if wpid and wpid != self.get(_KEY_WPID):
-            super().__setitem__(_KEY_WPID, wpid)
-        if serial and serial != self.get(_KEY_SERIAL):
-            super().__setitem__(_KEY_SERIAL, serial)
-        if modelId and modelId != self.get(_KEY_MODEL_ID):
-            super().__setitem__(_KEY_MODEL_ID, modelId)
-        if unitId and unitId != self.get(_KEY_UNIT_ID):
-            super().__setitem__(_KEY_UNIT_ID, unitId)
+        for key, value in [
+            (_KEY_NAME, name),
+            (_KEY_WPID, wpid),
+            (_KEY_SERIAL, serial),
+            (_KEY_MODEL_ID, modelId),
+            (_KEY_UNIT_ID, unitId),
+        ]:
+            if value and value != self.get(key):
+                super().__setitem__(key, value)
+                self._yaml = None
 
     def get_sensitivity(self, name):
         return self.get(_KEY_SENSITIVE, {}).get(name, False)
@@ -223,46 +267,217 @@ def named_int_representer(dumper, data):
 yaml.add_representer(NamedInt, named_int_representer)
 
 
+class _ConfigDumper(getattr(yaml, "CDumper", yaml.Dumper)):
+    """Dumps like yaml.Dumper, with libyaml if it is available.
+    Entries are dumped separately and then joined, so shared objects are written out again instead of as aliases."""
+
+    yaml_representers = yaml.Dumper.yaml_representers  # shared, so that representers added later are used too
+    yaml_multi_representers = yaml.Dumper.yaml_multi_representers
+
+    def ignore_aliases(self, data):
+        return True
+
+
 # A device can be identified by a combination of WPID and serial number (for receiver-connected devices)
 # or a combination of modelId and unitId (for direct-connected devices).
 # But some devices have empty (all zero) modelIds and unitIds.  Use the device name as a backup for the modelId.
 # The worst situation is a receiver-connected device that Solaar has never seen on-line
 # that is directly connected.  Here there is no way to realize that the two devices are the same.
 # So new entries are not created for unseen off-line receiver-connected devices
-def persister(device):
-    def match(wpid, serial, modelId, unitId, c):
-        return (
-            (wpid and wpid == c.get(_KEY_WPID) and serial and serial == c.get(_KEY_SERIAL))
-            or (modelId and modelId == c.get(_KEY_MODEL_ID) and unitId and unitId == c.get(_KEY_UNIT_ID))
-            or (
-                c.get(_KEY_WPID) is None
-                and c.get(_KEY_SERIAL) is None
-                and c.get(_KEY_UNIT_ID) is None
-                and modelId
-                and modelId == c.get(_KEY_MODEL_ID)
-            )
+def _match(wpid, serial, modelId, unitId, c):
+    return (
+        (wpid and wpid == c.get(_KEY_WPID) and serial and serial == c.get(_KEY_SERIAL))
+        or (modelId and modelId == c.get(_KEY_MODEL_ID) and unitId and unitId == c.get(_KEY_UNIT_ID))
+        or (
+            c.get(_KEY_WPID) is None
+            and c.get(_KEY_SERIAL) is None
+            and c.get(_KEY_UNIT_ID) is None
+            and modelId
+            and modelId == c.get(_KEY_MODEL_ID)
         )
+    )
+
+
+class _EntryIndex:
+    """Indexes of the device entries in the configuration by their ids, so that entries are found without a scan.
+    Indexes are only added to, so entries found through them are checked again before they are used."""
+
+    def __init__(self, config):
+        self.config = config
+        self.size = 0
+        self.position = {}  # id of entry -> position in the configuration, as the first matching entry is used
+        self.wpid_serial = {}
+        self.model_unit = {}
+        self.model = {}  # entries without WPID, serial, or unitId
+        self.ids = {}  # lower-case serial or unitId -> entries
+        for c in config:
+            self.add(c)
+
+    def valid(self, config) -> bool:
+        return config is self.config and len(config) == self.size
+
+    def add(self, entry):
+        self.size += 1
+        if isinstance(entry, _DeviceEntry):
+            self.position[id(entry)] = self.size
+            self.reindex(entry)
+
+    def reindex(self, entry):
+        wpid, serial, modelId, unitId = (entry.get(k) for k in (_KEY_WPID, _KEY_SERIAL, _KEY_MODEL_ID, _KEY_UNIT_ID))
+        if wpid and serial:
+            self._put(self.wpid_serial, (wpid, serial), entry)
+        if modelId and unitId:
+            self._put(self.model_unit, (modelId, unitId), entry)
+        if modelId and wpid is None and serial is None and unitId is None:
+            self._put(self.model, modelId, entry)
+        for id_ in (serial, unitId):
+            if id_:
+                entries = self.ids.setdefault(str(id_).lower(), [])
+                if not any(e is entry for e in entries):
+                    entries.append(entry)
+
+    def _put(self, index, key, entry):
+        current = index.get(key)
+        if current is None or self.position[id(entry)] < self.position[id(current)]:
+            index[key] = entry
+
+    def find(self, wpid, serial, modelId, unitId):
+        """The first entry that matches the ids, like a scan of the configuration would find."""
+        candidates = [self.wpid_serial.get((wpid, serial)), self.model_unit.get((modelId, unitId)), self.model.get(modelId)]
+        candidates = [c for c in candidates if c is not None and _match(wpid, serial, modelId, unitId, c)]
+        return min(candidates, key=lambda c: self.position[id(c)]) if candidates else None
+
+
+_entry_index = None
+
+
+def _index():
+    """The index of the configuration, rebuilt if the configuration has been replaced.  Call with the lock held."""
+    global _entry_index
+    if not _config:
+        _load()
+    if _entry_index is None or not _entry_index.valid(_config):
+        _entry_index = _EntryIndex(_config)
+    return _entry_index
+
+
+def _device_ids(device):
+    # some devices report modelId and unitId as zero so use name and serial for them
+    modelId = device.modelId if device.modelId != "000000000000" else device._name if device._name else None
+    unitId = device.unitId if device.unitId != "00000000" else device._serial if device._serial else None
+    return device.name, device.wpid, device._serial, device.serial, modelId, unitId
+
 
+def _persister(device, ids, index):
+    name, wpid, serial, device_serial, modelId, unitId = ids
+    entry = index.find(wpid, serial, modelId, unitId)
+    if not entry:
+        if not device.online:  # don't create entry for offline devices
+            logger.info("not setting up persister for offline device %s", device._name)
+            return
+        logger.info("setting up persister for device %s", name)
+        entry = _DeviceEntry()
+        _config.append(entry)
+        index.add(entry)
+    entry.update(name, wpid, device_serial, modelId, unitId)
+    index.reindex(entry)
+    return entry
+
+
+def persister(device):
+    ids = _device_ids(device)  # these might need requests to the device, so get them before taking the lock
     with configuration_lock:
-        if not _config:
-            _load()
-        entry = None
-        # some devices report modelId and unitId as zero so use name and serial for them
-        modelId = device.modelId if device.modelId != "000000000000" else device._name if device._name else None
-        unitId = device.unitId if device.unitId != "00000000" else device._serial if device._serial else None
-        for c in _config:
-            if isinstance(c, _DeviceEntry) and match(device.wpid, device._serial, modelId, unitId, c):
-                entry = c
-                break
-        if not entry:
-            if not device.online:  # don't create entry for offline devices
-                logger.info("not setting up persister for offline device %s", device._name)
-                return
-            logger.info("setting up persister for device %s", device.name)
-            entry = _DeviceEntry()
-            _config.append(entry)
-        entry.update(device.name, device.wpid, device.serial, modelId, unitId)
-        return entry
+        return _persister(device, ids, _index())
+
+
+def persisters(devices):
+    """The persisters of several devices, all set up while holding the lock once."""
+    ids = [_device_ids(device) for device in devices]
+    with configuration_lock:
+        index = _index()
+        return [_persister(device, device_ids, index) for device, device_ids in zip(devices, ids)]
+
+
+def lookup(id_):
+    """The device entries with a serial number or unitId, ignoring case."""
+    with configuration_lock:
+        return list(_index().ids.get(id_.lower(), ()))
+
+
+# Feature tables of HID++ 2.0 devices, keyed by device model and firmware, as the table is the same for all of them.
+# Saved separately from the configuration as they are only a cache of what devices report.
+_FEATURE_TABLES_VERSION = 1
+_feature_tables = None
+_feature_tables_lock = threading.Lock()
+
+
+def _load_feature_tables():
+    try:
+        with open(_features_file_path) as features_file:
+            tables = json.load(features_file)
+        if tables.get(_KEY_VERSION) == _FEATURE_TABLES_VERSION:
+            return tables
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        logger.warning("failed to load feature tables from %s: %s", _features_file_path, e)
+    return {_KEY_VERSION: _FEATURE_TABLES_VERSION}
+
+
+def feature_table(key):
+    """The feature table saved for a device model and firmware, or None."""
+    global _feature_tables
+    with _feature_tables_lock:
+        if _feature_tables is None:
+            _feature_tables = _load_feature_tables()
+        return _feature_tables.get(key)
+
+
+def save_feature_table(key, table):
+    global _feature_tables
+    with _feature_tables_lock:
+        if _feature_tables is None:
+            _feature_tables = _load_feature_tables()
+        if _feature_tables.get(key) == table:
+            return
+        _feature_tables[key] = table
+        if _save_feature_tables():
+            logger.info("saved feature table for %s to %s", key, _features_file_path)
+
+
+def drop_feature_tables(key):
+    """Forget the feature table saved for a device model and firmware, and its other tables such as its keys."""
+    global _feature_tables
+    with _feature_tables_lock:
+        if _feature_tables is None:
+            _feature_tables = _load_feature_tables()
+        keys = [k for k in _feature_tables if k == key or k.startswith(f"{key}#")]
+        for k in keys:
+            del _feature_tables[k]
+        if keys and _save_feature_tables():
+            logger.info("dropped feature tables for %s from %s", key, _features_file_path)
+
+
+def _save_feature_tables():
+    try:
+        os.makedirs(os.path.dirname(_features_file_path), exist_ok=True)
+        tmp_path = _features_file_path + ".tmp"
+        with open(tmp_path, "w") as features_file:
+            json.dump(_feature_tables, features_file)
+        os.replace(tmp_path, _features_file_path)
+        return True
+    except Exception as e:
+        logger.error("failed to save feature tables to %s: %s", _features_file_path, e)
+
+
+def identity(wpid, serial):
+    """The identity snapshot saved for a device, found by its WPID and serial number without asking the device."""
+    if not wpid or not serial:
+        return None
+    with configuration_lock:
+        entry = _index().wpid_serial.get((wpid, serial))
+        if entry is not None and wpid == entry.get(_KEY_WPID) and serial == entry.get(_KEY_SERIAL):
+            return entry.get(_KEY_IDENTITY)
 
 
 def attach_to(device):
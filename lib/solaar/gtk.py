@@ -29,6 +29,9 @@ import tempfile
 
 from traceback import format_exc
 
+from logitech_receiver import base as receiver_base
+from logitech_receiver import listener as receiver_listener
+
 from solaar import NAME
 from solaar import __version__
 from solaar import cli
@@ -95,6 +98,21 @@ def create_parser():
         choices=("regular", "symbolic", "solaar"),
         help="prefer regular battery / symbolic battery / solaar icons",
     )
+    arg_parser.add_argument(
+        "--single-listener",
+        action="store_true",
+        help="listen for notifications from all receivers and devices in a single thread (experimental)",
+    )
+    arg_parser.add_argument(
+        "--share-handles",
+        action="store_true",
+        help="use one open handle per receiver or device for all threads (experimental)",
+    )
+    arg_parser.add_argument(
+        "--adaptive-timeouts",
+        action="store_true",
+        help="set request timeouts from how fast each device answers (experimental)",
+    )
     arg_parser.add_argument("--tray-icon-size", type=int, help="explicit size for tray icons")
     arg_parser.add_argument("-V", "--version", action="version", version="%(prog)s " + __version__)
     arg_parser.add_argument("--help-actions", action="store_true", help="describe the command-line actions")
@@ -190,6 +208,13 @@ def main():
     ):
         logger.warning("Solaar udev file not found in expected location")
         logger.warning("See https://pwr-solaar.github.io/Solaar/installation for more information")
+    if args.single_listener:
+        receiver_listener.use_reactor = True
+    if args.share_handles:
+        receiver_listener.share_handles = True
+    if args.adaptive_timeouts:
+        receiver_base.adaptive_timeouts = True
+
     try:
         listener.setup_scanner(ui.status_changed, ui.setting_changed, ui.common.error_dialog)
 
@@ -20,10 +20,12 @@ from __future__ import annotations
 import errno
 import logging
 import subprocess
+import threading
 import time
 import typing
 
 from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
 from functools import partial
 from typing import Callable
 
@@ -379,6 +381,7 @@ def _post_attach_device(device):
 
 def _start(device_info: DeviceInfo):
     assert _status_callback and _setting_callback
+    started = time.perf_counter()
 
     if not device_info.isDevice:
         receiver_ = logitech_receiver.receiver.create_receiver(base, device_info, _setting_callback)
@@ -399,16 +402,30 @@ def _start(device_info: DeviceInfo):
         rl = SolaarListener(receiver_, _status_callback)
         rl.start()
         _all_listeners[device_info.path] = rl
+        logger.info("%s: started in %.3f seconds", receiver_, time.perf_counter() - started)
         return rl
 
     logger.warning("failed to open %s", device_info)
 
 
+_STARTUP_WORKERS = 4  # receivers and devices set up at the same time when starting
+
+
 def start_all():
     stop_all()  # just in case this it called twice in a row...
     logger.info("starting receiver listening threads")
-    for device_info in base.receivers_and_devices():
-        _process_receiver_event(ACTION_ADD, device_info)
+    started = time.perf_counter()
+    device_infos = list(base.receivers_and_devices())
+    if device_infos:
+        # setting up receivers and devices mostly waits on them, so do several at once
+        workers = min(_STARTUP_WORKERS, len(device_infos))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="SolaarStartup") as executor:
+            for future in [executor.submit(_process_receiver_event, ACTION_ADD, info) for info in device_infos]:
+                try:
+                    future.result()
+                except Exception:
+                    logger.exception("starting receiver or device")
+    logger.info("started %d receivers and devices in %.3f seconds", len(device_infos), time.perf_counter() - started)
 
 
 def stop_all():
@@ -424,32 +441,58 @@ def stop_all():
             listener_thread.join()
 
 
+def _ping(listener_thread, device, resuming):
+    if resuming:
+        device._active = None  # ensure that settings are pushed
+    try:  # sometimes the device is not set up already, it should come back later
+        if device.ping():
+            device.changed(active=True, push=True)
+        listener_thread._status_changed(device)
+    except exceptions.NoSuchDevice:
+        logger.debug("can't ping device on resume: %s", device)
+
+
+def _pinged(device, future):
+    error = future.exception()
+    if error is not None:
+        logger.error("pinging %s", device, exc_info=error)
+
+
+_PING_WORKERS = 8  # devices pinged at the same time
+# Pinging threads are kept for the next resume, as each thread that uses a receiver opens its own handle to it.
+_ping_executor = None
+_ping_executor_lock = threading.Lock()
+
+
+def _get_ping_executor():
+    global _ping_executor
+    with _ping_executor_lock:
+        if _ping_executor is None:
+            _ping_executor = ThreadPoolExecutor(max_workers=_PING_WORKERS, thread_name_prefix="SolaarPing")
+        return _ping_executor
+
+
 # after a resume, the device may have been off so mark its saved status to ensure
 # that the status is pushed to the device when it comes back
 def ping_all(resuming=False):
     logger.info("ping all devices%s", " when resuming" if resuming else "")
-    for listener_thread in _all_listeners.values():
+    pings = []
+    for listener_thread in list(_all_listeners.values()):
         if listener_thread.receiver.isDevice:
-            if resuming:
-                listener_thread.receiver._active = None  # ensure that settings are pushed
-            if listener_thread.receiver.ping():
-                listener_thread.receiver.changed(active=True, push=True)
-            listener_thread._status_changed(listener_thread.receiver)
+            pings.append((listener_thread, listener_thread.receiver))
         else:
             count = listener_thread.receiver.count()
             if count:
                 for dev in listener_thread.receiver:
-                    if resuming:
-                        dev._active = None  # ensure that settings are pushed
+                    pings.append((listener_thread, dev))
                     count -= 1
-                    try:  # sometimes the device is not set up already, it should come back later
-                        if dev.ping():
-                            dev.changed(active=True, push=True)
-                        listener_thread._status_changed(dev)
-                    except exceptions.NoSuchDevice:
-                        logger.debug("can't ping device on resume: %s", dev)
                     if not count:
                         break
+    if pings:
+        # a device that is off can take a while to time out, so don't make the others wait for it
+        executor = _get_ping_executor()  # don't wait for the pings, each device reports its status as it answers
+        for listener_thread, device in pings:
+            executor.submit(_ping, listener_thread, device, resuming).add_done_callback(partial(_pinged, device))
 
 
 _status_callback = None  # GUI callback to change UI in response to changes to receiver or device status
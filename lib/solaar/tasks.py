@@ -17,45 +17,91 @@
 ## 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
 import logging
+import threading
 
-from threading import Thread
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 logger = logging.getLogger(__name__)
 
-try:
-    from Queue import Queue
-except ImportError:
-    from queue import Queue
 
+class Task:
+    __slots__ = ("function", "args", "kwargs", "cancellable", "cancelled")
 
-class TaskRunner(Thread):
-    def __init__(self, name):
-        super().__init__(name=name)
-        self.daemon = True
-        self.queue = Queue(16)
-        self.alive = False
+    def __init__(self, function, args, kwargs, cancellable=False):
+        self.function = function
+        self.args = args
+        self.kwargs = kwargs
+        self.cancellable = cancellable
+        self.cancelled = False
 
-    def __call__(self, function, *args, **kwargs):
-        task = (function, args, kwargs)
-        self.queue.put(task)
-
-    def stop(self):
-        self.alive = False
-        self.queue.put(None)
+    def cancel(self):
+        self.cancelled = True
 
     def run(self):
+        try:
+            self.function(*self.args, **self.kwargs)
+        except Exception:
+            logger.exception("calling %s", self.function)
+
+
+class TaskExecutor:
+    """Runs tasks on a shared pool of threads.
+    Tasks in the same lane, e.g., the tasks for one device, run one at a time in the order they were submitted,
+    but tasks in different lanes run in parallel, so a device that does not respond only holds up its own tasks.
+    Submitting a task never blocks."""
+
+    def __init__(self, name, max_workers=4):
+        self.name = name
         self.alive = True
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._lock = threading.Lock()
+        self._lanes = {}  # lane -> tasks not yet started, for each lane that has tasks pending or running
+
+    def submit(self, lane, function, *args, cancellable=False, **kwargs):
+        """Queue a task to run after the earlier tasks in its lane.  Cancellable tasks can be dropped by cancel."""
+        task = Task(function, args, kwargs, cancellable)
+        with self._lock:
+            if not self.alive:
+                task.cancel()
+                return task
+            tasks = self._lanes.get(lane)
+            start = tasks is None
+            if start:
+                tasks = self._lanes[lane] = deque()
+            tasks.append(task)
+            if start:  # while holding the lock, so that the pool can't be shut down first
+                self._pool.submit(self._run, lane)
+        return task
 
-        logger.debug("started")
+    __call__ = submit
 
-        while self.alive:
-            task = self.queue.get()
-            if task:
-                function, args, kwargs = task
-                assert function
-                try:
-                    function(*args, **kwargs)
-                except Exception:
-                    logger.exception("calling %s", function)
+    def cancel(self, keep=None):
+        """Cancel the cancellable tasks that have not started, except those in lane keep."""
+        with self._lock:
+            for lane, tasks in self._lanes.items():
+                if lane != keep:
+                    for task in tasks:
+                        if task.cancellable:
+                            task.cancel()
 
-        logger.debug("stopped")
+    def _run(self, lane):
+        # run one task, then go to the back of the pool's queue so that busy lanes do not hold up other lanes
+        with self._lock:
+            task = self._lanes[lane].popleft()
+        if not task.cancelled:
+            task.run()
+        with self._lock:
+            if self.alive and self._lanes[lane]:
+                self._pool.submit(self._run, lane)
+            else:
+                del self._lanes[lane]
+
+    def stop(self):
+        with self._lock:
+            self.alive = False
+            for tasks in self._lanes.values():
+                for task in tasks:
+                    task.cancel()
+        self._pool.shutdown(wait=False)
+        logger.debug("stopped %s", self.name)
@@ -22,7 +22,7 @@ from typing import Tuple
 import gi
 
 from solaar.i18n import _
-from solaar.tasks import TaskRunner
+from solaar.tasks import TaskExecutor
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import GLib  # NOQA: E402
@@ -81,22 +81,34 @@ def error_dialog(reason: ErrorReason, object_):
     GLib.idle_add(_error_dialog, reason, object_)
 
 
-_task_runner = None
+_task_executor = None
 
 
 def start_async():
-    global _task_runner
-    _task_runner = TaskRunner("AsyncUI")
-    _task_runner.start()
+    global _task_executor
+    _task_executor = TaskExecutor("AsyncUI")
 
 
 def stop_async():
-    global _task_runner
-    _task_runner.stop()
-    _task_runner = None
+    global _task_executor
+    _task_executor.stop()
+    _task_executor = None
 
 
-def ui_async(function, *args, **kwargs):
-    """Runs a function asynchronously."""
-    if _task_runner:
-        _task_runner(function, *args, **kwargs)
+def _device_lane(device):
+    receiver = getattr(device, "receiver", None)
+    return receiver.path if receiver else device.path, getattr(device, "number", None)
+
+
+def device_async(device, function, *args, read=False):
+    """Runs a function for a device asynchronously, after earlier functions for the device
+    but in parallel with functions for other devices.  Reads are dropped by cancel_async_reads.
+    Returns the task, or None if there is nothing to run it."""
+    if _task_executor:
+        return _task_executor.submit(_device_lane(device), function, *args, cancellable=read)
+
+
+def cancel_async_reads(device=None):
+    """Drops reads that have not started, except for device, as they are stale once another device is shown."""
+    if _task_executor:
+        _task_executor.cancel(keep=_device_lane(device) if device is not None else None)
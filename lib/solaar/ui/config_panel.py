@@ -22,6 +22,7 @@ from threading import Timer
 
 import gi
 
+from logitech_receiver import base
 from logitech_receiver import hidpp20
 from logitech_receiver import settings
 from logitech_receiver import settings_templates
@@ -29,7 +30,8 @@ from logitech_receiver import settings_templates
 from solaar.i18n import _
 from solaar.i18n import ngettext
 
-from .common import ui_async
+from .common import cancel_async_reads
+from .common import device_async
 
 gi.require_version("Gtk", "3.0")
 from gi.repository import Gdk  # NOQA: E402
@@ -60,10 +62,10 @@ def _read_async(setting, force_read, sbox, device_is_online, sensitive):
         null_okay = not getattr(getattr(s, "_validator", None), "readable", True)
         GLib.idle_add(_update_setting_item, sb, v, online, sensitive, null_okay, priority=99)
 
-    ui_async(_do_read, setting, force_read, sbox, device_is_online, sensitive)
+    device_async(setting._device, _do_read, setting, force_read, sbox, device_is_online, sensitive, read=True)
 
 
-def _write_async(setting, value, sbox, sensitive=True, key=None):
+def _write_async(setting, value, sbox, sensitive=True, key=None, coalesce=False):
     def _do_write(_s, v, sb, key):
         try:
             if key is None:
@@ -76,12 +78,31 @@ def _write_async(setting, value, sbox, sensitive=True, key=None):
         if sb:
             GLib.idle_add(_update_setting_item, sb, v, True, sensitive, priority=99)
 
+    def _acknowledge(v):
+        value_ = {key: v} if key is not None and v is not None else v
+        GLib.idle_add(_update_setting_item, sbox, value_, True, sensitive, priority=99)
+
     if sbox:
-        sbox._control.set_sensitive(False)
+        if not coalesce:  # controls that are being dragged stay sensitive
+            sbox._control.set_sensitive(False)
         sbox._failed.set_visible(False)
         sbox._spinner.set_visible(True)
         sbox._spinner.start()
-    ui_async(_do_write, setting, value, sbox, key)
+    if coalesce:  # only write the latest value from a control that changes quickly
+        _write_behind.write(setting, value, key, _acknowledge if sbox else None)
+    else:
+        device_async(setting._device, _interactive, _do_write, setting, value, sbox, key)
+
+
+def _interactive(function, *args):
+    # the user is waiting for writes, so they go ahead of background requests
+    with base.request_priority(base.RequestPriority.INTERACTIVE):
+        function(*args)
+
+
+_write_behind = settings.WriteBehind(
+    submit=lambda setting, function, *args: device_async(setting._device, _interactive, function, *args)
+)
 
 
 class ComboBoxText(Gtk.ComboBoxText):
@@ -141,7 +162,6 @@ class SliderControl(Gtk.Scale, Control):
     def __init__(self, sbox, delegate=None):
         super().__init__(halign=Gtk.Align.FILL)
         self.init(sbox, delegate)
-        self.timer = None
         self.set_range(*self.sbox.setting.range)
         self.set_round_digits(0)
         self.set_digits(0)
@@ -163,16 +183,8 @@ class SliderControl(Gtk.Scale, Control):
     def get_value(self):
         return int(super().get_value())
 
-    def changed(self, *args):
-        if self.get_sensitive():
-            if self.timer:
-                self.timer.cancel()
-            self.timer = Timer(0.5, lambda: GLib.idle_add(self.do_change))
-            self.timer.start()
-
-    def do_change(self):
-        self.timer.cancel()
-        self.update()
+    def update(self):
+        _write_async(self.sbox.setting, self.get_value(), self.sbox, coalesce=True)
 
 
 def _create_choice_control(sbox, delegate=None, choices=None):
@@ -463,18 +475,13 @@ class MultipleRangeControl(MultipleControl):
 
     def changed(self, control, item, sub_item):
         if control.get_sensitive():
-            if hasattr(control, "_timer"):
-                control._timer.cancel()
-            control._timer = Timer(0.5, lambda: GLib.idle_add(self._write, control, item, sub_item))
-            control._timer.start()
+            self._write(control, item, sub_item)
 
     def _write(self, control, item, sub_item):
-        control._timer.cancel()
-        delattr(control, "_timer")
         new_state = int(control.get_value())
         if self.sbox.setting._value[int(item)][str(sub_item)] != new_state:
             self.sbox.setting._value[int(item)][str(sub_item)] = new_state
-            _write_async(self.sbox.setting, self.sbox.setting._value[int(item)], self.sbox, key=int(item))
+            _write_async(self.sbox.setting, self.sbox.setting._value[int(item)], self.sbox, key=int(item), coalesce=True)
 
     def set_value(self, value):
         if value is None:
@@ -523,18 +530,13 @@ class PackedRangeControl(MultipleRangeControl):
 
     def changed(self, control, item):
         if control.get_sensitive():
-            if hasattr(control, "_timer"):
-                control._timer.cancel()
-            control._timer = Timer(0.5, lambda: GLib.idle_add(self._write, control, item))
-            control._timer.start()
+            self._write(control, item)
 
     def _write(self, control, item):
-        control._timer.cancel()
-        delattr(control, "_timer")
         new_state = int(control.get_value())
         if self.sbox.setting._value[int(item)] != new_state:
             self.sbox.setting._value[int(item)] = new_state
-            _write_async(self.sbox.setting, self.sbox.setting._value[int(item)], self.sbox, key=int(item))
+            _write_async(self.sbox.setting, self.sbox.setting._value[int(item)], self.sbox, key=int(item), coalesce=True)
 
     def set_value(self, value):
         if value is None:
@@ -586,21 +588,16 @@ class GraphicEQControl(MultipleControl):
 
     def _changed(self, control, item):
         if control.get_sensitive():
-            if hasattr(control, "_timer"):
-                control._timer.cancel()
-            control._timer = Timer(0.5, lambda: GLib.idle_add(self._write, control, item))
-            control._timer.start()
+            self._write(control, item)
 
     def _write(self, control, item):
-        control._timer.cancel()
-        delattr(control, "_timer")
         new_state = int(control.get_value())
         value = self.sbox.setting._value
         if not isinstance(value, dict):
             return
         if value.get(int(item)) != new_state:
             value[int(item)] = new_state
-            _write_async(self.sbox.setting, value[int(item)], self.sbox, key=int(item))
+            _write_async(self.sbox.setting, value[int(item)], self.sbox, key=int(item), coalesce=True)
 
     def set_value(self, value):
         if value is None:
@@ -1143,6 +1140,7 @@ def update(device, is_online=None):
     if device_id != _box._last_device:
         _box.set_visible(False)
         _box._last_device = device_id
+        cancel_async_reads(device)  # reads for the devices shown before are no longer needed
 
     # hide controls belonging to other devices
     for k, sbox in _items.items():
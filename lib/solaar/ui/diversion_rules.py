@@ -714,6 +714,7 @@ class DiversionDialog:
         return col1, col2
 
     def on_update(self):
+        diversion.rules_changed()
         self.view.queue_draw()
         self.dirty = True
         self.save_btn.set_sensitive(True)
@@ -36,7 +36,7 @@ from . import config_panel
 from . import diversion_rules
 from . import icons
 from .about import about
-from .common import ui_async
+from .common import device_async
 
 gi.require_version("Gdk", "3.0")
 from gi.repository import Gdk  # NOQA: E402
@@ -596,7 +596,7 @@ def _update_details(button):
         if read_all:
             _details._current_device = None
         else:
-            ui_async(_read_slow, selected_device)
+            device_async(selected_device, _read_slow, selected_device, read=True)
 
     _details.set_visible(visible)
 
@@ -15,11 +15,14 @@ def isolate_solaar_configuration(tmp_path, monkeypatch):
     un-matchable TestDevice entry on every run. Pointing the paths at tmp_path
     and clearing the cached _config keeps each test off the real config and
     isolated from every other test."""
+    from logitech_receiver import common
     from solaar import configuration
 
     monkeypatch.setattr(configuration, "_yaml_file_path", str(tmp_path / "config.yaml"))
     monkeypatch.setattr(configuration, "_json_file_path", str(tmp_path / "config.json"))
+    monkeypatch.setattr(configuration, "_features_file_path", str(tmp_path / "features.json"))
     monkeypatch.setattr(configuration, "_config", [])
+    monkeypatch.setattr(common, "yaml_snapshots_dir", str(tmp_path / "snapshots"))
 
 
 @pytest.fixture(autouse=True)
@@ -2,6 +2,8 @@ import platform
 
 from unittest import mock
 
+import pytest
+
 if platform.system() == "Linux":
     import hidapi.udev_impl as hidapi
 else:
@@ -10,3 +12,78 @@ else:
 
 def test_find_paired_node():
     hidapi.enumerate(mock.Mock())
+
+
+class _FakeUdevDevice:
+    def __init__(self, action, node, phys, hid_id="0003:0000046D:00004082"):
+        self.action = action
+        self.device_node = node
+        self._hid = {"HID_PHYS": phys, "HID_ID": hid_id}
+
+    def find_parent(self, subsystem):
+        return self._hid
+
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="udev only")
+def test_paired_node_index():
+    index = hidapi._PairedNodeIndex()
+    index._event(_FakeUdevDevice("add", "/dev/hidraw1", "usb-0000:00:14.0-1/input2"))
+    index._event(_FakeUdevDevice("add", "/dev/hidraw2", "usb-0000:00:14.0-1/input2:1"))
+
+    assert index.receiver_phys("/dev/hidraw1") == "usb-0000:00:14.0-1/input2"
+    assert index.lookup("usb-0000:00:14.0-1/input2:1") == ("/dev/hidraw2", "0003:0000046D:00004082")
+    assert index.lookup("usb-0000:00:14.0-1/input2:2") is None
+
+    index._event(_FakeUdevDevice("remove", "/dev/hidraw2", None))
+    assert index.lookup("usb-0000:00:14.0-1/input2:1") is None
+
+
+HIDPP_SHORT_REPORT_DESCRIPTOR = bytes.fromhex("0600ff0901a101851075089506150026ff000901810009019100c0")
+HIDPP_LONG_REPORT_DESCRIPTOR = bytes.fromhex("0600ff0902a101851175089513150026ff000902810009029100c0")
+HIDPP_REPORT_DESCRIPTOR = HIDPP_SHORT_REPORT_DESCRIPTOR + HIDPP_LONG_REPORT_DESCRIPTOR
+MOUSE_REPORT_DESCRIPTOR = bytes.fromhex(
+    "05010902a1010901a100050919012903150025019503750181029501750581010501093009311581257f750895028106c0c0"
+)
+# Unifying receiver HID++ interface, with the DJ reports
+RECEIVER_REPORT_DESCRIPTOR = HIDPP_REPORT_DESCRIPTOR + bytes.fromhex(
+    "0600ff0904a10185207508950e150026ff0009418100094191008521951f150026ff000942810009429100c0"
+)
+# Unifying receiver mouse interface, 16 buttons and 12 bit movement
+RECEIVER_MOUSE_REPORT_DESCRIPTOR = bytes.fromhex(
+    "05010902a10185020901a1000509190129101500250195107501810205011601f826ff07750c9502093009318106"
+    "1581257f7508950109388106050c0a380295018106c0c0"
+)
+# consumer control keys with a report ID
+CONSUMER_REPORT_DESCRIPTOR = bytes.fromhex("050c0901a101850375109502150126ff0219012aff028100c0")
+# Centurion headset interface, 63 byte reports
+CENTURION_REPORT_DESCRIPTOR = bytes.fromhex("06a0ff0901a10185517508953f150026ff000901810009019100c0")
+
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="udev only")
+@pytest.mark.parametrize(
+    "data",
+    [
+        HIDPP_REPORT_DESCRIPTOR,
+        MOUSE_REPORT_DESCRIPTOR,
+        RECEIVER_REPORT_DESCRIPTOR,
+        RECEIVER_MOUSE_REPORT_DESCRIPTOR,
+        CONSUMER_REPORT_DESCRIPTOR,
+        CENTURION_REPORT_DESCRIPTOR,
+    ],
+)
+def test_scan_report_sizes(data):
+    assert hidapi._scan_report_sizes(data) == hidapi._parse_report_sizes(data)
+
+
+@pytest.mark.skipif(platform.system() != "Linux", reason="udev only")
+def test_report_descriptor_cache(tmp_path):
+    path = str(tmp_path / "report_descriptors.json")
+    cache = hidapi._ReportDescriptorCache(path)
+
+    assert cache.classify(HIDPP_REPORT_DESCRIPTOR) == (True, True, None)
+    assert cache.classify(MOUSE_REPORT_DESCRIPTOR) == (False, False, None)
+    assert cache.classify(RECEIVER_REPORT_DESCRIPTOR) == (True, True, None)
+    assert cache.classify(CENTURION_REPORT_DESCRIPTOR) == (False, False, 0x51)
+
+    with mock.patch.object(hidapi, "_classify_report_descriptor", side_effect=AssertionError):
+        assert hidapi._ReportDescriptorCache(path).classify(HIDPP_REPORT_DESCRIPTOR) == (True, True, None)
@@ -389,7 +389,7 @@ class Device:
     centurion: bool = False
     path = None
     cleanups = None
-    sliding = profiles = _backlight = _keys = _remap_keys = _led_effects = _gestures = None
+    sliding = profiles = _backlight = _keys = _remap_keys = _led_effects = _gestures = _settings = None
     _gestures_lock = threading.Lock()
     number = "d1"
     present = True
@@ -403,6 +403,7 @@ class Device:
     gestures = device.Device.gestures
     __hash__ = device.Device.__hash__
     feature_request = device.Device.feature_request
+    invalidate_settings = device.Device.invalidate_settings
 
     def __post_init__(self):
         self._name = self.name
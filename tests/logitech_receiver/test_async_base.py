@@ -0,0 +1,123 @@
+import asyncio
+import os
+
+from unittest import mock
+
+import pytest
+
+from logitech_receiver import async_base
+from logitech_receiver import base
+from logitech_receiver import exceptions
+
+
+class HidrawFake:
+    """A pipe standing in for a hidraw node, the reply to each write is looked up in a table."""
+
+    def __init__(self, replies):
+        self.read_fd, self.write_fd = os.pipe()
+        self.replies = replies
+        self.received = []
+        self.notifications = []
+
+    def write(self, handle, devnumber, data, long_message=False):
+        replies = self.replies.get(data[:2], [])
+        for reply in reversed(replies):  # reply out of order
+            self.receive(reply)
+
+    def receive(self, reply):
+        self.received.append(reply)
+        os.write(self.write_fd, b"x")
+
+    def read(self, handle, timeout):
+        os.read(self.read_fd, 1)
+        return self.received.pop(0)
+
+    def close(self):
+        os.close(self.read_fd)
+        os.close(self.write_fd)
+
+
+@pytest.fixture
+def hidraw():
+    sw_id = base.SOLAAR_SOFTWARE_ID
+    fake = HidrawFake(
+        {
+            bytes([0x05, 0x10 | sw_id]): [(0x11, 0x02, bytes([0x05, 0x10 | sw_id, 0xBB]))],
+            bytes([0x04, 0x00 | sw_id]): [
+                (0x11, 0x01, bytes([0x04, 0x00 | sw_id, 0xAA])),
+                (0x11, 0x01, bytes([0x04, 0x00, 0x01, 0x02])),  # a notification
+            ],
+            bytes([0x06, 0x20 | sw_id]): [(0x11, 0x01, bytes([0xFF, 0x06, 0x20 | sw_id, 0x05]))],
+            bytes([0x00, 0x10 | sw_id]): [(0x10, 0x03, bytes([0x8F, 0x00, 0x10 | sw_id, 0x01, 0x00]))],
+        }
+    )
+    with mock.patch("logitech_receiver.base.write", side_effect=fake.write), mock.patch(
+        "logitech_receiver.base._read", side_effect=fake.read
+    ):
+        yield fake
+    fake.close()
+
+
+def test_async_requests(hidraw):
+    async def run():
+        handle = async_base.AsyncHandle(hidraw.read_fd, hidraw.notifications.append)
+        results = await asyncio.gather(
+            async_base.request(handle, 0x01, 0x0400, protocol=4.5),
+            async_base.request(handle, 0x02, 0x0510, 0x01, protocol=4.5),
+            async_base.request(handle, 0x01, 0x0620, protocol=4.5),
+            async_base.ping(handle, 0x03),
+            return_exceptions=True,
+        )
+        handle.loop.remove_reader(handle.handle)
+        return results
+
+    first, second, third, protocol = asyncio.run(run())
+
+    assert first == b"\xaa"
+    assert second == b"\xbb"
+    assert isinstance(third, exceptions.FeatureCallError) and third.error == 0x05
+    assert protocol == 1.0
+    assert len(hidraw.notifications) == 1 and hidraw.notifications[0].devnumber == 0x01
+
+
+def test_async_request_timeout(hidraw):
+    async def run():
+        handle = async_base.AsyncHandle(hidraw.read_fd)
+        result = await async_base.request(handle, 0x01, 0x0700, protocol=4.5)
+        handle.loop.remove_reader(handle.handle)
+        return result
+
+    with mock.patch("logitech_receiver.base._DEVICE_REQUEST_TIMEOUT", 0.01):
+        assert asyncio.run(run()) is None
+
+
+def test_async_request_resent_after_timeout(hidraw):
+    sw_id = base.SOLAAR_SOFTWARE_ID
+    late_reply = (0x11, 0x01, bytes([0x05, 0x10 | sw_id, 0xAA]))
+    written = []
+
+    def write(handle, devnumber, data, long_message=False):
+        written.append(data)
+        if written.count(data) == 2:  # only answer the second request when it is made again
+            hidraw.receive((0x11, 0x01, data[:2] + b"\xbb"))
+
+    async def run():
+        handle = async_base.AsyncHandle(hidraw.read_fd, hidraw.notifications.append)
+        first = asyncio.ensure_future(async_base.request(handle, 0x01, 0x0510, 0x00, protocol=4.5))
+        second = asyncio.ensure_future(async_base.request(handle, 0x01, 0x0510, 0x01, protocol=4.5))
+        handle.loop.call_later(0.1, hidraw.receive, late_reply)  # the reply to the first request, after its timeout
+        results = await asyncio.gather(first, second)
+        await asyncio.sleep(0.15)
+        handle.loop.remove_reader(handle.handle)
+        return results
+
+    timeouts = iter([0.05, 1.0])
+    with mock.patch("logitech_receiver.base.write", side_effect=write), mock.patch(
+        "logitech_receiver.base._request_timeout", side_effect=lambda *args: next(timeouts)
+    ):
+        first, second = asyncio.run(run())
+
+    assert first is None
+    assert second == b"\xbb"
+    first_data, second_data = bytes([0x05, 0x10 | sw_id, 0x00]), bytes([0x05, 0x10 | sw_id, 0x01])
+    assert written == [first_data, second_data, second_data]
@@ -1,5 +1,7 @@
 import struct
 import sys
+import threading
+import time
 
 from typing import Union
 from unittest import mock
@@ -202,6 +204,90 @@ def test_ping_errors(simulated_error: Hidpp10Error, expected_result):
             assert result == expected_result
 
 
+def test_request_pipeline_routes_out_of_order_replies():
+    device_number = 2
+    sw_id = base.SOLAAR_SOFTWARE_ID
+    replies = [
+        (base.HIDPP_LONG_MESSAGE_ID, device_number, bytes([0x05, 0x10 | sw_id, 0xBB])),
+        (base.HIDPP_LONG_MESSAGE_ID, device_number, bytes([0x04, 0x00, 0x01])),  # a notification
+        (base.HIDPP_LONG_MESSAGE_ID, device_number, bytes([0x04, 0x00 | sw_id, 0xAA])),
+        (base.HIDPP_LONG_MESSAGE_ID, device_number, bytes([0xFF, 0x06, 0x20 | sw_id, 0x05])),
+    ]
+    hook = mock.Mock()
+
+    with mock.patch("logitech_receiver.base._read", side_effect=replies), mock.patch(
+        "logitech_receiver.base._read_input_buffer"
+    ), mock.patch("logitech_receiver.base.write") as write:
+        pipeline = base.RequestPipeline(
+            mock.Mock(__int__=lambda _s: 0, notifications_hook=hook), long_message=True, protocol=4.5
+        )
+        first = pipeline.submit(device_number, 0x0400)
+        second = pipeline.submit(device_number, 0x0510, 0x01)
+        third = pipeline.submit(device_number, 0x0620)
+        assert len(pipeline) == 3 and not first.done()
+
+        pipeline.flush()
+
+    assert write.call_count == 3
+    assert first.result() == b"\xaa"
+    assert second.result() == b"\xbb"
+    with pytest.raises(exceptions.FeatureCallError) as context:
+        third.result()
+    assert context.value.error == 0x05
+    assert hook.call_count == 1
+    assert len(pipeline) == 0
+
+
+def test_request_pipeline_depth_and_timeout():
+    handle = 0
+    device_number = 1
+
+    with mock.patch("logitech_receiver.base._read", return_value=None), mock.patch(
+        "logitech_receiver.base._read_input_buffer"
+    ), mock.patch("logitech_receiver.base.write") as write, mock.patch("logitech_receiver.base._DEVICE_REQUEST_TIMEOUT", 0.01):
+        pipeline = base.RequestPipeline(handle, protocol=2.0, depth=2)
+        replies = [pipeline.submit(device_number, 0x0100 + (i << 4)) for i in range(5)]
+        assert replies[4].result() is None
+
+    assert write.call_count == 5
+    assert all(r.done() and r.result() is None for r in replies)
+
+
+def test_request_pipeline_resends_requests_after_timeout():
+    device_number = 1
+    sw_id = base.SOLAAR_SOFTWARE_ID
+    replies = [
+        None,  # the first request times out
+        (base.HIDPP_LONG_MESSAGE_ID, device_number, bytes([0x05, 0x10 | sw_id, 0xAA])),  # its late reply
+        (base.HIDPP_LONG_MESSAGE_ID, device_number, bytes([0x06, 0x20 | sw_id, 0xCC])),
+    ]
+
+    def read(handle, timeout):
+        reply = replies.pop(0)
+        if reply is None:
+            time.sleep(0.02)
+        return reply
+
+    with mock.patch("logitech_receiver.base._read", side_effect=read), mock.patch(
+        "logitech_receiver.base._read_input_buffer"
+    ), mock.patch("logitech_receiver.base.write") as write, mock.patch(
+        "logitech_receiver.base._request_timeout", side_effect=[0.01, 1.0, 1.0]
+    ), mock.patch("logitech_receiver.base.request", return_value=b"\xbb") as request:
+        pipeline = base.RequestPipeline(0, protocol=2.0)
+        first = pipeline.submit(device_number, 0x0510, 0x00)
+        second = pipeline.submit(device_number, 0x0510, 0x01)  # same ID, so the late reply would be taken for it
+        third = pipeline.submit(device_number, 0x0620)
+        pipeline.flush()
+
+    assert write.call_count == 3
+    assert first.result() is None
+    assert second.result() == b"\xbb"
+    assert third.result() == b"\xcc"
+    request.assert_called_once_with(
+        0, device_number, 0x0510 | sw_id, b"\x01", return_error=False, long_message=False, protocol=2.0
+    )
+
+
 # --- Centurion transport tests ---
 
 
@@ -414,3 +500,88 @@ class TestProbeCenturionDeviceAddr:
         assert mock_write.call_count == 256
         addrs_sent = [mock_write.call_args_list[i][0][1][1] for i in range(256)]
         assert addrs_sent == list(range(256))
+
+
+def test_request_timer(monkeypatch):
+    timer = base.RequestTimer()
+    for _ in range(10):
+        timer.sample(0.01)
+    assert timer.timeout(4) == 4  # only when turned on
+
+    monkeypatch.setattr(base, "adaptive_timeouts", True)
+    timer = base.RequestTimer()
+    assert timer.timeout(4) == 4  # no samples yet
+
+    for _ in range(10):
+        timer.sample(0.01)
+    assert timer.srtt == pytest.approx(0.01)
+    assert timer.timeout(4) == base.RequestTimer.MIN_TIMEOUT
+    assert timer.timeout(0.2) == 0.2
+
+    timer.timed_out()
+    assert timer.timeout(4) == 2 * base.RequestTimer.MIN_TIMEOUT
+    assert timer.stats()["timeouts"] == 1
+
+    for i in range(50):
+        timer.sample(3.0 if i % 2 else 5.0)  # a slow link gets more than the fixed timeout
+    assert 4 < timer.timeout(4) <= 8
+
+
+def test_request_records_round_trip_time():
+    handle = 0x7777
+    reply = (base.HIDPP_SHORT_MESSAGE_ID, 0x01, bytes([0x81, 0x00, 0x01, 0x02, 0x03]))
+
+    with mock.patch("logitech_receiver.base._read", return_value=reply), mock.patch(
+        "logitech_receiver.base._read_input_buffer"
+    ), mock.patch("logitech_receiver.base.write"), mock.patch("logitech_receiver.base.acquire_timeout"):
+        assert base.request(handle, 0x01, 0x8100) == b"\x01\x02\x03"
+
+    assert base.request_timer(handle, 0x01).samples == 1
+    assert base.request_timer(handle, 0x01, ping=True).samples == 0  # pings are timed on their own
+
+    with mock.patch("logitech_receiver.base.hidapi.close"):
+        base.close(handle)
+    assert not [key for key in base.request_timers if key[0] == handle]
+
+
+def test_request_scheduler_orders_waiters_by_priority():
+    scheduler = base.RequestScheduler()
+    order = []
+
+    def request(name, priority):
+        with base.request_priority(priority):
+            with scheduler:
+                order.append(name)
+
+    scheduler.acquire()
+    threads = []
+    for name, priority in [
+        ("background 1", base.RequestPriority.BACKGROUND),
+        ("normal", base.RequestPriority.NORMAL),
+        ("background 2", base.RequestPriority.BACKGROUND),
+        ("interactive", base.RequestPriority.INTERACTIVE),
+    ]:
+        threads.append(threading.Thread(target=request, args=(name, priority)))
+        threads[-1].start()
+        while len(scheduler._waiting[priority]) < (2 if name == "background 2" else 1):  # wait until queued
+            time.sleep(0.001)
+    time.sleep(0.01)
+    scheduler.release()
+    for thread in threads:
+        thread.join(5)
+
+    assert order == ["interactive", "normal", "background 1", "background 2"]
+    wait_times = scheduler.wait_times()
+    assert wait_times["background"]["count"] == 2 and wait_times["interactive"]["count"] == 1
+    assert wait_times["background"]["max"] >= wait_times["interactive"]["max"] >= 0.01
+    assert wait_times["normal"]["count"] == 2  # including the first acquire, which did not wait
+
+
+def test_request_scheduler_timeout():
+    scheduler = base.RequestScheduler()
+    scheduler.acquire()
+
+    assert not scheduler.acquire(timeout=0.01)
+    assert not scheduler._waiting[base.RequestPriority.NORMAL]
+    scheduler.release()
+    assert scheduler.acquire(blocking=False)
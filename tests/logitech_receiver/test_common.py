@@ -1,3 +1,5 @@
+import time
+
 from enum import IntFlag
 
 import pytest
@@ -15,6 +17,41 @@ def test_crc16():
     assert result == expected
 
 
+def _crc16_bitwise(data: bytes) -> int:
+    crc = 0xFFFF
+    for byte in data:
+        crc ^= byte << 8
+        for _i in range(8):
+            crc = ((crc << 1) ^ 0x1021 if crc & 0x8000 else crc << 1) & 0xFFFF
+    return crc
+
+
+def test_crc16_incremental():
+    data = bytes(range(256)) * 2
+
+    crc = common.Crc16()
+    for o in range(0, len(data), 16):
+        crc.update(data[o : o + 16])
+
+    assert crc.value == common.crc16(data) == _crc16_bitwise(data)
+    assert crc.to_bytes() == common.int2bytes(crc.value, 2)
+    assert common.Crc16(data[:100]).update(data[100:]).value == crc.value
+
+
+def test_crc16_benchmark():
+    data = bytes(range(256)) * 16
+
+    start = time.perf_counter()
+    for _i in range(100):
+        common.crc16(data)
+    fast = time.perf_counter() - start
+    start = time.perf_counter()
+    _crc16_bitwise(data)
+    slow = time.perf_counter() - start
+
+    assert fast < slow  # a hundred table-driven CRCs take less time than one bitwise CRC
+
+
 def test_named_int():
     named_int = common.NamedInt(0x2, "pulse")
 
@@ -65,6 +102,19 @@ def test_named_int_yaml():
     assert yaml_load == named_int
 
 
+def test_load_yaml_snapshot_of_tagged_values(tmp_path, mocker):
+    path = tmp_path / "tagged.yaml"
+    path.write_text("- !NamedInt {value: 2, name: two}\n")
+    assert common.load_yaml(str(path)) == [common.NamedInt(2, "two")]
+    parse = mocker.spy(yaml, "load")
+
+    loaded = common.load_yaml(str(path))
+
+    parse.assert_not_called()
+    assert loaded == [common.NamedInt(2, "two")]
+    assert isinstance(loaded[0], common.NamedInt) and loaded[0].name == "two"
+
+
 def test_color_int_str_and_repr():
     c = common.ColorInt(0xFC3300)
     assert str(c) == "0xfc3300"
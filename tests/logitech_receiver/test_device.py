@@ -14,6 +14,10 @@
 ## with this program; if not, write to the Free Software Foundation, Inc.,
 ## 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import threading
+import time
+
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from functools import partial
 from typing import Optional
@@ -21,11 +25,14 @@ from unittest import mock
 
 import pytest
 
+from logitech_receiver import base
 from logitech_receiver import common
 from logitech_receiver import device
 from logitech_receiver import hidpp20
 from logitech_receiver.common import BatteryLevelApproximation
 from logitech_receiver.common import BatteryStatus
+from logitech_receiver.hidpp20_constants import SupportedFeature
+from solaar import configuration
 
 from . import fake_hidpp
 
@@ -326,6 +333,81 @@ def test_device_ids(number, info, responses, handle, unitId, modelId, task_id, k
     assert test_device.polling_rate == rate
 
 
+def test_device_restores_identity():
+    snapshot = {
+        "name": "Saved Mouse",
+        "codename": "Saved",
+        "kind": "mouse",
+        "unitId": "12345678",
+        "modelId": "1234567890AB",
+        "tid_map": {"btid": "1234", "wpid": "5678", "usbid": "90AB"},
+        "firmware": [[0, "U1", "01.02.B0003", None], [1, "BL1", "02.03.B0004", "aa"]],
+    }
+    low_level = LowLevelInterfaceFake([])
+    low_level.request = mock.Mock(return_value=None)
+
+    with mock.patch("solaar.configuration.identity", return_value=snapshot) as identity:
+        test_device = device.Device(low_level, FakeReceiver(), 1, True, pi_DDDD, handle=0x11)
+
+    identity.assert_called_once_with("DDDD", "1234")
+    assert test_device.name == "Saved Mouse"
+    assert test_device.codename == "Saved"
+    assert test_device.kind == 2  # the pairing information takes precedence
+    assert test_device.unitId == "12345678"
+    assert test_device.modelId == "1234567890AB"
+    assert test_device.firmware[1] == common.FirmwareInfo(common.FirmwareKind.Bootloader, "BL1", "02.03.B0004", b"\xaa")
+    low_level.request.assert_not_called()
+
+
+def test_device_feature_table_key_after_firmware_update():
+    snapshot = {
+        "name": "Saved Mouse",
+        "codename": "Saved",
+        "kind": "mouse",
+        "unitId": "12345678",
+        "modelId": "1234567890AB",
+        "tid_map": {},
+        "firmware": [[0, "U1", "01.02.B0003", None]],
+    }
+    firmware = (common.FirmwareInfo(common.FirmwareKind.Firmware, "U1", "01.03.B0005", None),)
+    low_level = LowLevelInterfaceFake([])
+    with mock.patch("solaar.configuration.identity", return_value=snapshot):
+        test_device = device.Device(low_level, FakeReceiver(), 1, True, pi_DDDD, handle=0x11)
+    features = test_device.features
+    test_device._keys = ()
+
+    with mock.patch.object(device._hidpp20, "get_firmware", return_value=firmware), mock.patch(
+        "solaar.configuration.drop_feature_tables"
+    ) as drop_feature_tables:
+        assert test_device.feature_table_key() == "1234567890AB:U101.03.B0005"
+        test_device._save_identity()
+
+    drop_feature_tables.assert_called_once_with("1234567890AB:U101.02.B0003")
+    assert test_device.features is not features
+    assert test_device._keys is None
+    assert test_device._identity["firmware"] == [[0, "U1", "01.03.B0005", None]]
+
+
+def test_device_saves_key_tables_with_feature_table(mocker, tmp_path):
+    mocker.patch.object(configuration, "_features_file_path", str(tmp_path / "features.json"))
+    mocker.patch.object(configuration, "_feature_tables", None)
+    firmware = (common.FirmwareInfo(common.FirmwareKind.Firmware, "U1", "01.03.B0005", None),)
+    mocker.patch.object(device._hidpp20, "get_firmware", return_value=firmware)
+    test_device = device.Device(LowLevelInterfaceFake([]), FakeReceiver(), 1, True, pi_DDDD, handle=0x11)
+    test_device._modelId = "1234567890AB"
+    features = {"count": 2, "features": [[0x0000, 0, 0, 0], [0x0001, 1, 0, 0]]}
+    keys = {"count": 1, "keys": [[0x0050, 0x0038, 0x01, 0x00, 0x01, 0x01, 0x04]]}
+
+    test_device.save_feature_table(features)
+    test_device.save_feature_table(keys, "REPROG_CONTROLS_V4")
+
+    mocker.patch.object(configuration, "_feature_tables", None)  # read them back from the file
+    assert configuration.feature_table("1234567890AB:U101.03.B0005#REPROG_CONTROLS_V4") == keys
+    assert test_device.load_feature_table() == features
+    assert test_device.load_feature_table("REPROG_CONTROLS_V4") == keys
+    assert test_device.load_feature_table("PERSISTENT_REMAPPABLE_ACTION") is None
+
+
 class FakeDevice(device.Device):  # a fully functional Device but its HID++ functions look at local data
     def __init__(self, responses, *args, **kwargs):
         self.responses = responses
@@ -440,3 +522,116 @@ def test_close_runs_cleanups_once():
     test_device.__del__()
 
     assert calls == [test_device]
+
+
+class RequestPipelineFake:
+    def __init__(self, handle, long_message=False, protocol=1.0):
+        self.handle = handle
+        self.queued = []
+        self.flushes = 0
+
+    def submit(self, devnumber, request_id, *params):
+        pending = base.PendingReply(self, devnumber, request_id, base._pack_params(params), False)
+        self.queued.append(pending)
+        return pending
+
+    def flush(self):
+        self.flushes += 1
+        queued, self.queued = self.queued, []
+        for p in queued:
+            p.set_result(fake_hidpp.request(fake_hidpp.r_keyboard_2, self.handle, p.devnumber, p.request_id, p.params))
+
+
+def test_feature_batch():
+    low_level = LowLevelInterfaceFake(fake_hidpp.r_keyboard_2)
+    low_level.RequestPipeline = RequestPipelineFake
+    test_device = device.create_device(low_level, di_CCCC)
+    assert SupportedFeature.DEVICE_NAME in test_device.features
+
+    with mock.patch.object(low_level, "request", wraps=low_level.request) as request:
+        with test_device.feature_batch() as batch:
+            name_length = batch.feature_request(SupportedFeature.DEVICE_NAME)
+            name = batch.feature_request(SupportedFeature.DEVICE_NAME, 0x10, 0x00)
+            assert batch.feature_request(SupportedFeature.DEVICE_NAME, 0x10, 0x00) is name
+            assert len(batch) == 2 and not name.done()
+
+            with test_device.feature_batch() as inner:
+                assert inner is batch
+            assert test_device.feature_request(SupportedFeature.DEVICE_NAME, 0x10, b"\x00") == name.result()
+            assert batch._pipeline.flushes == 1
+            assert len(batch) == 1
+
+            test_device.feature_request(SupportedFeature.DEVICE_NAME, 0x20)  # not batched, drops other DEVICE_NAME replies
+            assert len(batch) == 0
+        assert request.call_count == 1
+
+    assert name_length.result() == bytes.fromhex("12")
+    assert name.result()[:4] == bytes.fromhex("41424344")
+    assert not test_device._feature_batches
+
+
+def test_feature_batch_write():
+    low_level = LowLevelInterfaceFake(fake_hidpp.r_keyboard_2)
+    low_level.RequestPipeline = RequestPipelineFake
+    test_device = device.create_device(low_level, di_CCCC)
+
+    with test_device.feature_batch() as batch:
+        name = batch.feature_request(SupportedFeature.DEVICE_NAME, 0x10, 0x00)
+        first = batch.feature_write(SupportedFeature.DEVICE_NAME, 0x10, 0x00)
+        second = batch.feature_write(SupportedFeature.DEVICE_NAME, 0x10, 0x00)
+        assert first is not second  # writes are never shared
+        assert len(batch) == 0  # and they discard queued reads of the feature
+        assert len(batch._pipeline.queued) == 3
+
+    assert name.result() == first.result() == second.result()
+
+
+def test_feature_request_shares_concurrent_reads(mocker):
+    test_device = device.create_device(LowLevelInterfaceFake(fake_hidpp.r_keyboard_2), di_CCCC)
+    mocker.patch.dict(hidpp20.READ_ONLY_FUNCTIONS, {(SupportedFeature.DEVICE_NAME, 0x00): 0})
+    release = threading.Event()
+    calls = []
+
+    def request(_device, feature, function=0x00, *params, no_reply=False):
+        calls.append(function)
+        release.wait(5)
+        return b"\x12"
+
+    mocker.patch.object(hidpp20, "feature_request", request)
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        replies = [executor.submit(test_device.feature_request, SupportedFeature.DEVICE_NAME) for _i in range(4)]
+        time.sleep(0.2)  # let all the reads start
+        release.set()
+
+    assert [r.result() for r in replies] == [b"\x12"] * 4
+    assert calls == [0x00]
+    assert not test_device._reads_in_flight and not test_device._reads_cached  # no reuse without a ttl
+
+
+def test_feature_request_reuses_reads_until_written(mocker):
+    test_device = device.create_device(LowLevelInterfaceFake(fake_hidpp.r_keyboard_2), di_CCCC)
+    mocker.patch.dict(hidpp20.READ_ONLY_FUNCTIONS)
+    hidpp20.read_only(SupportedFeature.DEVICE_NAME, 0x00, ttl=60)
+    hidpp20.read_only(SupportedFeature.DEVICE_NAME, 0x00)  # does not drop the ttl
+    request = mocker.spy(hidpp20, "feature_request")
+
+    def name_requests():
+        return [c.args[2:] for c in request.call_args_list if c.args[1] == SupportedFeature.DEVICE_NAME]
+
+    assert test_device.feature_request(SupportedFeature.DEVICE_NAME) == bytes.fromhex("12")
+    assert test_device.feature_request(SupportedFeature.DEVICE_NAME) == bytes.fromhex("12")
+    assert name_requests() == [(0x00,)]
+    test_device.feature_request(SupportedFeature.DEVICE_NAME, 0x10, 0x00)  # might change what reads return
+    test_device.feature_request(SupportedFeature.DEVICE_NAME)
+
+    assert name_requests() == [(0x00,), (0x10, 0x00), (0x00,)]
+
+
+def test_feature_batch_not_pipelined():
+    test_device = device.create_device(LowLevelInterfaceFake(fake_hidpp.r_keyboard_2), di_CCCC)
+
+    with test_device.feature_batch() as batch:
+        name_length = batch.feature_request(SupportedFeature.DEVICE_NAME)
+        assert not batch.pipelined
+        assert name_length.done() and name_length.result() == bytes.fromhex("12")
+        assert len(batch) == 0
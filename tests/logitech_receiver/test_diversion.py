@@ -1,7 +1,7 @@
 import textwrap
+import time
 
 from unittest import mock
-from unittest.mock import mock_open
 
 import pytest
 
@@ -37,7 +37,7 @@ def rule_config():
     return textwrap.dedent(rule_content)
 
 
-def test_load_rule_config(rule_config):
+def test_load_rule_config(rule_config, tmp_path):
     expected_rules = [
         [
             diversion.MouseGesture,
@@ -47,12 +47,15 @@ def test_load_rule_config(rule_config):
         [diversion.Test, diversion.KeyPress],
     ]
 
-    with mock.patch("builtins.open", new=mock_open(read_data=rule_config)):
-        loaded_rules = diversion._load_rule_config(file_path=mock.Mock())
+    rules_file = tmp_path / "rules.yaml"
+    rules_file.write_text(rule_config)
+
+    loaded_rules = diversion._load_rule_config(file_path=str(rules_file))
 
     assert len(loaded_rules.components) == 2  # predefined and user configured rules
     user_configured_rules = loaded_rules.components[0]
     assert isinstance(user_configured_rules, diversion.Rule)
+    assert len(user_configured_rules.components) == len(expected_rules)
 
     for components, expected_components in zip(user_configured_rules.components, expected_rules):
         for component, expected_component in zip(components.components, expected_components):
@@ -125,3 +128,80 @@ def test_process_notification(feature, data):
     )
 
     diversion.process_notification(device_mock, notification, feature)
+
+
+class _Record(diversion.Action):
+    def __init__(self, name, records, result=True):
+        self.name = name
+        self.records = records
+        self.result = result
+
+    def evaluate(self, feature, notification: HIDPPNotification, device, last_result):
+        self.records.append(self.name)
+        return self.result
+
+
+def _notification(address, data=b"\x00" * 8):
+    return HIDPPNotification(report_id=0x11, devnumber=1, sub_id=0x05, address=address, data=data)
+
+
+def test_compiled_rules_dispatch_on_feature_and_report():
+    records = []
+    thumb_wheel = diversion.Rule([{"Feature": "THUMB_WHEEL"}, _Record("thumb wheel", records)])
+    report_1 = diversion.Rule([{"Report": 1}, _Record("report 1", records)])
+    key = diversion.Rule([{"Key": ["Brightness Up", "pressed"]}, _Record("key", records)])
+    gesture = diversion.Rule(
+        [{"Or": [{"Feature": "MOUSE_GESTURE"}, {"Test": "crown_tap"}]}, _Record("gesture", records, result=None)]
+    )
+    not_thumb_wheel = diversion.Rule([{"Not": {"Feature": "THUMB_WHEEL"}}, _Record("not thumb wheel", records)])
+    rule = diversion.Rule([diversion.Rule([thumb_wheel, report_1, key]), diversion.Rule([gesture, not_thumb_wheel])])
+    compiled = diversion.CompiledRules(rule)
+
+    assert compiled.rules_for(SupportedFeature.THUMB_WHEEL, 0) == [thumb_wheel, not_thumb_wheel]
+    assert compiled.rules_for(SupportedFeature.REPROG_CONTROLS_V4, 0) == [key, not_thumb_wheel]
+    assert compiled.rules_for(SupportedFeature.MOUSE_GESTURE, 1) == [report_1, gesture, not_thumb_wheel]
+    assert compiled.rules_for(SupportedFeature.CROWN, 0) == [gesture, not_thumb_wheel]
+    for feature in (SupportedFeature.THUMB_WHEEL, SupportedFeature.MOUSE_GESTURE, SupportedFeature.CROWN):
+        for address in (0x00, 0x10):
+            records.clear()
+            rule.evaluate(feature, _notification(address), None, True)
+            expected, records[:] = records[:], []
+            compiled.evaluate(feature, _notification(address), None)
+            assert records == expected
+
+
+def test_evaluate_rules_recompiles_changed_rules(mocker):
+    records = []
+    rule = diversion.Rule([{"Feature": "THUMB_WHEEL"}, _Record("thumb wheel", records)])
+    mocker.patch.object(diversion, "rules", diversion.Rule([rule]))
+
+    diversion.evaluate_rules(SupportedFeature.THUMB_WHEEL, _notification(0x00), None)
+    rule.components[0] = diversion.Feature("CROWN")
+    diversion.rules_changed()
+    diversion.evaluate_rules(SupportedFeature.THUMB_WHEEL, _notification(0x00), None)
+    diversion.evaluate_rules(SupportedFeature.CROWN, _notification(0x00), None)
+
+    assert records == ["thumb wheel", "thumb wheel"]
+
+
+def test_compiled_rules_benchmark():
+    keys = [str(k) for k in list(diversion.CONTROL)[1:101]]
+    rule = diversion.Rule(
+        [diversion.Rule([{"Key": [k, "pressed"]}, {"MouseScroll": [0, 1]}]) for k in keys]
+        + [diversion.Rule([{"Test": "thumb_wheel_up"}, {"MouseScroll": [0, 1]}])]
+    )
+    notification = _notification(0x00, b"\x00\x00\x00\x00\x00\x00\x00\x00")
+    compiled = diversion.CompiledRules(rule)
+    count = 2000
+
+    start = time.perf_counter()
+    for _i in range(count):
+        rule.evaluate(SupportedFeature.THUMB_WHEEL, notification, None, True)
+    tree_rate = count / (time.perf_counter() - start)
+    start = time.perf_counter()
+    for _i in range(count):
+        compiled.evaluate(SupportedFeature.THUMB_WHEEL, notification, None)
+    compiled_rate = count / (time.perf_counter() - start)
+
+    print(f"thumb wheel notifications: {tree_rate:.0f} evaluations/s, compiled {compiled_rate:.0f} evaluations/s")
+    assert compiled_rate > 5 * tree_rate
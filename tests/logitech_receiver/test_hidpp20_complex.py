@@ -14,9 +14,15 @@
 ## with this program; if not, write to the Free Software Foundation, Inc.,
 ## 51 Franklin Street, Fifth Floor, Boston, MA 02110-1301 USA.
 
+import threading
+
+from contextlib import contextmanager
+from unittest import mock
+
 import pytest
 import yaml
 
+from logitech_receiver import base
 from logitech_receiver import common
 from logitech_receiver import exceptions
 from logitech_receiver import hidpp20
@@ -118,6 +124,58 @@ def test_FeaturesArray_enumerate(device, expected_result):
     assert result == expected_result
 
 
+def test_FeaturesArray_saves_and_preloads_table():
+    responses = [
+        fake_hidpp.Response("0100", 0x0000, "0001"),
+        fake_hidpp.Response("02", 0x0100),
+        fake_hidpp.Response("1B040004", 0x0110, "02"),
+    ]
+    saved = []
+    device = fake_hidpp.Device("TABLE", True, 4.5, responses)
+    device.save_feature_table = saved.append
+
+    assert [index for _feature, index in hidpp20.FeaturesArray(device).enumerate()] == [0, 1, 2]
+    assert saved == [{"count": 3, "features": [[0x0000, 0, 0, 0], [0x0001, 1, 0, 0], [0x1B04, 2, 4, 0]]}]
+
+    device = fake_hidpp.Device("TABLE", True, 4.5, responses[:2])  # the device only answers the count
+    device.load_feature_table = lambda: saved[0]
+    featuresarray = hidpp20.FeaturesArray(device)
+
+    assert featuresarray[hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4] == 2
+    assert featuresarray.get_feature_version(hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4) == 4
+    assert featuresarray.get_feature(2) == hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4
+    assert featuresarray[hidpp20_constants.SupportedFeature.BATTERY_STATUS] is False
+
+
+def test_FeaturesArray_ignores_stale_table():
+    device = fake_hidpp.Device(
+        "TABLE", True, 4.5, [fake_hidpp.Response("0100", 0x0000, "0001"), fake_hidpp.Response("03", 0x0100)]
+    )
+    device.load_feature_table = lambda: {"count": 3, "features": [[0x0000, 0, 0, 0], [0x0001, 1, 0, 0], [0x1B04, 2, 4, 0]]}
+    featuresarray = hidpp20.FeaturesArray(device)
+
+    assert featuresarray[hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4] is None
+    assert len(featuresarray) == 4
+
+
+def test_FeaturesArray_read_table():
+    responses = [
+        fake_hidpp.Response("0100", 0x0000, "0001"),
+        fake_hidpp.Response("02", 0x0100),
+        fake_hidpp.Response("1B040004", 0x0110, "02"),
+    ]
+    device = fake_hidpp.Device("TABLE", True, 4.5, responses)
+    featuresarray = hidpp20.FeaturesArray(device)
+
+    assert featuresarray.read_table() is True
+    device.responses = []  # everything is now answered from memory
+
+    assert featuresarray[hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4] == 2
+    assert hidpp20_constants.SupportedFeature.BATTERY_STATUS not in featuresarray
+    assert featuresarray[hidpp20_constants.SupportedFeature.BATTERY_STATUS] is False
+    assert device_standard.features.read_table() is False  # some indices of its table can't be read
+
+
 def test_FeaturesArray_setitem():
     featuresarray = hidpp20.FeaturesArray(device_standard)
 
@@ -465,6 +523,127 @@ def test_keys_array_v4_key(key, expected_index, expected_mapped_to, expected_rem
         assert list(remappable_to) == expected_remappable_to
 
 
+def test_KeysArrayV4_saves_and_preloads_records():
+    saved = []
+    device = fake_hidpp.Device(
+        "KEY", responses=fake_hidpp.responses_key, feature=hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4, offset=5
+    )
+    device.save_feature_table = lambda table, name: saved.append((name, table))
+    keysarray = _hidpp20.get_keys(device)
+
+    keysarray.load_all()
+
+    assert len(saved) == 1 and saved[0][0] == "REPROG_CONTROLS_V4"
+    assert saved[0][1]["count"] == 8 and saved[0][1]["keys"][0] == [0x0050, 0x0038, 0x01, 0x00, 0x01, 0x01, 0x04]
+
+    device = fake_hidpp.Device(  # the device only answers the count and the current mappings
+        "KEY",
+        responses=fake_hidpp.responses_key[:1] + fake_hidpp.responses_key[9:],
+        feature=hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4,
+        offset=5,
+    )
+    device.load_feature_table = lambda name=None: saved[0][1] if name == "REPROG_CONTROLS_V4" else None
+    keysarray = _hidpp20.get_keys(device)
+
+    assert keysarray.index(special_keys.CONTROL.Back_Button) == 3
+    assert list(keysarray[0].remappable_to) == [common.NamedInt(0x50, "Left Click"), common.NamedInt(0x51, "Right Click")]
+    assert keysarray[2].mapped_to == common.NamedInt(0x50, "Left Click")
+
+
+class _PipelineFake:
+    """Answers pipelined requests from the responses of a fake device, recording the requests."""
+
+    def __init__(self, answer):
+        self.answer = answer
+        self.queued = []
+        self.requests = []
+
+    def submit(self, devnumber, request_id, *params):
+        pending = base.PendingReply(self, devnumber, request_id, base._pack_params(params), False)
+        self.queued.append(pending)
+        self.requests.append(request_id)
+        return pending
+
+    def flush(self):
+        queued, self.queued = self.queued, []
+        for pending in queued:
+            pending.set_result(self.answer(pending.request_id, pending.params))
+
+
+def _pipelined(device):
+    """Make a fake device batch its feature calls in a pipeline, returning the pipeline and the mock of its requests."""
+    pipeline = _PipelineFake(device.request)
+    device.request = mock.Mock(wraps=device.request)
+
+    @contextmanager
+    def feature_batch():
+        batch = hidpp20.FeatureBatch(device)
+        batch._pipeline = pipeline
+        device._feature_batches = {threading.get_ident(): batch}
+        try:
+            yield batch
+            batch.flush()
+        finally:
+            device._feature_batches = {}
+
+    device.feature_batch = feature_batch
+    return pipeline, device.request
+
+
+def test_KeysArrayV4_load_all_pipelined():
+    saved = []
+    device = fake_hidpp.Device(
+        "KEY", responses=fake_hidpp.responses_key, feature=hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4, offset=5
+    )
+    device.save_feature_table = lambda table, name: saved.append((name, table))
+    keysarray = _hidpp20.get_keys(device)
+    pipeline, request = _pipelined(device)
+
+    keysarray.load_all()
+
+    assert pipeline.requests == [0x0510] * 8 + [0x0520] * 8  # records, then reporting
+    assert not [c for c in request.call_args_list if c.args[0] in (0x0510, 0x0520)]
+    assert keysarray[2].mapped_to == common.NamedInt(0x50, "Left Click")
+    assert keysarray[3].mapping_flags == MappingFlag.DIVERTED | MappingFlag.PERSISTENTLY_DIVERTED
+    assert saved[0][0] == "REPROG_CONTROLS_V4" and saved[0][1]["keys"] == keysarray._records
+
+
+def test_KeysArrayV4_load_all_pipelined_from_table():
+    device = fake_hidpp.Device(
+        "KEY", responses=fake_hidpp.responses_key, feature=hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4, offset=5
+    )
+    records = _hidpp20.get_keys(device)
+    records.load_all()
+    device = fake_hidpp.Device(  # the device only answers the count and the current mappings
+        "KEY",
+        responses=fake_hidpp.responses_key[:1] + fake_hidpp.responses_key[9:],
+        feature=hidpp20_constants.SupportedFeature.REPROG_CONTROLS_V4,
+        offset=5,
+    )
+    device.load_feature_table = lambda name=None: records._table() if name == "REPROG_CONTROLS_V4" else None
+    keysarray = _hidpp20.get_keys(device)
+    pipeline, request = _pipelined(device)
+
+    keysarray.load_all()
+
+    assert pipeline.requests == [0x0520] * 8  # only the reporting of the keys
+    assert keysarray[3].mapping_flags == MappingFlag.DIVERTED | MappingFlag.PERSISTENTLY_DIVERTED
+
+
+def test_KeysArrayPersistent_load_all_pipelined():
+    device = fake_hidpp.Device(
+        "REMAP", responses=fake_hidpp.responses_remap, feature=hidpp20_constants.SupportedFeature.PERSISTENT_REMAPPABLE_ACTION
+    )
+    keysarray = _hidpp20.get_remap_keys(device)
+    pipeline, request = _pipelined(device)
+
+    keysarray.load_all()
+
+    assert pipeline.requests == [0x0420] * 3 + [0x0430] * 3  # records, then mappings
+    assert not [c for c in request.call_args_list if c.args[0] in (0x0420, 0x0430)]
+    assert keysarray[2].remapped == common.NamedInt(0x51, "DOWN")
+
+
 @pytest.mark.parametrize(
     "device, index", [(device_zerofeatures, -1), (device_zerofeatures, 5), (device_standard, -1), (device_standard, 6)]
 )
@@ -924,6 +1103,54 @@ def test_onboard_profiles_device(responses, name, count, buttons, gbuttons, sect
     assert yaml.safe_load(yml_dump).to_bytes().hex() == profiles.to_bytes().hex()
 
 
+def test_onboard_profiles_sector_io(mocker):
+    sector = bytes(range(252))
+    sector += common.int2bytes(common.crc16(sector), 2)
+    responses = [fake_hidpp.Response(sector[o : o + 16].hex(), 0x0950, f"0001{o:04X}") for o in range(0, 254 - 15, 16)]
+    responses.append(fake_hidpp.Response(sector[-16:].hex(), 0x0950, "000100EE"))
+    device = fake_hidpp.Device(
+        "ONB", True, 4.5, responses=responses, feature=hidpp20_constants.SupportedFeature.ONBOARD_PROFILES, offset=0x9
+    )
+    assert hidpp20.OnboardProfiles.read_sector(device, 1, 254) == sector
+    spy_request = mocker.spy(device, "request")
+
+    assert hidpp20.OnboardProfiles.read_sector(device, 1, 254) == sector
+    assert spy_request.call_count == 1  # only the chunk with the CRC is read again
+
+    changed = sector[:0x40] + b"\x00" * 16 + sector[0x50:-2]
+    changed += common.int2bytes(common.crc16(changed), 2)
+    spy_request.reset_mock()
+
+    assert hidpp20.OnboardProfiles.write_sector(device, 1, changed) is True
+    requests = [(c.args[0], c.args[1:]) for c in spy_request.call_args_list]
+    assert requests[1] == (0x0960, (0x00, 0x01, 0x00, 0x40, 0x00, 254 - 0x40))  # from the first changed chunk on
+    assert [r[1][0] for r in requests[2:-1]] == [changed[o : o + 16] for o in range(0x40, 254, 16)]
+    assert requests[-1] == (0x0980, ())
+    assert device._profile_sectors[1] == changed
+
+
+def test_onboard_profiles_sector_io_bad_crc(mocker):
+    sector = bytes(range(252)) + b"\x00\x00"  # CRC doesn't match
+    responses = [fake_hidpp.Response(sector[o : o + 16].hex(), 0x0950, f"0001{o:04X}") for o in range(0, 254 - 15, 16)]
+    responses.append(fake_hidpp.Response(sector[-16:].hex(), 0x0950, "000100EE"))
+    device = fake_hidpp.Device(
+        "ONB", True, 4.5, responses=responses, feature=hidpp20_constants.SupportedFeature.ONBOARD_PROFILES, offset=0x9
+    )
+    spy_request = mocker.spy(device, "request")
+
+    assert hidpp20.OnboardProfiles.read_sector(device, 1, 254) == sector
+    assert [c.args[0] for c in spy_request.call_args_list].count(0x0950) == 2 * 16  # read again, one chunk at a time
+    assert 1 not in device._profile_sectors
+
+    fixed = sector[:-2] + common.int2bytes(common.crc16(sector[:-2]), 2)
+    spy_request.reset_mock()
+
+    assert hidpp20.OnboardProfiles.write_sector(device, 1, fixed) is True
+    requests = [(c.args[0], c.args[1:]) for c in spy_request.call_args_list]
+    assert (0x0960, (0x00, 0x01, 0x00, 0x00, 0x00, 254)) in requests  # the whole sector is written
+    assert requests[-1] == (0x0980, ())
+
+
 # --- Centurion (PRO X 2 LIGHTSPEED headset) tests ---
 
 device_centurion = fake_hidpp.Device("CENTURION", True, 2.6, fake_hidpp.r_centurion_headset, centurion=True)
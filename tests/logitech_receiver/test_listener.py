@@ -0,0 +1,88 @@
+import os
+import queue
+import threading
+import time
+
+from unittest import mock
+
+import pytest
+
+from logitech_receiver import base
+from logitech_receiver import exceptions
+from logitech_receiver import listener
+
+
+class ListenerFake:
+    def __init__(self):
+        self.delivered = queue.Queue()
+
+    def _reactor_deliver(self, n):
+        self.delivered.put(n)
+
+
+@pytest.fixture
+def pipe():
+    read_fd, write_fd = os.pipe()
+    yield read_fd, write_fd
+    os.close(read_fd)
+    os.close(write_fd)
+
+
+def test_reactor_delivers_one_notification_per_arming(pipe):
+    read_fd, write_fd = pipe
+    replies = [b"", b"\x10\x01\x41\x04\x61\x00\x00", OSError("gone")]
+    fake = ListenerFake()
+
+    def read(handle, size, timeout):
+        assert handle == read_fd and timeout == 0
+        os.read(read_fd, 1)
+        reply = replies.pop(0)
+        if isinstance(reply, Exception):
+            raise reply
+        return reply
+
+    with mock.patch.object(base.hidapi, "read", side_effect=read), mock.patch.object(base, "close") as close:
+        reactor = listener._Reactor()
+        reactor.start()
+        reactor.arm(read_fd, fake)
+        os.write(write_fd, b"xx")  # the first packet is not a notification so the reactor keeps waiting
+
+        n = fake.delivered.get(timeout=2)
+        assert isinstance(n, base.HIDPPNotification)
+        assert (n.devnumber, n.sub_id, n.address) == (0x01, 0x41, 0x04)
+
+        os.write(write_fd, b"x")  # not read until the listener arms the reactor again
+        time.sleep(0.1)
+        assert fake.delivered.empty()
+
+        reactor.arm(read_fd, fake)
+        e = fake.delivered.get(timeout=2)
+        assert isinstance(e, exceptions.NoReceiver)
+        reactor.disarm(read_fd)
+    close.assert_not_called()  # the listener closes its own handle
+
+
+def test_shared_handle_forwards_notifications_to_listener():
+    events_listener = listener.EventsListener(mock.Mock(path="/dev/hidraw7"), mock.Mock())
+    events_listener._active = True
+    handle = listener._ThreadedHandle(events_listener, "/dev/hidraw7", 7, shared=True)
+    seen = {}
+
+    def other_thread():
+        seen["handle"] = int(handle)
+        seen["hook"] = handle.notifications_hook
+
+    with mock.patch.object(base, "open_path") as open_path:
+        thread = threading.Thread(target=other_thread)
+        thread.start()
+        thread.join()
+    open_path.assert_not_called()
+    assert seen["handle"] == 7
+
+    n = base.HIDPPNotification(0x11, 0x01, 0x04, 0x00, b"\x01")
+    seen["hook"](n)
+    assert events_listener._queued_notifications.get_nowait() == n
+
+    with mock.patch.object(base, "close") as close:
+        handle.close()
+    close.assert_called_once_with(7)
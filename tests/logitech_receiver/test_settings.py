@@ -0,0 +1,159 @@
+import threading
+import time
+
+from types import SimpleNamespace
+
+from logitech_receiver import settings
+from logitech_receiver.hidpp20_constants import SupportedFeature
+
+from . import fake_hidpp
+
+
+class _SlowSetting:
+    name = "pointer_speed"
+    _device = "device"
+
+    def __init__(self):
+        self.written = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+
+    def write(self, value):
+        self.started.set()
+        self.release.wait(5)
+        self.written.append(value)
+        return value
+
+    def write_key_value(self, key, value):
+        self.written.append((key, value))
+        return value
+
+
+def test_write_behind_keeps_latest_value():
+    setting = _SlowSetting()
+    acknowledged = []
+    write_behind = settings.WriteBehind(rate=1000)
+
+    write_behind.write(setting, 1, acknowledge=acknowledged.append)
+    assert setting.started.wait(5)
+    for value in range(2, 50):  # values queued while writing replace each other
+        write_behind.write(setting, value, acknowledge=acknowledged.append)
+    setting.release.set()
+
+    assert write_behind.flush(5)
+    assert setting.written == [1, 49]
+    assert acknowledged == [49]  # the first value was superseded before it was written
+
+
+def test_write_behind_limits_rate_per_key():
+    setting = _SlowSetting()
+    setting.release.set()
+    submitted = []
+
+    def submit(s, function, *args):
+        submitted.append(s)
+        function(*args)
+        return True
+
+    write_behind = settings.WriteBehind(rate=2, submit=submit)
+
+    write_behind.write(setting, 10, key=1)
+    write_behind.write(setting, 20, key=2)
+    assert write_behind.flush(5)
+    write_behind.write(setting, 11, key=1)
+    write_behind.write(setting, 12, key=1)
+
+    assert not write_behind.flush(0.1)  # too soon after the last write of key 1
+    assert write_behind.flush(5)
+    assert sorted(setting.written) == [(1, 10), (1, 12), (2, 20)]
+    assert submitted == [setting] * 3
+
+
+def test_write_behind_forgets_written_keys():
+    setting = _SlowSetting()
+    setting.release.set()
+    write_behind = settings.WriteBehind(rate=100)
+
+    write_behind.write(setting, 1)
+    assert write_behind.flush(5)
+
+    for _i in range(100):  # the key is forgotten once it could be written again
+        with write_behind._lock:
+            if not write_behind._written:
+                break
+        time.sleep(0.01)
+    assert not write_behind._written
+
+
+def test_write_behind_dropped_write():
+    setting = _SlowSetting()
+    write_behind = settings.WriteBehind(submit=lambda *args: SimpleNamespace(cancelled=True))
+
+    write_behind.write(setting, 1)
+
+    assert write_behind.flush(5)
+    assert setting.written == []
+
+
+class _CountingRW:
+    def __init__(self):
+        self.reads = 0
+
+    def read(self, device):
+        self.reads += 1
+        return bytes([self.reads])
+
+
+class _ByteValidator:
+    kind = None
+
+    def validate_read(self, reply):
+        return reply[0]
+
+
+class _TrackedSetting(settings.Setting):
+    name = "tracked"
+    feature = SupportedFeature.BACKLIGHT2
+    invalidated_by = ((SupportedFeature.BACKLIGHT2, 0),)
+
+
+def test_setting_value_kept_until_invalidated():
+    device = fake_hidpp.Device()
+    rw = _CountingRW()
+    setting = _TrackedSetting(device, rw, _ByteValidator())
+    device._settings = [setting]
+
+    assert setting.read(cached=False) == 1
+    assert setting.read(cached=False) == 1  # nothing has changed the value on the device
+    device.invalidate_settings(SupportedFeature.BACKLIGHT2, 1)  # a report that doesn't change the setting
+    assert setting.read(cached=False) == 1
+    device.invalidate_settings(SupportedFeature.BACKLIGHT2, 0)
+    assert setting.read(cached=True) == 2  # even cached reads go to the device after a change
+    assert setting.read(cached=True) == 2
+    assert rw.reads == 2
+
+
+def test_setting_value_read_again_after_going_offline():
+    device = fake_hidpp.Device()
+    rw = _CountingRW()
+    setting = _TrackedSetting(device, rw, _ByteValidator())
+
+    assert setting.read(cached=False) == 1
+    setting.invalidate(changed=False)
+    assert setting.read(cached=True) == 1  # the value can still be applied
+    assert setting.read(cached=False) == 2
+    assert rw.reads == 2
+
+
+def test_stale_value_kept_while_offline():
+    device = fake_hidpp.Device()
+    rw = _CountingRW()
+    setting = _TrackedSetting(device, rw, _ByteValidator())
+
+    assert setting.read(cached=False) == 1
+    setting.invalidate()
+    device.online = False
+    assert setting.read(cached=True) == 1  # the last known value, as the device can't be read
+    device.online = True
+    assert setting.read(cached=True) == 2
+    assert rw.reads == 2
@@ -0,0 +1,126 @@
+from types import SimpleNamespace
+
+import yaml
+
+from solaar import configuration
+
+
+def test_save_dumps_only_changed_entries(mocker):
+    entry_1 = configuration._DeviceEntry(_NAME="One", _wpid="1234", _serial="AB", pointer_speed=256)
+    entry_2 = configuration._DeviceEntry(_NAME="Two", _wpid="5678", _serial="CD", divert_keys={82: 1})
+    configuration._config[:] = ["1.1", entry_1, entry_2]
+    dump = mocker.spy(configuration, "_dump")
+
+    configuration.save()
+
+    assert dump.call_count == 3  # version and both entries
+    with open(configuration._yaml_file_path) as config_file:
+        assert yaml.safe_load(config_file) == ["1.1", dict(entry_1), dict(entry_2)]
+
+    dump.reset_mock()
+    entry_2["divert_keys"] = {82: 0}
+
+    assert dump.call_count == 2  # version and the changed entry
+    with open(configuration._yaml_file_path) as config_file:
+        text = config_file.read()
+    assert yaml.safe_load(text)[2]["divert_keys"] == {82: 0}
+    assert text == yaml.dump(configuration._config, default_flow_style=None, width=150)
+
+
+def test_save_skips_unchanged_configuration(mocker):
+    configuration._config[:] = ["1.1", configuration._DeviceEntry(_NAME="One")]
+    configuration.save()
+    replace = mocker.patch("os.replace")
+
+    configuration.save()
+
+    replace.assert_not_called()
+
+
+def test_load_uses_snapshot_of_unchanged_file(mocker):
+    configuration._config[:] = ["1.1", configuration._DeviceEntry(_NAME="One", _wpid="1234", _serial="AB")]
+    configuration.save()
+    configuration._config[:] = []
+    configuration._load()
+    loaded = list(configuration._config)
+    parse = mocker.spy(yaml, "load")
+    configuration._config[:] = []
+
+    configuration._load()
+
+    parse.assert_not_called()
+    assert configuration._config == loaded
+
+    configuration._config[1]["_NAME"] = "Changed"  # saving changes the file, which has to be parsed again
+    configuration._config[:] = []
+    configuration._load()
+
+    parse.assert_called_once()
+    assert configuration._config[1]["_NAME"] == "Changed"
+
+
+def _device(name, wpid=None, serial=None, modelId="000000000000", unitId="00000000", online=True):
+    return SimpleNamespace(
+        name=name, _name=name, wpid=wpid, serial=serial, _serial=serial, modelId=modelId, unitId=unitId, online=online
+    )
+
+
+def test_persister_finds_entries_by_index(mocker):
+    receiver_entry = configuration._DeviceEntry(_NAME="Mouse", _wpid="4082", _serial="1A2B3C4D")
+    direct_entry = configuration._DeviceEntry(_NAME="Keyboard", _modelId="B35BC3340000", _unitId="5D6E7F80")
+    unnamed_entry = configuration._DeviceEntry(_NAME="Headset", _modelId="Headset")
+    configuration._config[:] = ["1.1", receiver_entry, direct_entry, unnamed_entry]
+    match = mocker.spy(configuration, "_match")
+
+    assert configuration.persister(_device("Mouse", "4082", "1A2B3C4D")) is receiver_entry
+    assert configuration.persister(_device("Keyboard", modelId="B35BC3340000", unitId="5D6E7F80")) is direct_entry
+    assert configuration.persister(_device("Headset")) is unnamed_entry
+    assert match.call_count == 3  # only the indexed candidates are checked
+    assert configuration.persister(_device("Unseen", "4083", "99999999", online=False)) is None
+    assert len(configuration._config) == 4
+
+    new_entry = configuration.persister(_device("Trackball", "4084", "01020304"))
+
+    assert configuration._config[-1] is new_entry
+    assert configuration.persister(_device("Trackball", "4084", "01020304")) is new_entry
+    assert configuration.lookup("5d6e7f80") == [direct_entry]
+    assert configuration.lookup("01020304") == [new_entry]
+
+
+def test_persister_prefers_first_matching_entry():
+    first = configuration._DeviceEntry(_NAME="Keyboard", _wpid="4075", _serial="11223344")
+    second = configuration._DeviceEntry(_NAME="Keyboard", _modelId="B35BC3340000", _unitId="11223344")
+    configuration._config[:] = ["1.1", first, second]
+
+    device = _device("Keyboard", "4075", "11223344", modelId="B35BC3340000", unitId="11223344")
+
+    assert configuration.persister(device) is first
+    assert first[configuration._KEY_MODEL_ID] == "B35BC3340000"
+    assert configuration.lookup("11223344") == [first, second]
+
+
+def test_persisters_take_lock_once(mocker):
+    configuration._config[:] = ["1.1", configuration._DeviceEntry(_NAME="Mouse", _wpid="4082", _serial="1A2B3C4D")]
+    lock = mocker.patch.object(configuration, "configuration_lock", mocker.MagicMock())
+    devices = [_device("Mouse", "4082", "1A2B3C4D"), _device("Keyboard", modelId="B35BC3340000", unitId="5D6E7F80")]
+
+    entries = configuration.persisters(devices)
+
+    assert lock.__enter__.call_count == 1
+    assert entries[0] is configuration._config[1]
+    assert entries[1] is configuration._config[2]
+
+
+def test_drop_feature_tables(mocker, tmp_path):
+    mocker.patch.object(configuration, "_features_file_path", str(tmp_path / "features.json"))
+    mocker.patch.object(configuration, "_feature_tables", None)
+    configuration.save_feature_table("AB:U101", {"count": 1})
+    configuration.save_feature_table("AB:U101#REPROG_CONTROLS_V4", {"count": 2})
+    configuration.save_feature_table("AB:U102", {"count": 3})
+
+    configuration.drop_feature_tables("AB:U101")
+
+    mocker.patch.object(configuration, "_feature_tables", None)  # read them back from the file
+    assert configuration.feature_table("AB:U101") is None
+    assert configuration.feature_table("AB:U101#REPROG_CONTROLS_V4") is None
+    assert configuration.feature_table("AB:U102") == {"count": 3}
@@ -0,0 +1,68 @@
+import threading
+
+import pytest
+
+from solaar import tasks
+
+
+@pytest.fixture
+def executor():
+    executor = tasks.TaskExecutor("Test")
+    yield executor
+    executor.stop()
+
+
+def test_lanes_run_in_order_and_in_parallel(executor):
+    blocked = threading.Event()
+    done = threading.Event()
+    results = []
+
+    executor.submit("slow", blocked.wait, 5)
+    for i in range(20):  # submitting does not block even with a stuck lane
+        executor.submit("slow", results.append, ("slow", i))
+    executor.submit("fast", results.append, ("fast", 0))
+    executor.submit("fast", done.set)
+
+    assert done.wait(5)
+    assert results == [("fast", 0)]
+
+    blocked.set()
+    finished = threading.Event()
+    executor.submit("slow", finished.set)
+    assert finished.wait(5)
+    assert results[1:] == [("slow", i) for i in range(20)]
+
+
+def test_cancel_drops_reads_of_other_lanes(executor):
+    blocked = threading.Event()
+    results = []
+
+    for lane in ("one", "two"):
+        executor.submit(lane, blocked.wait, 5)
+        executor.submit(lane, results.append, (lane, "read"), cancellable=True)
+        executor.submit(lane, results.append, (lane, "write"))
+    executor.cancel(keep="two")
+    blocked.set()
+    finished = [threading.Event(), threading.Event()]
+    executor.submit("one", finished[0].set)
+    executor.submit("two", finished[1].set)
+
+    assert all(f.wait(5) for f in finished)
+    assert sorted(results) == [("one", "write"), ("two", "read"), ("two", "write")]
+
+
+def test_stopped_executor_drops_tasks(executor):
+    executor.stop()
+
+    task = executor.submit("lane", pytest.fail)
+
+    assert task.cancelled
+
+
+def test_lane_starts_while_holding_lock(executor, mocker):
+    locked = []  # so that stop can't shut the pool down between queueing a task and starting its lane
+    mocker.patch.object(executor._pool, "submit", side_effect=lambda *args: locked.append(executor._lock.locked()))
+
+    executor.submit("lane", print)
+
+    assert locked == [True]